@@ -0,0 +1,38 @@
+# auth_module/management/commands/purge_expired.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from auth_module.services.expiry_service import ExpirySweeper
+
+
+class Command(BaseCommand):
+    help = (
+        "Purge par lots les OTP, codes de vérification, jetons TOTP et sessions de scan expirés "
+        "(à lancer par cron, ou en continu avec --loop)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Lignes par lot (défaut EXPIRY_SWEEP_BATCH_SIZE).")
+        parser.add_argument("--retention-hours", type=int, help="Délai après expiration avant suppression.")
+        parser.add_argument("--dry-run", action="store_true", help="Compter sans rien modifier.")
+        parser.add_argument("--loop", action="store_true", help="Tourner en continu.")
+        parser.add_argument("--interval", type=int, default=3600, help="Secondes entre deux passes avec --loop.")
+
+    def handle(self, *args, **options):
+        sweeper = ExpirySweeper.from_settings()
+        if options["batch_size"]:
+            sweeper.batch_size = options["batch_size"]
+        if options["retention_hours"] is not None:
+            sweeper.retention = timedelta(hours=options["retention_hours"])
+
+        while True:
+            compteurs = sweeper.run(dry_run=options["dry_run"])
+            verbe = "à traiter" if options["dry_run"] else "traitées"
+            self.stdout.write(self.style.SUCCESS(
+                ", ".join(f"{nom}: {n}" for nom, n in compteurs.items()) + f" (lignes {verbe})"
+            ))
+            if not options["loop"] or options["dry_run"]:
+                return
+            time.sleep(options["interval"])
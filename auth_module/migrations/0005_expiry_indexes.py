@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_module', '0004_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='totpsetuptoken',
+            index=models.Index(fields=['expires_at'], name='totp_setup_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verificationcode',
+            index=models.Index(condition=models.Q(('utilise', False)), fields=['user', 'canal', 'code'], name='verifcode_valide_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verificationcode',
+            index=models.Index(fields=['expiration'], name='verifcode_expiration_idx'),
+        ),
+    ]
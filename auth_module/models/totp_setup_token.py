@@ -9,6 +9,11 @@ class TOTPSetupToken(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["expires_at"], name="totp_setup_expires_idx"),  # purge_expired
+        ]
+
     @classmethod
     def clean_expired(cls):
         cls.objects.filter(expires_at__lt=timezone.now()).delete()
@@ -15,6 +15,16 @@ class VerificationCode(models.Model):
     utilise = models.BooleanField(default=False)
     expiration = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            # Vérification d'un code : seuls les codes non utilisés sont indexés
+            models.Index(
+                fields=["user", "canal", "code"], name="verifcode_valide_idx",
+                condition=models.Q(utilise=False),
+            ),
+            models.Index(fields=["expiration"], name="verifcode_expiration_idx"),  # purge_expired
+        ]
+
     def is_expired(self):
         return timezone.now() > self.expiration
 
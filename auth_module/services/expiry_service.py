@@ -0,0 +1,93 @@
+# auth_module/services/expiry_service.py
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from auth_module.models.totp_setup_token import TOTPSetupToken
+from auth_module.models.verification_code import VerificationCode
+from cards_module.models import SessionScan
+from consultation_module.models import ActionOTP
+from grossesse_module.models import DossierAccess
+
+logger = logging.getLogger(__name__)
+
+# (nom, modèle, champ d'expiration) des tables purgées
+EXPIRING_MODELS = (
+    ("session_scan", SessionScan, "expires_at"),
+    ("action_otp", ActionOTP, "expire_at"),
+    ("dossier_access", DossierAccess, "expire_at"),
+    ("verification_code", VerificationCode, "expiration"),
+    ("totp_setup_token", TOTPSetupToken, "expires_at"),
+)
+
+
+class ExpirySweeper:
+    """
+    Purge des jetons et sessions expirés (OTP, codes de vérification, jetons TOTP,
+    sessions de scan), hors du chemin des requêtes.
+
+    Suppression par lots de `batch_size` lignes (SELECT id ... LIMIT puis DELETE) :
+    chaque transaction reste courte et ne verrouille pas la table. Une ligne n'est
+    supprimée que `retention` après son expiration ; les sessions de scan PENDING
+    expirées passent d'abord en EXPIRED.
+    """
+
+    def __init__(self, batch_size=1000, retention=timedelta(hours=24), pause=0.0):
+        self.batch_size = batch_size
+        self.retention = retention
+        self.pause = pause
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            batch_size=getattr(settings, "EXPIRY_SWEEP_BATCH_SIZE", 1000),
+            retention=timedelta(hours=getattr(settings, "EXPIRY_SWEEP_RETENTION_HOURS", 24)),
+            pause=getattr(settings, "EXPIRY_SWEEP_PAUSE", 0.0),
+        )
+
+    def _by_batches(self, queryset, action):
+        """Applique `action(ids)` par lots jusqu'à épuisement ; retourne le nombre de lignes traitées."""
+        total = 0
+        while True:
+            with transaction.atomic():
+                ids = list(queryset.order_by().values_list("id", flat=True)[:self.batch_size])
+                if not ids:
+                    return total
+                total += action(ids)
+            if len(ids) < self.batch_size:
+                return total
+            if self.pause:
+                time.sleep(self.pause)  # laisse respirer la base entre deux lots
+
+    def expire_sessions(self, now=None):
+        """Sessions de scan PENDING expirées -> EXPIRED (index sessionscan_expires_idx)."""
+        now = now or timezone.now()
+        return self._by_batches(
+            SessionScan.objects.filter(statut="PENDING", expires_at__lt=now),
+            lambda ids: SessionScan.objects.filter(id__in=ids).update(statut="EXPIRED", closed_at=now),
+        )
+
+    def purge(self, model, champ, now=None, dry_run=False):
+        limite = (now or timezone.now()) - self.retention
+        queryset = model.objects.filter(**{f"{champ}__lt": limite})
+        if dry_run:
+            return queryset.count()
+        # Aucune clé étrangère ni signal vers ces tables : DELETE direct, sans collecte en Python
+        return self._by_batches(queryset, lambda ids: model.objects.filter(id__in=ids).delete()[0])
+
+    def run(self, dry_run=False):
+        """Une passe complète ; retourne {table: lignes supprimées (ou à supprimer)}."""
+        now = timezone.now()
+        compteurs = {}
+        if dry_run:
+            compteurs["session_scan_expired"] = SessionScan.objects.filter(statut="PENDING", expires_at__lt=now).count()
+        else:
+            compteurs["session_scan_expired"] = self.expire_sessions(now)
+        for nom, model, champ in EXPIRING_MODELS:
+            compteurs[nom] = self.purge(model, champ, now, dry_run=dry_run)
+        logger.info(f"Purge des jetons expirés : {compteurs}")
+        return compteurs
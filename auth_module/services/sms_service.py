@@ -1,48 +1,43 @@
 # auth_module/services/sms_service.py
+from datetime import timedelta
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from sms_sender.services import send_sms_via_md
+from django.utils import timezone
+from sms_sender.services import enqueue_sms
 
 DEFAULT_SENDER_ID = getattr(settings, "MD_SMS_SENDER_ID", "VIACAREME")
 
 
 class SMSService:
     @staticmethod
-    def _send_sms(phone: str, message: str, sender_id: str = None):
+    def _send_sms(phone: str, message: str, sender_id: str = None, expire_at=None):
         """
-        Envoie un SMS via l'API MD SMS.
+        Met le SMS dans l'outbox (transaction courante) ; envoi via l'API MD SMS
+        par la commande dispatch_sms_outbox.
         """
+        if not phone:
+            raise ValidationError("Numéro de téléphone manquant pour l'envoi du SMS")
         if not sender_id:
             sender_id = DEFAULT_SENDER_ID
 
-        result = send_sms_via_md(
+        return enqueue_sms(
             message=message,
             mobile_numbers=phone,
-            sender_id=sender_id
+            sender_id=sender_id,
+            expire_at=expire_at
         )
 
-        if not result.get("success"):
-            error_type = result.get("error_type")
-            if error_type == "api_error":
-                raise ValidationError(f"Erreur API SMS: {result.get('api_error_description')} (code {result.get('api_error_code')})")
-            elif error_type == "timeout":
-                raise ValidationError("Timeout envoi SMS")
-            elif error_type == "connection":
-                raise ValidationError("Erreur de connexion au service SMS")
-            else:
-                raise ValidationError(f"Erreur envoi SMS: {result.get('error')}")
-
     @classmethod
     def send_activation_sms(cls, phone: str, code: str):
         """
         Envoie un SMS d'activation avec le code.
         """
         message = f"Votre code d'activation VIACAREME est: {code}. Valide 15 minutes."
-        cls._send_sms(phone, message)
+        return cls._send_sms(phone, message, expire_at=timezone.now() + timedelta(minutes=15))
 
     @classmethod
     def send_generic_sms(cls, phone: str, message: str):
         """
         Envoie un SMS générique.
         """
-        cls._send_sms(phone, message)
\ No newline at end of file
+        return cls._send_sms(phone, message)
\ No newline at end of file
@@ -49,9 +49,7 @@ class TOTPService:
 
     @staticmethod
     def start_totp_setup(email: str) -> Dict[str, str]:
-        # Nettoyage des anciens
-        TOTPSetupToken.clean_expired()
-
+        # Les jetons expirés sont purgés par la commande purge_expired (hors requête)
         secret = TOTPService.generate_secret()
         uri = TOTPService.provisioning_uri(secret, email)
         qr_url = TOTPService._upload_qr_image_from_uri(uri, email)
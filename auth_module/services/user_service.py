@@ -42,6 +42,7 @@ def normalize_phone(phone: str) -> str:
     """
     Transforme le numéro au format +243... pour la RDC.
     - Si commence par +243, ne rien faire.
+    - Si commence par 243 (indicatif sans +), ajouter le +.
     - Si commence par 0, enlever le 0 et mettre +243.
     - Sinon, ajouter +243 au début.
     """
@@ -49,6 +50,8 @@ def normalize_phone(phone: str) -> str:
         return None
     if phone.startswith("+243"):
         return phone
+    elif phone.startswith("243"):
+        return "+" + phone
     elif phone.startswith("0"):
         return "+243" + phone[1:]
     else:
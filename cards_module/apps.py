@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CardsModuleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cards_module'
+
+    def ready(self):
+        from cards_module import checks, signals  # noqa: F401
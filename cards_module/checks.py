@@ -0,0 +1,11 @@
+# cards_module/checks.py
+from django.core.checks import Tags, register
+
+from jali_django_api.checks import shared_cache_check
+
+
+@register(Tags.caches)
+def device_cache_check(app_configs, **kwargs):
+    return shared_cache_check(
+        "CARDS_DEVICE_SHARED_CACHE", "l'anti-rejeu et l'invalidation des lecteurs RFID", "cards_module.W001"
+    )
@@ -0,0 +1,168 @@
+# cards_module/device_auth.py
+import hashlib
+import hmac
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Device
+
+logger = logging.getLogger(__name__)
+
+# En-têtes envoyés par le lecteur RFID
+HEADER_DEVICE_ID = "HTTP_X_DEVICE_ID"
+HEADER_TIMESTAMP = "HTTP_X_DEVICE_TIMESTAMP"
+HEADER_SIGNATURE = "HTTP_X_DEVICE_SIGNATURE"
+
+
+def _shared_cache():
+    """Cache partagé entre workers : signatures déjà vues et version des devices."""
+    return caches[getattr(settings, "CARDS_DEVICE_SHARED_CACHE", "shared")]
+
+
+def sign_request(cle, device_id, timestamp, method, path, body):
+    """
+    Signature attendue d'une requête de scan : HMAC-SHA256 (hex) avec la clé du device de
+    "<timestamp>\n<device_id>\n<METHOD>\n<path>\n" suivi du corps brut. `path` inclut la
+    chaîne de requête (request.get_full_path(), ex. "/api/cards/scan/?device_id=3").
+    """
+    message = f"{timestamp}\n{device_id}\n{method.upper()}\n{path}\n".encode() + (body or b"")
+    return hmac.new(cle.encode(), message, hashlib.sha256).hexdigest()
+
+
+class DeviceCache:
+    """
+    Devices actifs gardés en mémoire du processus pendant `ttl` secondes : un scan
+    ne relit pas la table Device. Un device absent ou inactif est aussi mémorisé
+    (moins longtemps) pour qu'un lecteur inconnu ne touche pas la base à chaque scan.
+
+    Invalidé par cards_module.signals à l'enregistrement ou la suppression d'un
+    Device : l'entrée locale est retirée et un numéro de version est incrémenté dans
+    le cache partagé. Les autres workers relisent ce numéro au plus toutes les
+    `sync_interval` secondes et vident leur cache s'il a changé : un lecteur désactivé
+    (volé) est refusé partout après ce délai, pas après le TTL.
+    """
+    VERSION_KEY = "cards:device_cache_version"
+
+    def __init__(self, ttl=300, negative_ttl=30, sync_interval=5):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.sync_interval = sync_interval
+        self._devices = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self._next_sync = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            ttl=getattr(settings, "CARDS_DEVICE_CACHE_TTL", 300),
+            negative_ttl=getattr(settings, "CARDS_DEVICE_CACHE_NEGATIVE_TTL", 30),
+            sync_interval=getattr(settings, "CARDS_DEVICE_CACHE_SYNC", 5),
+        )
+
+    def _sync(self, now):
+        """Vide le cache local si un autre processus a modifié un Device depuis la dernière lecture."""
+        if now < self._next_sync:
+            return
+        version = _shared_cache().get(self.VERSION_KEY, 0)
+        with self._lock:
+            if version != self._version:
+                self._devices.clear()
+                self._version = version
+            self._next_sync = now + self.sync_interval
+
+    def get(self, device_id):
+        """Device actif (instance en lecture seule) ou None."""
+        now = time.monotonic()
+        self._sync(now)
+        entree = self._devices.get(device_id)
+        if entree is not None and entree[0] > now:
+            return entree[1]
+        device = Device.objects.filter(id=device_id, actif=True).only(
+            "id", "nom", "numero_serie", "cle_authentification", "hopital", "actif"
+        ).first()
+        with self._lock:
+            self._devices[device_id] = (now + (self.ttl if device else self.negative_ttl), device)
+        return device
+
+    def invalidate(self, device_id):
+        with self._lock:
+            self._devices.pop(device_id, None)
+        cache = _shared_cache()
+        if not cache.add(self.VERSION_KEY, 1, timeout=None):
+            try:
+                cache.incr(self.VERSION_KEY)
+            except ValueError:  # clé supprimée entre add() et incr()
+                cache.set(self.VERSION_KEY, 1, timeout=None)
+
+    def clear(self):
+        with self._lock:
+            self._devices.clear()
+
+
+device_cache = DeviceCache.from_settings()
+
+
+def _device_id_param(request):
+    device_id = request.query_params.get("device_id")
+    if device_id is None and not request.content_type.startswith("text/plain"):
+        device_id = request.data.get("device_id")
+    return device_id
+
+
+def authenticate_device(request):
+    """
+    Authentifie le lecteur d'une requête de scan ; retourne (device, None) ou (None, Response d'erreur).
+
+    Le device vient de l'en-tête X-Device-Id (sinon du paramètre device_id). S'il a une
+    cle_authentification, la requête doit porter X-Device-Timestamp (epoch, en secondes,
+    à CARDS_DEVICE_SIGNATURE_SKEW près) et X-Device-Signature (voir sign_request). Une
+    signature déjà acceptée pendant cette fenêtre est refusée (rejeu), via le cache
+    partagé CARDS_DEVICE_SHARED_CACHE.
+    Un device sans clé est refusé, sauf si CARDS_DEVICE_REQUIRE_SIGNATURE est faux
+    (migration des lecteurs) : il est alors accepté avec un avertissement dans les logs.
+    À appeler avant request.data : la signature porte sur le corps brut.
+    """
+    body = request.body
+    device_id = request.META.get(HEADER_DEVICE_ID) or _device_id_param(request)
+    try:
+        device_id = int(device_id)
+    except (ValueError, TypeError):
+        return None, Response({"detail": "device_id invalide."}, status=status.HTTP_400_BAD_REQUEST)
+
+    device = device_cache.get(device_id)
+    if not device:
+        return None, Response({"detail": "Device introuvable ou inactif."}, status=status.HTTP_404_NOT_FOUND)
+
+    if not device.cle_authentification:
+        if getattr(settings, "CARDS_DEVICE_REQUIRE_SIGNATURE", True):
+            return None, Response({"detail": "Device sans clé d'authentification."}, status=status.HTTP_403_FORBIDDEN)
+        logger.warning(f"Scan accepté sans signature : device {device_id} sans cle_authentification")
+        return device, None
+
+    timestamp = request.META.get(HEADER_TIMESTAMP, "")
+    signature = request.META.get(HEADER_SIGNATURE, "")
+    try:
+        decalage = abs(time.time() - int(timestamp))
+    except ValueError:
+        decalage = None
+    if decalage is None or decalage > getattr(settings, "CARDS_DEVICE_SIGNATURE_SKEW", 300):
+        return None, Response({"detail": "Horodatage de la requête absent ou expiré."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    attendue = sign_request(
+        device.cle_authentification, device_id, timestamp, request.method, request.get_full_path(), body
+    )
+    if not hmac.compare_digest(attendue.encode(), signature.lower().encode()):
+        return None, Response({"detail": "Signature du device invalide."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    # Rejeu : un horodatage accepté reste valide jusqu'à `skew` dans le futur, d'où 2 * skew
+    skew = getattr(settings, "CARDS_DEVICE_SIGNATURE_SKEW", 300)
+    if not _shared_cache().add(f"cards:device_sig:{device_id}:{timestamp}:{attendue}", 1, timeout=2 * skew):
+        return None, Response({"detail": "Requête déjà reçue (rejeu)."}, status=status.HTTP_401_UNAUTHORIZED)
+    return device, None
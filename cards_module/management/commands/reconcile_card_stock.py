@@ -0,0 +1,21 @@
+# cards_module/management/commands/reconcile_card_stock.py
+from django.core.management.base import BaseCommand
+
+from cards_module.services import InventoryService
+
+
+class Command(BaseCommand):
+    help = "Vérifie les compteurs StockCarte contre le décompte réel du registre (--fix pour les corriger)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Réécrire les compteurs faux.")
+
+    def handle(self, *args, **options):
+        ecarts = InventoryService.reconcile(fix=options["fix"])
+        if not ecarts:
+            self.stdout.write(self.style.SUCCESS("Compteurs de stock conformes au registre."))
+            return
+        for hopital_id, statut, compteur, reel in ecarts:
+            self.stdout.write(f"{hopital_id or 'central'} {statut} : compteur {compteur}, réel {reel}")
+        message = f"{len(ecarts)} écart(s)" + (" corrigé(s)." if options["fix"] else " (relancer avec --fix).")
+        self.stdout.write(self.style.WARNING(message) if not options["fix"] else self.style.SUCCESS(message))
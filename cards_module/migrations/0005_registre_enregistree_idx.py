@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards_module', '0004_alter_device_hopital_alter_device_nom_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registrecarte',
+            index=models.Index(condition=models.Q(('statut', 'ENREGISTREE')), fields=['id'], name='registre_enregistree_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards_module', '0005_registre_enregistree_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sessionscan',
+            index=models.Index(condition=models.Q(('statut', 'PENDING')), fields=['expires_at'], name='sessionscan_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionscan',
+            index=models.Index(fields=['expires_at'], name='sessionscan_expires_idx'),
+        ),
+    ]
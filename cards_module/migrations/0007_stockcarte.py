@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def initialiser_stock(apps, schema_editor):
+    """Compteurs initiaux à partir du registre existant (hôpital = celui du lot de livraison)."""
+    RegistreCarte = apps.get_model("cards_module", "RegistreCarte")
+    StockCarte = apps.get_model("cards_module", "StockCarte")
+    comptages = (
+        RegistreCarte.objects.values("statut", "lot_details__lot__hopital_id")
+        .annotate(n=models.Count("id", distinct=True)).order_by()
+    )
+    StockCarte.objects.bulk_create([
+        StockCarte(hopital_id=c["lot_details__lot__hopital_id"], statut=c["statut"], total=c["n"]) for c in comptages
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards_module', '0006_expiry_indexes'),
+        ('hospital_module', '0002_hopital_zone_de_sante'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCarte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statut', models.CharField(choices=[('ENREGISTREE', 'Enregistrée'), ('LIVREE', 'Livrée'), ('AFFECTEE', 'Affectée'), ('PERDUE', 'Perdue'), ('ENDOMMAGEE', 'Endommagée')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hopital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_cartes', to='hospital_module.hopital')),
+            ],
+            options={
+                'db_table': 'stock_carte',
+                'constraints': [models.UniqueConstraint(fields=('hopital', 'statut'), name='uniq_stock_carte'), models.UniqueConstraint(condition=models.Q(('hopital__isnull', True)), fields=('statut',), name='uniq_stock_carte_central')],
+            },
+        ),
+        migrations.RunPython(initialiser_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards_module', '0007_stockcarte'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='sessionscan',
+            name='sessionscan_pending_idx',
+        ),
+    ]
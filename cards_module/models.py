@@ -34,6 +34,12 @@ class RegistreCarte(models.Model):
     date_enregistrement = models.DateTimeField(default=timezone.now)
     enregistre_par_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="cartes_enregistrees")
 
+    class Meta:
+        indexes = [
+            # Stock disponible pour les lots (LotService.create_lot_by_count)
+            models.Index(fields=["id"], name="registre_enregistree_idx", condition=models.Q(statut="ENREGISTREE")),
+        ]
+
     def __str__(self):
         return f"{self.uid_rfid} - {self.statut}"
 
@@ -61,6 +67,31 @@ class LotCarteDetail(models.Model):
 
 
 
+class StockCarte(models.Model):
+    """
+    Compteur de cartes par (hôpital, statut), tenu à jour dans la transaction de
+    chaque mouvement (InventoryService). hopital vide = stock central (cartes
+    ENREGISTREE pas encore livrées). Vérifié par la commande reconcile_card_stock.
+    """
+    hopital = models.ForeignKey(Hopital, on_delete=models.CASCADE, null=True, blank=True, related_name="stock_cartes")
+    statut = models.CharField(max_length=20, choices=RegistreCarte.UID_STATUS)
+    total = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "stock_carte"
+        constraints = [
+            models.UniqueConstraint(fields=["hopital", "statut"], name="uniq_stock_carte"),
+            # NULL n'est pas unique en SQL : contrainte dédiée au stock central
+            models.UniqueConstraint(
+                fields=["statut"], condition=models.Q(hopital__isnull=True), name="uniq_stock_carte_central"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Stock {self.hopital_id or 'central'} {self.statut} : {self.total}"
+
+
 class SessionScan(models.Model):
     ACTION_CHOICES = (
         ("ENREGISTREMENT", "Enregistrement"),
@@ -84,6 +115,14 @@ class SessionScan(models.Model):
     expires_at = models.DateTimeField()
     closed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # purge_expired : suppression (expires_at < limite, tous statuts) et passage en EXPIRED
+            # (statut PENDING, expires_at < maintenant : plage de l'index, statut filtré sur les lignes
+            # pas encore purgées, soit EXPIRY_SWEEP_RETENTION_HOURS de sessions au plus)
+            models.Index(fields=["expires_at"], name="sessionscan_expires_idx"),
+        ]
+
     def is_valid(self):
         return self.statut == "PENDING" and timezone.now() < self.expires_at
 
@@ -0,0 +1,9 @@
+# cards_module/pagination.py
+from rest_framework.pagination import PageNumberPagination
+
+
+class RegistreCartePagination(PageNumberPagination):
+    """Pagination du registre des cartes : ?page=&page_size= (borné à max_page_size)."""
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
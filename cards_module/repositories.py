@@ -1,4 +1,6 @@
 # cards_module/repositories.py
+import hashlib
+
 from .models import RegistreCarte, SessionScan, LotCarteDetail, LotCarte
 from django.utils import timezone
 
@@ -11,12 +13,15 @@ class RegistreRepository:
             return None
         
     @staticmethod
-    def get_available_for_delivery():
-        # toutes les cartes ENREGISTREE et non encore LIVREE pour cet hôpital
-        return list(RegistreCarte.objects.filter(
-            statut="ENREGISTREE",
-         
-        ))
+    def reserve_for_delivery(nombre, aleatoire=True):
+        """
+        Verrouille jusqu'à `nombre` cartes ENREGISTREE (FOR UPDATE SKIP LOCKED) et
+        retourne [(id, uid_rfid)]. À appeler dans une transaction : les cartes
+        réservées par un lot concurrent sont sautées, jamais attribuées deux fois.
+        """
+        cartes = RegistreCarte.objects.select_for_update(skip_locked=True).filter(statut="ENREGISTREE")
+        cartes = cartes.order_by("?") if aleatoire else cartes.order_by("id")
+        return list(cartes.values_list("id", "uid_rfid")[:nombre])
 
 
     @staticmethod
@@ -25,6 +30,33 @@ class RegistreRepository:
         numero = f"VC-{int(timezone.now().timestamp())}-{uid[-4:]}"
         return RegistreCarte.objects.create(numero_serie=numero, uid_rfid=uid, enregistre_par_user=user, est_viacareme=est_viacareme)
 
+    @staticmethod
+    def existing_uids(uids):
+        """UID déjà présents dans le registre, en une requête."""
+        return set(RegistreCarte.objects.filter(uid_rfid__in=uids).values_list("uid_rfid", flat=True))
+
+    @staticmethod
+    def bulk_register(uids, user=None):
+        """Enregistre des cartes Viacareme (statut ENREGISTREE) en un INSERT ; retourne les lignes créées."""
+        horodatage = int(timezone.now().timestamp())
+        max_length = RegistreCarte._meta.get_field("numero_serie").max_length
+
+        # L'UID complet (unique) dans le numéro de série : pas de collision au sein d'un lot.
+        # UID trop long pour le champ : empreinte SHA-256 de l'UID à la place
+        def numero_serie(uid):
+            numero = f"VC-{horodatage}-{uid}"
+            if len(numero) > max_length:
+                numero = f"VC-{horodatage}-{hashlib.sha256(uid.encode()).hexdigest()}"
+            return numero
+
+        return RegistreCarte.objects.bulk_create([
+            RegistreCarte(
+                numero_serie=numero_serie(uid), uid_rfid=uid, statut="ENREGISTREE",
+                est_viacareme=True, enregistre_par_user=user,
+            )
+            for uid in uids
+        ], batch_size=1000)
+
 class SessionRepository:
     @staticmethod
     def get_valid_by_token(token):
@@ -36,7 +68,21 @@ class SessionRepository:
             return s
         return None
 
+    @staticmethod
+    def lock_valid_by_token(token):
+        """Comme get_valid_by_token, en verrouillant la session (lots de scans d'une même session sérialisés)."""
+        s = SessionScan.objects.select_for_update().filter(token=token).first()
+        if s is not None and s.is_valid():
+            return s
+        return None
+
 class LotRepository:
     @staticmethod
     def add_detail(lot: LotCarte, registre):
         return LotCarteDetail.objects.create(lot=lot, registre=registre)
+
+    @staticmethod
+    def add_details(lot: LotCarte, registre_ids):
+        return LotCarteDetail.objects.bulk_create(
+            [LotCarteDetail(lot=lot, registre_id=registre_id) for registre_id in registre_ids], batch_size=1000
+        )
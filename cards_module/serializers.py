@@ -8,6 +8,7 @@ class DeviceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Device
         fields = "__all__"
+        extra_kwargs = {"cle_authentification": {"write_only": True}}  # clé HMAC du lecteur (device_auth)
 
 class RegistreCarteSerializer(serializers.ModelSerializer):
     class Meta:
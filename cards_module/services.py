@@ -1,13 +1,13 @@
 # cards_module/services.py
 
-from django.db import transaction
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
 from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework import status
 
-import random
 
-from cards_module.models import CarteAttribuee, LotCarte, LotCarteDetail, RegistreCarte, SessionScan
+from cards_module.models import CarteAttribuee, LotCarte, LotCarteDetail, RegistreCarte, SessionScan, StockCarte
 from hospital_module.repositories import HopitalRepository
 from patiente__module.models.patiente import Patiente
 from .repositories import RegistreRepository, SessionRepository, LotRepository
@@ -33,6 +33,93 @@ class SessionService:
         session.mark_completed()
 
 
+class InventoryService:
+    """
+    Compteurs de stock StockCarte par (hôpital, statut). Chaque mouvement de cartes
+    appelle ajuster() en dernier dans sa transaction, APRÈS avoir écrit les cartes : les
+    compteurs (dont la ligne centrale (None, "ENREGISTREE"), commune à tous les lots)
+    ne restent verrouillés que jusqu'au commit, pas pendant l'écriture des cartes.
+    reconcile() verrouille la table des compteurs : un mouvement non validé n'est pas
+    vu dans le registre et son delta attend la fin du recomptage.
+    Hôpital d'une carte = celui de son lot (None avant livraison).
+    """
+
+    @staticmethod
+    def ajuster(deltas):
+        """Applique {(hopital_id | None, statut): delta} ; une requête UPDATE par compteur."""
+        deltas = {cle: n for cle, n in deltas.items() if n}
+        if not deltas:
+            return
+        StockCarte.objects.bulk_create(
+            [StockCarte(hopital_id=hopital_id, statut=statut) for hopital_id, statut in deltas],
+            ignore_conflicts=True,
+        )
+        # Ordre fixe : deux mouvements concurrents verrouillent les compteurs dans le même ordre
+        for (hopital_id, statut), n in sorted(deltas.items(), key=lambda d: (d[0][0] or 0, d[0][1])):
+            StockCarte.objects.filter(hopital_id=hopital_id, statut=statut).update(total=F("total") + n)
+
+    @staticmethod
+    @transaction.atomic
+    def transition(carte_ids, statut):
+        """Change le statut de cartes (ex. PERDUE, ENDOMMAGEE) et les compteurs ; retourne le nombre de cartes."""
+        ids = list(
+            RegistreCarte.objects.select_for_update().filter(id__in=carte_ids)
+            .exclude(statut=statut).values_list("id", flat=True)
+        )
+        deltas = {}
+        for groupe in InventoryService._comptages(RegistreCarte.objects.filter(id__in=ids)):
+            hopital_id, n = groupe["lot_details__lot__hopital_id"], groupe["n"]
+            deltas[(hopital_id, groupe["statut"])] = deltas.get((hopital_id, groupe["statut"]), 0) - n
+            deltas[(hopital_id, statut)] = deltas.get((hopital_id, statut), 0) + n
+        RegistreCarte.objects.filter(id__in=ids).update(statut=statut)
+        InventoryService.ajuster(deltas)
+        return len(ids)
+
+    @staticmethod
+    def _comptages(cartes):
+        return (
+            cartes.values("statut", "lot_details__lot__hopital_id")
+            .annotate(n=Count("id", distinct=True)).order_by()
+        )
+
+    @staticmethod
+    def stock(hopital_id=None):
+        """{hopital_id | None: {statut: total}} lu dans les compteurs (une requête, sans parcourir le registre)."""
+        compteurs = StockCarte.objects.all()
+        if hopital_id is not None:
+            compteurs = compteurs.filter(hopital_id=hopital_id)
+        stock = {}
+        for hop, statut, total in compteurs.values_list("hopital_id", "statut", "total"):
+            stock.setdefault(hop, {})[statut] = total
+        return stock
+
+    @staticmethod
+    @transaction.atomic
+    def reconcile(fix=False):
+        """
+        Compare les compteurs au décompte réel du registre ; retourne les écarts
+        [(hopital_id, statut, compteur, réel)] et, avec fix, réécrit les compteurs.
+        """
+        if connection.vendor == "postgresql":
+            # Bloque les mouvements le temps du recomptage (ils attendent sur les compteurs)
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {StockCarte._meta.db_table} IN SHARE ROW EXCLUSIVE MODE")
+        reels = {
+            (c["lot_details__lot__hopital_id"], c["statut"]): c["n"]
+            for c in InventoryService._comptages(RegistreCarte.objects.all())
+        }
+        compteurs = {(hop, statut): total for hop, statut, total in StockCarte.objects.values_list("hopital_id", "statut", "total")}
+        ecarts = sorted(
+            ((hop, statut, compteurs.get((hop, statut), 0), reels.get((hop, statut), 0))
+             for hop, statut in set(reels) | set(compteurs)
+             if compteurs.get((hop, statut), 0) != reels.get((hop, statut), 0)),
+            key=lambda e: (e[0] or 0, e[1]),
+        )
+        if fix and ecarts:
+            InventoryService.ajuster({(hop, statut): reel - compteur for hop, statut, compteur, reel in ecarts})
+        return ecarts
+
+
 class CardService:
     @staticmethod
     @transaction.atomic
@@ -58,6 +145,7 @@ class CardService:
             registre.est_viacareme = True
             registre.save()
             SessionService.close_session(session)
+            InventoryService.ajuster({(None, "ENREGISTREE"): 1})
 
             return Response({
                 "action": "registered",
@@ -69,12 +157,76 @@ class CardService:
         # Si type de session inconnu
         return Response({"message": "Type de session inconnu."}, status=status.HTTP_400_BAD_REQUEST)
 
+    @staticmethod
+    @transaction.atomic
+    def handle_scan_batch(token, uids, device, close_session=True):
+        """
+        Enregistre une série d'UID pour une session ENREGISTREMENT : session et device
+        validés une fois, doublons détectés en une requête (uid_rfid__in), cartes
+        créées en un bulk_create. Retourne un résultat par UID, dans l'ordre reçu :
+        registered, duplicate (déjà au registre), duplicate_in_batch, invalid.
+        """
+        session = SessionRepository.lock_valid_by_token(token)
+        if not session:
+            return Response({"message": "Session invalide ou expirée."}, status=status.HTTP_400_BAD_REQUEST)
+        if session.device_id != device.id:
+            return Response({"message": "Device non autorisé pour cette session."}, status=status.HTTP_403_FORBIDDEN)
+        if session.type != "ENREGISTREMENT":
+            return Response({"message": "Type de session inconnu."}, status=status.HTTP_400_BAD_REQUEST)
+
+        resultats, vus, a_traiter = [], set(), []
+        for uid in uids:
+            uid = str(uid).strip() if uid is not None else ""
+            if not uid or len(uid) > 255:
+                resultats.append({"uid": uid, "outcome": "invalid"})
+            elif uid in vus:
+                resultats.append({"uid": uid, "outcome": "duplicate_in_batch"})
+            else:
+                vus.add(uid)
+                a_traiter.append(uid)
+                resultats.append({"uid": uid, "outcome": None})
+
+        # Un lot concurrent (autre session) peut insérer le même UID entre la détection et
+        # l'INSERT : on recommence une fois la détection dans un point de sauvegarde
+        for essai in range(2):
+            existants = RegistreRepository.existing_uids(a_traiter)
+            nouveaux = [uid for uid in a_traiter if uid not in existants]
+            try:
+                with transaction.atomic():
+                    crees = {r.uid_rfid: r.id for r in RegistreRepository.bulk_register(nouveaux, user=session.lance_par_user)}
+                break
+            except IntegrityError:
+                if essai:
+                    return Response({"message": "Conflit avec un autre enregistrement, renvoyer le lot."},
+                                    status=status.HTTP_409_CONFLICT)
+
+        for resultat in resultats:
+            if resultat["outcome"] is None:
+                if resultat["uid"] in crees:
+                    resultat.update(outcome="registered", registre_id=crees[resultat["uid"]])
+                else:
+                    resultat["outcome"] = "duplicate"
+        if close_session:
+            SessionService.close_session(session)
+        InventoryService.ajuster({(None, "ENREGISTREE"): len(crees)})
+
+        return Response({
+            "action": "registered",
+            "received": len(resultats),
+            "registered": len(crees),
+            "duplicates": sum(r["outcome"] in ("duplicate", "duplicate_in_batch") for r in resultats),
+            "invalid": sum(r["outcome"] == "invalid" for r in resultats),
+            "session_closed": close_session,
+            "results": resultats,
+            "status": "success"
+        }, status=status.HTTP_200_OK)
+
 
 
 class LotService:
     @staticmethod
     @transaction.atomic
-    def create_lot_by_count(numero_lot, hopital_id, livre_par_user, nombre_cartes):
+    def create_lot_by_count(numero_lot, hopital_id, livre_par_user, nombre_cartes, aleatoire=True):
         # Vérifier existence de l’hôpital
         hopital = HopitalRepository.get_by_id(hopital_id)
         if not hopital:
@@ -84,14 +236,13 @@ class LotService:
         if LotCarte.objects.filter(numero_lot__iexact=numero_lot, hopital=hopital).exists():
             return None, f"Le numéro de lot '{numero_lot}' existe déjà pour cet hôpital.", []
 
-        # Récupérer toutes les cartes disponibles pour attribution
-        cartes_disponibles = RegistreRepository.get_available_for_delivery()
-        if len(cartes_disponibles) < nombre_cartes:
-            return None, f"Stock insuffisant : {len(cartes_disponibles)} cartes disponibles.", []
-
-        # Sélection aléatoire des cartes
-        cartes_selectionnees = random.sample(cartes_disponibles, nombre_cartes)
-        cartes_uids = [c.uid_rfid for c in cartes_selectionnees]
+        # Sélection (aléatoire ou par ordre d'enregistrement) et verrouillage des cartes en base :
+        # deux lots créés en même temps ne peuvent pas recevoir la même carte
+        cartes = RegistreRepository.reserve_for_delivery(nombre_cartes, aleatoire=aleatoire)
+        if len(cartes) < nombre_cartes:
+            return None, f"Stock insuffisant : {len(cartes)} cartes disponibles.", []
+        cartes_ids = [carte_id for carte_id, _ in cartes]
+        cartes_uids = [uid for _, uid in cartes]
 
         # Créer le lot
         lot = LotCarte.objects.create(
@@ -100,11 +251,10 @@ class LotService:
             livre_par_user=livre_par_user
         )
 
-        # Ajouter les détails et mettre à jour le statut
-        for reg in cartes_selectionnees:
-            LotRepository.add_detail(lot, reg)
-            reg.statut = "LIVREE"
-            reg.save()
+        # Détails et statut (une requête chacun), puis compteurs de stock
+        LotRepository.add_details(lot, cartes_ids)
+        RegistreCarte.objects.filter(id__in=cartes_ids).update(statut="LIVREE")
+        InventoryService.ajuster({(None, "ENREGISTREE"): -len(cartes_ids), (hopital.id, "LIVREE"): len(cartes_ids)})
 
         return lot, None, cartes_uids
 
@@ -160,10 +310,11 @@ class AttributionService:
             attribuee_par=user
         )
 
-        # Mettre à jour carte + patiente
+        # Mettre à jour carte + patiente, puis les compteurs
         carte.statut = "AFFECTEE"
         carte.save()
         patiente.has_carte = True
         patiente.save()
+        InventoryService.ajuster({(hopital_id, "LIVREE"): -1, (hopital_id, "AFFECTEE"): 1})
 
         return attribution, None
\ No newline at end of file
@@ -0,0 +1,13 @@
+# cards_module/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .device_auth import device_cache
+from .models import Device
+
+
+@receiver(post_save, sender=Device)
+@receiver(post_delete, sender=Device)
+def invalider_device(sender, instance, **kwargs):
+    """Clé changée, device désactivé ou supprimé : le prochain scan relit la base."""
+    device_cache.invalidate(instance.id)
@@ -1,3 +1,200 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import time
+import uuid
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from auth_module.models.user import User
+from hospital_module.models import Gestionnaire, Hopital
+
+from .device_auth import DeviceCache, device_cache, sign_request
+from .models import Device, RegistreCarte
+from .repositories import RegistreRepository
+from .services import InventoryService, LotService
+
+
+class SignRequestTest(TestCase):
+    def test_message_signe(self):
+        attendu = hmac.new(
+            b"secret", b'1700000000\n3\nPOST\n/api/cards/scan/?device_id=3\n{"uid": "A"}', hashlib.sha256
+        ).hexdigest()
+        signature = sign_request("secret", 3, "1700000000", "post", "/api/cards/scan/?device_id=3", b'{"uid": "A"}')
+        self.assertEqual(signature, attendu)
+
+    def test_corps_vide(self):
+        self.assertEqual(
+            sign_request("secret", 3, "1700000000", "POST", "/api/cards/scan/", None),
+            sign_request("secret", 3, "1700000000", "POST", "/api/cards/scan/", b""),
+        )
+
+
+class AuthenticateDeviceTest(TestCase):
+    """Vérification de la signature d'un lecteur RFID sur api/cards/scan/."""
+
+    def setUp(self):
+        caches["shared"].clear()
+        device_cache.clear()
+        self.client = APIClient()
+        self.url = reverse("receive_scan")
+        self.device = Device.objects.create(nom="Lecteur", numero_serie="LEC-1", cle_authentification="secret")
+
+    def scan(self, device=None, timestamp=None, signature=None, body=None, path=None):
+        device = device or self.device
+        timestamp = str(int(time.time())) if timestamp is None else timestamp
+        # Token invalide : une requête authentifiée s'arrête à 400, avant le service de scan
+        body = body if body is not None else json.dumps({"token": "x", "uid": "UID-1"}).encode()
+        path = path or self.url
+        if signature is None and device.cle_authentification:
+            signature = sign_request(device.cle_authentification, device.id, timestamp, "POST", path, body)
+        entetes = {"HTTP_X_DEVICE_ID": str(device.id), "HTTP_X_DEVICE_TIMESTAMP": timestamp}
+        if signature:
+            entetes["HTTP_X_DEVICE_SIGNATURE"] = signature
+        return self.client.generic("POST", self.url, body, content_type="application/json", **entetes)
+
+    def test_signature_valide(self):
+        reponse = self.scan()
+        self.assertEqual(reponse.status_code, 400)
+        self.assertEqual(reponse.data["detail"], "Token invalide, doit être un UUID.")
+
+    def test_corps_modifie(self):
+        timestamp = str(int(time.time()))
+        signature = sign_request("secret", self.device.id, timestamp, "POST", self.url, b'{"uid": "UID-1"}')
+        reponse = self.scan(timestamp=timestamp, signature=signature)
+        self.assertEqual(reponse.status_code, 401)
+
+    def test_chaine_de_requete_non_signee(self):
+        reponse = self.scan(path=f"{self.url}?device_id={self.device.id}")
+        self.assertEqual(reponse.status_code, 401)
+
+    def test_mauvaise_cle(self):
+        timestamp = str(int(time.time()))
+        body = json.dumps({"token": "x", "uid": "UID-1"}).encode()
+        signature = sign_request("autre", self.device.id, timestamp, "POST", self.url, body)
+        self.assertEqual(self.scan(timestamp=timestamp, signature=signature, body=body).status_code, 401)
+
+    @override_settings(CARDS_DEVICE_SIGNATURE_SKEW=300)
+    def test_horodatage_expire(self):
+        reponse = self.scan(timestamp=str(int(time.time()) - 301))
+        self.assertEqual(reponse.status_code, 401)
+        self.assertEqual(reponse.data["detail"], "Horodatage de la requête absent ou expiré.")
+
+    def test_rejeu_refuse(self):
+        timestamp = str(int(time.time()))
+        self.assertEqual(self.scan(timestamp=timestamp).status_code, 400)
+        reponse = self.scan(timestamp=timestamp)
+        self.assertEqual(reponse.status_code, 401)
+        self.assertEqual(reponse.data["detail"], "Requête déjà reçue (rejeu).")
+
+    def test_device_sans_cle_refuse_par_defaut(self):
+        sans_cle = Device.objects.create(nom="Ancien", numero_serie="LEC-2")
+        self.assertEqual(self.scan(device=sans_cle).status_code, 403)
+
+    @override_settings(CARDS_DEVICE_REQUIRE_SIGNATURE=False)
+    def test_device_sans_cle_accepte_si_autorise(self):
+        sans_cle = Device.objects.create(nom="Ancien", numero_serie="LEC-2")
+        with self.assertLogs("cards_module.device_auth", level="WARNING"):
+            reponse = self.scan(device=sans_cle)
+        self.assertEqual(reponse.status_code, 400)
+
+    def test_device_desactive_refuse(self):
+        self.assertEqual(self.scan().status_code, 400)
+        self.device.actif = False
+        self.device.save()
+        self.assertEqual(self.scan().status_code, 404)
+
+
+class DeviceCacheInvalidationTest(TestCase):
+    """Une modification de Device vide le cache des autres workers (version dans le cache partagé)."""
+
+    def setUp(self):
+        caches["shared"].clear()
+        self.device = Device.objects.create(nom="Lecteur", numero_serie=f"LEC-{uuid.uuid4().hex[:8]}")
+
+    def test_invalidation_propagee(self):
+        # Deux instances = deux workers ; la seconde n'est pas prévenue par le signal
+        worker_a, worker_b = DeviceCache(sync_interval=0), DeviceCache(sync_interval=0)
+        self.assertIsNotNone(worker_b.get(self.device.id))
+
+        Device.objects.filter(id=self.device.id).update(actif=False)
+        self.assertIsNotNone(worker_b.get(self.device.id))
+
+        worker_a.invalidate(self.device.id)
+        self.assertIsNone(worker_b.get(self.device.id))
+
+    def test_version_relue_apres_sync_interval(self):
+        worker_a, worker_b = DeviceCache(sync_interval=0), DeviceCache(sync_interval=3600)
+        self.assertIsNotNone(worker_b.get(self.device.id))
+        Device.objects.filter(id=self.device.id).update(actif=False)
+        worker_a.invalidate(self.device.id)
+        self.assertIsNotNone(worker_b.get(self.device.id))
+        worker_b._next_sync = 0
+        self.assertIsNone(worker_b.get(self.device.id))
+
+
+class CartesStockTest(TestCase):
+    """Registre des cartes : pagination, perte / casse et compteurs de stock."""
+
+    def setUp(self):
+        self.superadmin = User.objects.create(
+            email="superadmin@test.cd", nom="Admin", postnom="Super", prenom="Root", role="SUPERADMIN"
+        )
+        self.hopital = Hopital.objects.create(nom="Hôpital test", adresse="a", ville="Kinshasa", province="Kinshasa")
+        self.gestionnaire = User.objects.create(
+            email="gestionnaire@test.cd", nom="Gest", postnom="G", prenom="G", role="GESTIONNAIRE"
+        )
+        Gestionnaire.objects.create(user=self.gestionnaire, hopital=self.hopital)
+        RegistreRepository.bulk_register([f"UID-{i}" for i in range(5)])
+        InventoryService.ajuster({(None, "ENREGISTREE"): 5})
+        self.lot, _, _ = LotService.create_lot_by_count("LOT-1", self.hopital.id, self.superadmin, 3, aleatoire=False)
+        self.client = APIClient()
+
+    def test_liste_paginee_par_defaut(self):
+        self.client.force_authenticate(self.superadmin)
+        reponse = self.client.get("/api/cards/?page_size=2")
+        self.assertEqual(reponse.data["count"], 5)
+        self.assertEqual(len(reponse.data["results"]), 2)
+        self.assertEqual(len(self.client.get("/api/cards/").data["results"]), 5)
+
+    def test_liste_complete_avec_all(self):
+        self.client.force_authenticate(self.superadmin)
+        reponse = self.client.get("/api/cards/?all=1")
+        self.assertIsInstance(reponse.data, list)
+        self.assertEqual(len(reponse.data), 5)
+
+    def test_compteurs_apres_lot(self):
+        self.assertEqual(InventoryService.stock(), {None: {"ENREGISTREE": 2}, self.hopital.id: {"LIVREE": 3}})
+        self.assertEqual(InventoryService.reconcile(), [])
+
+    def test_gestionnaire_declare_carte_perdue(self):
+        carte = RegistreCarte.objects.filter(statut="LIVREE").first()
+        self.client.force_authenticate(self.gestionnaire)
+        reponse = self.client.post(
+            reverse("card_status"), {"carte_ids": [carte.id], "statut": "PERDUE"}, format="json"
+        )
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.data["modifiees"], 1)
+        carte.refresh_from_db()
+        self.assertEqual(carte.statut, "PERDUE")
+        self.assertEqual(InventoryService.stock(self.hopital.id)[self.hopital.id], {"LIVREE": 2, "PERDUE": 1})
+        self.assertEqual(InventoryService.reconcile(), [])
+
+    def test_gestionnaire_carte_hors_de_son_hopital(self):
+        carte = RegistreCarte.objects.filter(statut="ENREGISTREE").first()
+        self.client.force_authenticate(self.gestionnaire)
+        reponse = self.client.post(
+            reverse("card_status"), {"carte_ids": [carte.id], "statut": "ENDOMMAGEE"}, format="json"
+        )
+        self.assertEqual(reponse.status_code, 404)
+        carte.refresh_from_db()
+        self.assertEqual(carte.statut, "ENREGISTREE")
+
+    def test_statut_refuse(self):
+        self.client.force_authenticate(self.superadmin)
+        carte = RegistreCarte.objects.first()
+        reponse = self.client.post(reverse("card_status"), {"carte_ids": [carte.id], "statut": "LIVREE"}, format="json")
+        self.assertEqual(reponse.status_code, 400)
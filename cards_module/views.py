@@ -11,12 +11,15 @@ from rest_framework.response import Response
 from hospital_module.models import Hopital
 from hospital_module.permissions import IsSuperAdmin
 from .serializers import CarteAttribueeSerializer, LotCarteHistoriqueSerializer, SessionScanCreateSerializer, SessionScanDetailSerializer, RegistreCarteSerializer, LotCarteSerializer
-from .services import AttributionService, SessionService, CardService, LotService
+from .services import AttributionService, SessionService, CardService, InventoryService, LotService
+from .device_auth import authenticate_device
+from .pagination import RegistreCartePagination
 from .models import Device, SessionScan, RegistreCarte, LotCarte
 from auth_module.models.user import User
 from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
+from django.conf import settings
 
 # permission helpers
 def is_superadmin(user):
@@ -64,9 +67,13 @@ class ReceiveScanView(APIView):
 
 
     def post(self, request):
+        # Device (cache mémoire) et signature HMAC, avant la lecture de request.data
+        device, erreur = authenticate_device(request)
+        if erreur:
+            return erreur
+
         token = request.data.get("token")
         uid = request.data.get("uid")
-        device_id = request.data.get("device_id")
 
         # Vérifier que le token est un UUID valide
         try:
@@ -75,21 +82,47 @@ class ReceiveScanView(APIView):
             return Response({"detail": "Token invalide, doit être un UUID."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # Vérifier que device_id est un entier
+        # Appel du service
+        return CardService.handle_scan(token, uid, device)
+
+
+class ReceiveScanBatchView(APIView):
+    """
+    POST /api/cards/scan/batch/
+    body JSON : { "token": UUID, "device_id": X, "uids": ["...", ...], "close_session": true (opt) }
+    ou text/plain : un UID par ligne, token / device_id / close_session en paramètres d'URL.
+    Signature du lecteur : en-têtes X-Device-Id / X-Device-Timestamp / X-Device-Signature (device_auth).
+    """
+
+    def post(self, request):
+        device, erreur = authenticate_device(request)
+        if erreur:
+            return erreur
+
+        if request.content_type.startswith("text/plain"):
+            params = request.query_params
+            uids = request.body.decode("utf-8", errors="replace").splitlines()
+        else:
+            params = request.data
+            uids = request.data.get("uids")
+        token = params.get("token")
+        close_session = str(params.get("close_session", True)).lower() not in ("false", "0")
+
         try:
-            device_id = int(device_id)
+            UUID(str(token), version=4)
         except (ValueError, TypeError):
-            return Response({"detail": "device_id invalide."},
+            return Response({"detail": "Token invalide, doit être un UUID."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # Récupération du device
-        device = Device.objects.filter(id=device_id, actif=True).first()
-        if not device:
-            return Response({"detail": "Device introuvable ou inactif."},
-                            status=status.HTTP_404_NOT_FOUND)
+        if not isinstance(uids, list) or not uids:
+            return Response({"detail": "uids doit être une liste non vide."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_uids = getattr(settings, "CARDS_SCAN_BATCH_MAX", 5000)
+        if len(uids) > max_uids:
+            return Response({"detail": f"Au plus {max_uids} UID par lot."},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        # Appel du service
-        return CardService.handle_scan(token, uid, device)
+        return CardService.handle_scan_batch(token, uids, device, close_session=close_session)
 
 class CreateLotView(APIView):
     permission_classes = [IsAuthenticated]
@@ -102,12 +135,18 @@ class CreateLotView(APIView):
         numero_lot = request.data.get("numero_lot")
         hopital_id = request.data.get("hopital_id")
         nombre_cartes = request.data.get("nombre_cartes", 0)
+        selection = request.data.get("selection", "ALEATOIRE")  # ALEATOIRE | SEQUENTIELLE
 
         if nombre_cartes <= 0:
             return Response({"message": "Le nombre de cartes doit être supérieur à zéro."},
                             status=status.HTTP_400_BAD_REQUEST)
+        if selection not in ("ALEATOIRE", "SEQUENTIELLE"):
+            return Response({"message": "selection doit valoir ALEATOIRE ou SEQUENTIELLE."},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        lot, error, cartes_uids = LotService.create_lot_by_count(numero_lot, hopital_id, user, nombre_cartes)
+        lot, error, cartes_uids = LotService.create_lot_by_count(
+            numero_lot, hopital_id, user, nombre_cartes, aleatoire=selection == "ALEATOIRE"
+        )
         if error:
             return Response({"message": error}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -151,15 +190,95 @@ class ListAVailableCardsViewByHopital(APIView):
         user = request.user
 
         if is_superadmin(user):
-            cartes = RegistreCarte.objects.all()
-          
+            cartes = RegistreCarte.objects.order_by("id")
+            if request.query_params.get("statut"):
+                cartes = cartes.filter(statut=request.query_params["statut"])
+        else:
+            return Response({"message": "Accès refusé"}, status=status.HTTP_403_FORBIDDEN)
+
+        # Paginé par défaut (?page=, ?page_size=) ; ?all=1 : liste complète, ancien format
+        if request.query_params.get("all") == "1":
+            serializer = RegistreCarteSerializer(cartes, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        paginator = RegistreCartePagination()
+        page = paginator.paginate_queryset(cartes, request)
+        return paginator.get_paginated_response(RegistreCarteSerializer(page, many=True).data)
+
 
-      
+class ChangerStatutCartesView(APIView):
+    """
+    POST /api/cards/statut/
+    body: { "carte_ids": [X, ...], "statut": "PERDUE" | "ENDOMMAGEE" }
+    Superadmin : toute carte ; gestionnaire : cartes des lots de son hôpital.
+    """
+    permission_classes = [IsAuthenticated]
+    STATUTS = ("PERDUE", "ENDOMMAGEE")
+
+    def post(self, request):
+        user = request.user
+        statut = request.data.get("statut")
+        carte_ids = request.data.get("carte_ids")
+
+        if statut not in self.STATUTS:
+            return Response({"message": "statut doit valoir PERDUE ou ENDOMMAGEE."}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(carte_ids, list) or not carte_ids or not all(isinstance(i, int) for i in carte_ids):
+            return Response({"message": "carte_ids doit être une liste d'identifiants."}, status=status.HTTP_400_BAD_REQUEST)
+
+        cartes = RegistreCarte.objects.filter(id__in=carte_ids)
+        if is_gestionnaire(user):
+            hopital_id = user.gestionnaire.hopital_id if hasattr(user, "gestionnaire") else None
+            if not hopital_id:
+                return Response({"message": "Aucun hôpital assigné"}, status=status.HTTP_403_FORBIDDEN)
+            cartes = cartes.filter(lot_details__lot__hopital_id=hopital_id)
+        elif not is_superadmin(user):
+            return Response({"message": "Accès refusé"}, status=status.HTTP_403_FORBIDDEN)
+
+        trouvees = set(cartes.values_list("id", flat=True))
+        manquantes = sorted(set(carte_ids) - trouvees)
+        if manquantes:
+            return Response({"message": "Cartes introuvables.", "carte_ids": manquantes}, status=status.HTTP_404_NOT_FOUND)
+
+        modifiees = InventoryService.transition(trouvees, statut)
+        return Response({"statut": statut, "modifiees": modifiees, "status": "success"}, status=status.HTTP_200_OK)
+
+
+class StockCartesView(APIView):
+    """
+    GET /api/cards/stock/ : stock de cartes par statut, lu dans les compteurs StockCarte.
+    Superadmin : stock central + chaque hôpital (?hopital_id= pour un seul) ; gestionnaire : son hôpital.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        if is_superadmin(user):
+            hopital_id = request.query_params.get("hopital_id")
+            if hopital_id is not None and not str(hopital_id).isdigit():
+                return Response({"message": "hopital_id invalide."}, status=status.HTTP_400_BAD_REQUEST)
+            hopital_id = int(hopital_id) if hopital_id is not None else None
+        elif is_gestionnaire(user):
+            hopital_id = user.gestionnaire.hopital_id if hasattr(user, "gestionnaire") else None
+            if not hopital_id:
+                return Response({"message": "Aucun hôpital assigné"}, status=status.HTTP_403_FORBIDDEN)
         else:
             return Response({"message": "Accès refusé"}, status=status.HTTP_403_FORBIDDEN)
 
-        serializer = RegistreCarteSerializer(cartes, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        statuts = [code for code, _ in RegistreCarte.UID_STATUS]
+        stock = InventoryService.stock(hopital_id)
+        if hopital_id is not None:
+            return Response(
+                {"hopital_id": hopital_id, "stock": {st: stock.get(hopital_id, {}).get(st, 0) for st in statuts}},
+                status=status.HTTP_200_OK,
+            )
+        return Response({
+            "central": {st: stock.get(None, {}).get(st, 0) for st in statuts},
+            "hopitaux": [
+                {"hopital_id": hop, "stock": {st: stock[hop].get(st, 0) for st in statuts}}
+                for hop in sorted(h for h in stock if h is not None)
+            ],
+            "totaux": {st: sum(compteurs.get(st, 0) for compteurs in stock.values()) for st in statuts},
+        }, status=status.HTTP_200_OK)
 
 
 class ListLivreeCardsViewByHopital(APIView):
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ConsultationModuleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'consultation_module'
+
+    def ready(self):
+        from consultation_module import signals  # noqa: F401
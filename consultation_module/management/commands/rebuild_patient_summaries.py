@@ -0,0 +1,30 @@
+# consultation_module/management/commands/rebuild_patient_summaries.py
+from django.core.management.base import BaseCommand
+
+from consultation_module.services import PatientSummaryService
+from patiente__module.models.patiente import Patiente
+
+
+class Command(BaseCommand):
+    help = "Reconstruit le modèle de lecture PatientSummary (toutes les patientes ou un hôpital)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hopital", type=int, help="Limiter à un hôpital (id).")
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        patientes = Patiente.objects.order_by("id")
+        if options["hopital"]:
+            patientes = patientes.filter(creer_a_hopital_id=options["hopital"])
+
+        batch_size = options["batch_size"]
+        batch, total = [], 0
+        for patiente_id in patientes.values_list("id", flat=True).iterator(chunk_size=batch_size):
+            batch.append(patiente_id)
+            if len(batch) >= batch_size:
+                total += len(PatientSummaryService.rebuild(batch))
+                batch = []
+        if batch:
+            total += len(PatientSummaryService.rebuild(batch))
+
+        self.stdout.write(self.style.SUCCESS(f"{total} résumé(s) patiente reconstruit(s)."))
@@ -0,0 +1,39 @@
+# consultation_module/management/commands/send_rdv_reminders.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from consultation_module.reminders import RendezVousReminderScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Met en file (outbox SMS) les rappels des rendez-vous planifiés et des prochaines "
+        "consultations d'un jour, tous hôpitaux. Relançable : un rappel n'est envoyé qu'une fois."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Jour des rendez-vous à rappeler (AAAA-MM-JJ).")
+        parser.add_argument("--days-ahead", type=int, help="Jour visé = aujourd'hui + N (défaut RDV_REMINDER_DAYS_AHEAD).")
+        parser.add_argument("--chunk-size", type=int, help="Lignes traitées par tranche (défaut RDV_REMINDER_CHUNK_SIZE).")
+        parser.add_argument("--dry-run", action="store_true", help="Compter sans rien mettre en file.")
+
+    def handle(self, *args, **options):
+        scheduler = RendezVousReminderScheduler.from_settings()
+        if options["days_ahead"] is not None:
+            scheduler.days_ahead = options["days_ahead"]
+        if options["chunk_size"]:
+            scheduler.chunk_size = options["chunk_size"]
+        jour = None
+        if options["date"]:
+            try:
+                jour = date.fromisoformat(options["date"])
+            except ValueError:
+                raise CommandError("--date doit être au format AAAA-MM-JJ")
+
+        compteurs = scheduler.run(jour, dry_run=options["dry_run"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rappels du {compteurs['date']} : {compteurs['queued']} mis en file, "
+            f"{compteurs['already_sent']} déjà envoyés, {compteurs['no_phone']} sans téléphone "
+            f"({compteurs['scanned']} lus)."
+        ))
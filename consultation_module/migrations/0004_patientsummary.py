@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:57
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultation_module', '0003_remove_consultation_tension_arterielle_and_more'),
+        ('hospital_module', '0002_hopital_zone_de_sante'),
+        ('patiente__module', '0006_patiente_recherche'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientSummary',
+            fields=[
+                ('patiente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='patiente__module.patiente')),
+                ('document', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('nb_grossesses', models.IntegerField(default=0)),
+                ('grossesse_en_cours', models.BooleanField(default=False)),
+                ('derniere_consultation', models.DateTimeField(blank=True, null=True)),
+                ('has_carte', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hopital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='patient_summaries', to='hospital_module.hopital')),
+            ],
+            options={
+                'db_table': 'patient_summary',
+                'indexes': [models.Index(fields=['hopital', 'patiente'], name='patient_summary_hop_idx')],
+            },
+        ),
+    ]
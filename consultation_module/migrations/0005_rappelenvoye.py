@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultation_module', '0004_patientsummary'),
+        ('grossesse_module', '0004_cloturegrossesse_alter_auditaction_action_type'),
+        ('medical_module', '0002_medecin_hopitaux'),
+        ('sms_sender', '0002_smscampaign'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RappelEnvoye',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('RENDEZVOUS', 'Rendez-vous'), ('CONSULTATION', 'Prochaine consultation')], max_length=20)),
+                ('objet_id', models.BigIntegerField()),
+                ('date_cible', models.DateField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'rappel_envoye',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(condition=models.Q(('prochaine_consultation__isnull', False)), fields=['prochaine_consultation'], name='consultation_prochaine_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(condition=models.Q(('statut', 'PLANIFIE')), fields=['date_rdv'], name='rdv_planifie_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='rappelenvoye',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rappels', to='sms_sender.smscampaign'),
+        ),
+        migrations.AddConstraint(
+            model_name='rappelenvoye',
+            constraint=models.UniqueConstraint(fields=('source', 'objet_id', 'date_cible'), name='uniq_rappel_envoye'),
+        ),
+    ]
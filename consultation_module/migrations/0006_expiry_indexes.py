@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultation_module', '0005_rappelenvoye'),
+        ('patiente__module', '0006_patiente_recherche'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actionotp',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['patiente', 'action', 'code_otp'], name='actionotp_valide_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actionotp',
+            index=models.Index(fields=['expire_at'], name='actionotp_expire_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 # consultation_module/models.py
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models, transaction
 from django.utils import timezone
 import uuid
@@ -45,6 +46,13 @@ class Consultation(models.Model):
 
     class Meta:
         ordering = ["-date_consultation"]
+        indexes = [
+            # Rappels de la prochaine consultation (send_rdv_reminders) : recherche par jour
+            models.Index(
+                fields=["prochaine_consultation"], name="consultation_prochaine_idx",
+                condition=models.Q(prochaine_consultation__isnull=False),
+            ),
+        ]
 
 
 class RendezVous(models.Model):
@@ -61,6 +69,41 @@ class RendezVous(models.Model):
     otp_verifie = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Rappels (send_rdv_reminders) : plage de dates sur les seuls rendez-vous planifiés
+            models.Index(fields=["date_rdv"], name="rdv_planifie_date_idx", condition=models.Q(statut="PLANIFIE")),
+        ]
+
+
+class RappelEnvoye(models.Model):
+    """
+    Rappel SMS déjà mis en file pour un rendez-vous (ou une prochaine consultation)
+    à une date donnée : la contrainte d'unicité empêche un second envoi si la
+    commande send_rdv_reminders est relancée. Un rendez-vous déplacé à une autre
+    date reçoit un nouveau rappel.
+    """
+    SOURCES = (
+        ("RENDEZVOUS", "Rendez-vous"),
+        ("CONSULTATION", "Prochaine consultation"),
+    )
+    source = models.CharField(max_length=20, choices=SOURCES)
+    objet_id = models.BigIntegerField()  # RendezVous.id, ou Grossesse.id pour une prochaine consultation
+    date_cible = models.DateField()
+    campaign = models.ForeignKey(
+        "sms_sender.SmsCampaign", on_delete=models.SET_NULL, null=True, blank=True, related_name="rappels"
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "rappel_envoye"
+        constraints = [
+            models.UniqueConstraint(fields=["source", "objet_id", "date_cible"], name="uniq_rappel_envoye"),
+        ]
+
+    def __str__(self):
+        return f"Rappel {self.source} {self.objet_id} ({self.date_cible})"
+
 
 class Vaccination(models.Model):
     DESTINE_A = (("MERE", "Mère"), ("ENFANT", "Enfant"))
@@ -91,6 +134,16 @@ class ActionOTP(models.Model):
     uid_rfid = models.CharField(max_length=255, null=True, blank=True)  # provenance scan
     attempts = models.IntegerField(default=0)  # tentative de vérification
 
+    class Meta:
+        indexes = [
+            # Vérification d'un OTP : seuls les codes non utilisés sont indexés
+            models.Index(
+                fields=["patiente", "action", "code_otp"], name="actionotp_valide_idx",
+                condition=models.Q(is_used=False),
+            ),
+            models.Index(fields=["expire_at"], name="actionotp_expire_idx"),  # purge_expired
+        ]
+
     def is_valid(self):
         return (not self.is_used) and (timezone.now() < self.expire_at) and self.attempts < 6
 
@@ -101,3 +154,29 @@ class ActionOTP(models.Model):
     def mark_used(self):
         self.is_used = True
         self.save(update_fields=["is_used"])
+
+
+class PatientSummary(models.Model):
+    """
+    Modèle de lecture dénormalisé : l'arbre complet patiente -> grossesses ->
+    dossier / consultations / rendez-vous / vaccinations + carte, précalculé.
+    Tenu à jour par consultation_module.signals, reconstruit par la commande
+    rebuild_patient_summaries.
+    """
+    patiente = models.OneToOneField(Patiente, on_delete=models.CASCADE, primary_key=True, related_name="summary")
+    hopital = models.ForeignKey(Hopital, on_delete=models.SET_NULL, null=True, blank=True, related_name="patient_summaries")
+    document = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+    nb_grossesses = models.IntegerField(default=0)
+    grossesse_en_cours = models.BooleanField(default=False)
+    derniere_consultation = models.DateTimeField(null=True, blank=True)
+    has_carte = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "patient_summary"
+        indexes = [
+            models.Index(fields=["hopital", "patiente"], name="patient_summary_hop_idx"),
+        ]
+
+    def __str__(self):
+        return f"PatientSummary<{self.patiente_id}>"
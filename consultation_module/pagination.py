@@ -0,0 +1,13 @@
+# consultation_module/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class PatienteCursorPagination(CursorPagination):
+    """
+    Pagination par curseur (keyset) sur (date_inscription, id) : pas de COUNT(*)
+    et un coût constant quelle que soit la page demandée.
+    """
+    ordering = ("date_inscription", "id")
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
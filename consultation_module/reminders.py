@@ -0,0 +1,153 @@
+# consultation_module/reminders.py
+import logging
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+
+from sms_sender.models import SmsCampaign
+from sms_sender.services import enqueue_bulk_sms, normalize_mobile_number
+
+from .models import Consultation, RappelEnvoye, RendezVous
+
+logger = logging.getLogger(__name__)
+
+
+def _tranches(iterable, size):
+    iterator = iter(iterable)
+    while tranche := list(islice(iterator, size)):
+        yield tranche
+
+
+class RendezVousReminderScheduler:
+    """
+    Rappels SMS des rendez-vous PLANIFIE et des prochaines consultations d'un jour,
+    tous hôpitaux confondus.
+
+    Les lignes sont lues en flux (.iterator(), curseur serveur sur PostgreSQL) via
+    les index partiels rdv_planifie_date_idx / consultation_prochaine_idx, puis
+    traitées par tranches de chunk_size : une requête de déduplication
+    (RappelEnvoye), un bulk_create et un enqueue_bulk_sms par tranche, dans une
+    transaction. La mémoire reste bornée quel que soit le nombre de rendez-vous.
+    """
+
+    def __init__(self, days_ahead=1, chunk_size=1000, sender_id=None):
+        self.days_ahead = days_ahead
+        self.chunk_size = chunk_size
+        self.sender_id = sender_id
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            days_ahead=getattr(settings, "RDV_REMINDER_DAYS_AHEAD", 1),
+            chunk_size=getattr(settings, "RDV_REMINDER_CHUNK_SIZE", 1000),
+            sender_id=getattr(settings, "RDV_REMINDER_SENDER_ID", None),
+        )
+
+    @staticmethod
+    def _bornes(jour):
+        debut = timezone.make_aware(datetime.combine(jour, time.min))
+        return debut, debut + timedelta(days=1)
+
+    def _rendezvous(self, jour):
+        debut, fin = self._bornes(jour)
+        lignes = (
+            RendezVous.objects.filter(statut="PLANIFIE", date_rdv__gte=debut, date_rdv__lt=fin)
+            .order_by("date_rdv", "id")
+            .values_list(
+                "id", "date_rdv", "grossesse__patiente__user__telephone",
+                "grossesse__patiente__creer_a_hopital__nom",
+            )
+        )
+        for rdv_id, date_rdv, telephone, hopital in lignes.iterator(chunk_size=self.chunk_size):
+            heure = timezone.localtime(date_rdv).strftime("%H:%M")
+            yield "RENDEZVOUS", rdv_id, telephone, (
+                f"ViaCareme: Rappel de votre rendez-vous prénatal le {jour:%d/%m/%Y} à {heure}"
+                + (f" - {hopital}" if hopital else "") + "."
+            )
+
+    def _consultations(self, jour):
+        debut, fin = self._bornes(jour)
+        # Une prochaine consultation déjà couverte par un rendez-vous planifié ce jour-là n'est pas rappelée deux fois
+        rdv_du_jour = RendezVous.objects.filter(
+            grossesse_id=OuterRef("grossesse_id"), statut="PLANIFIE", date_rdv__gte=debut, date_rdv__lt=fin
+        )
+        # Seule la dernière consultation de la grossesse fait foi : une date fixée puis reportée n'est pas rappelée
+        derniere = (
+            Consultation.objects.filter(grossesse_id=OuterRef("grossesse_id"))
+            .order_by("-date_consultation", "-id")
+            .values("id")[:1]
+        )
+        lignes = (
+            Consultation.objects.filter(prochaine_consultation=jour, grossesse__statut="EN_COURS")
+            .filter(id=Subquery(derniere))
+            .exclude(Exists(rdv_du_jour))
+            .order_by("grossesse_id")
+            .values_list("grossesse_id", "grossesse__patiente__user__telephone", "grossesse__patiente__creer_a_hopital__nom")
+        )
+        for grossesse_id, telephone, hopital in lignes.iterator(chunk_size=self.chunk_size):
+            yield "CONSULTATION", grossesse_id, telephone, (
+                f"ViaCareme: Rappel de votre consultation prénatale le {jour:%d/%m/%Y}"
+                + (f" - {hopital}" if hopital else "") + "."
+            )
+
+    def _traiter(self, jour, tranche, campaign, compteurs, dry_run):
+        restants = tranche
+        while restants:
+            deja = set(
+                RappelEnvoye.objects.filter(
+                    date_cible=jour, source=restants[0][0], objet_id__in=[objet_id for _, objet_id, _, _ in restants]
+                ).values_list("objet_id", flat=True)
+            )
+            nouveaux, destinataires, a_envoyer = [], [], []
+            for ligne in restants:
+                source, objet_id, telephone, message = ligne
+                if objet_id in deja:
+                    compteurs["already_sent"] += 1
+                    continue
+                # Même format que les OTP (enqueue_sms) : 243XXXXXXXXX
+                numero = normalize_mobile_number(telephone)
+                if not numero:
+                    compteurs["no_phone"] += 1
+                    continue
+                a_envoyer.append(ligne)
+                nouveaux.append(RappelEnvoye(source=source, objet_id=objet_id, date_cible=jour, campaign=campaign))
+                destinataires.append({"mobile_number": numero, "message": message, "reference": f"{source.lower()}:{objet_id}"})
+            if dry_run or not nouveaux:
+                compteurs["queued"] += len(nouveaux)
+                return
+            _, fin = self._bornes(jour)
+            try:
+                with transaction.atomic():
+                    RappelEnvoye.objects.bulk_create(nouveaux)
+                    enqueue_bulk_sms(destinataires, campaign.nom, sender_id=self.sender_id, expire_at=fin, campaign=campaign)
+            except IntegrityError:
+                # Une autre exécution a validé une partie de ces rappels : ils sont visibles à la
+                # prochaine déduplication, on retente le reste (la liste raccourcit à chaque conflit)
+                logger.warning(f"Rappels du {jour} : conflit avec une autre exécution, nouvel essai sur {len(a_envoyer)} rappels")
+                restants = a_envoyer
+                continue
+            compteurs["queued"] += len(nouveaux)
+            return
+
+    def run(self, jour=None, dry_run=False):
+        """Met en file les rappels du jour `jour` (par défaut aujourd'hui + days_ahead) ; retourne les compteurs."""
+        jour = jour or timezone.localdate() + timedelta(days=self.days_ahead)
+        compteurs = {"date": jour.isoformat(), "scanned": 0, "queued": 0, "already_sent": 0, "no_phone": 0}
+        campaign = None
+        if not dry_run:
+            campaign = SmsCampaign.objects.create(nom=f"Rappels rendez-vous {jour:%d/%m/%Y}", sender_id=self.sender_id)
+        for lignes in (self._rendezvous(jour), self._consultations(jour)):
+            for tranche in _tranches(lignes, self.chunk_size):
+                compteurs["scanned"] += len(tranche)
+                self._traiter(jour, tranche, campaign, compteurs, dry_run)
+        if campaign is not None:
+            compteurs["campaign_id"] = campaign.id
+            if not compteurs["queued"]:
+                campaign.delete()  # relance sans nouveau rappel : pas de campagne vide
+                compteurs["campaign_id"] = None
+        logger.info(f"Rappels de rendez-vous : {compteurs}")
+        return compteurs
@@ -1,7 +1,10 @@
 # consultation_module/repositories.py
+from django.db.models import Prefetch
 from django.utils import timezone
 from .models import ActionOTP, Consultation, RendezVous, Vaccination
 from cards_module.models import RegistreCarte, CarteAttribuee
+from grossesse_module.models import Grossesse
+from medical_module.models.medecin import Medecin
 
 class OtpRepository:
     @staticmethod
@@ -40,3 +43,24 @@ class CardRepository:
             return attrib.patiente
         except Exception:
             return None
+
+
+class DossierPatienteRepository:
+    @staticmethod
+    def with_full_info(queryset):
+        """
+        Charge l'arbre complet patiente -> grossesses -> dossier / consultations /
+        rendez-vous / vaccinations en un nombre fixe de requêtes, quel que soit
+        le nombre de patientes.
+        """
+        grossesses = Grossesse.objects.select_related("dossier").prefetch_related(
+            Prefetch("consultations", queryset=Consultation.objects.all()),
+            Prefetch("rendezvous", queryset=RendezVous.objects.all()),
+            Prefetch("vaccinations", queryset=Vaccination.objects.all()),
+        )
+        return queryset.select_related(
+            "user", "creer_a_hopital", "attribution__carte"
+        ).prefetch_related(
+            Prefetch("medecins", queryset=Medecin.objects.select_related("user")),
+            Prefetch("grossesses", queryset=grossesses),
+        )
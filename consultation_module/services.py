@@ -2,16 +2,27 @@
 from django.utils import timezone
 from datetime import timedelta
 from django.db import transaction
-from .repositories import OtpRepository, CardRepository
-from .models import ActionOTP, Consultation, RendezVous, Vaccination
+import json
+import logging
+import random
+from dateutil.relativedelta import relativedelta
+from rest_framework.utils.encoders import JSONEncoder
+from .repositories import OtpRepository, CardRepository, DossierPatienteRepository
+from .models import ActionOTP, Consultation, RendezVous, Vaccination, PatientSummary
+from .serializers import ConsultationSerializer, RendezVousSerializer, VaccinationSerializer
 from auth_module.models.user import User
-from sms_sender.services import send_sms_via_md
+from sms_sender.services import enqueue_sms
 from grossesse_module.models import Grossesse, DossierObstetrical
+from grossesse_module.serializers import GrossesseSerializer, DossierObstetricalSerializer
+from patiente__module.models.patiente import Patiente
+from patiente__module.serializers.patiente_serializers import PatienteBaseSerializer
 
+logger = logging.getLogger(__name__)
 
 
 
-def create_otp_by_rfid(uid_rfid: str, action: str, expiry_minutes: int = 120):
+
+def create_otp_by_rfid(uid_rfid: str, action: str, expiry_minutes: int = 120, created_by=None):
     """
     Scan RFID -> retrouve patiente -> crée OTP -> envoie SMS -> retourne dict avec succès, message, infos patiente, grossesse, etc.
     """
@@ -22,8 +33,18 @@ def create_otp_by_rfid(uid_rfid: str, action: str, expiry_minutes: int = 120):
             "error": "Carte non associée à une patiente"
         }
 
+    phone = getattr(patiente.user, "telephone", None)
+    if not phone:
+        return {
+            "success": False,
+            "error": "Aucun numéro de téléphone pour cette patiente"
+        }
+    # Numéro normalisé (243...) par enqueue_sms, comme pour les campagnes et les rappels
+
     code = ActionOTP.generate_code()
     expire_at = timezone.now() + timedelta(minutes=expiry_minutes)
+    # OTP et SMS (outbox) dans la même transaction : l'envoi est fait par dispatch_sms_outbox,
+    # la requête n'attend pas la passerelle SMS
     with transaction.atomic():
         otp = OtpRepository.create(
             patiente=patiente,
@@ -32,49 +53,8 @@ def create_otp_by_rfid(uid_rfid: str, action: str, expiry_minutes: int = 120):
             expire_at=expire_at,
             uid_rfid=uid_rfid
         )
-        phone = getattr(patiente.user, "telephone", None)
-        if not phone:
-            return {
-                "success": False,
-                "error": "Aucun numéro de téléphone pour cette patiente"
-            }
-        # Normalize phone to start with 2438 and be 12 characters
-        phone = phone.lstrip('+').lstrip('0')
-        if not phone.startswith('243'):
-            phone = '243' + phone
-        if len(phone) > 12:
-            phone = phone[:12]
-        elif len(phone) < 12:
-            phone = phone.ljust(12, '0')  # pad with 0 if shorter, though unlikely
         message = f"ViaCareme: Code OTP pour {action}: {code}. Valide {expiry_minutes} min."
-        sms_result = send_sms_via_md(message, phone)
-        if not sms_result.get("success"):
-            error_type = sms_result.get("error_type")
-            if error_type == "api_error":
-                return {
-                    "success": False,
-                    "error": f"Erreur API SMS: {sms_result.get('api_error_code')} - {sms_result.get('api_error_description')}"
-                }
-            elif error_type == "timeout":
-                return {
-                    "success": False,
-                    "error": "Timeout lors de l'envoi du SMS"
-                }
-            elif error_type == "connection":
-                return {
-                    "success": False,
-                    "error": "Erreur de connexion lors de l'envoi du SMS"
-                }
-            elif error_type == "config":
-                return {
-                    "success": False,
-                    "error": "Configuration manquante pour l'envoi du SMS"
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"Erreur inconnue lors de l'envoi du SMS: {sms_result.get('error')}"
-                }
+        sms = enqueue_sms(message, phone, reference=f"otp:{otp.id}", expire_at=expire_at, created_by=created_by)
 
 
     # Basic patient info
@@ -135,6 +115,7 @@ def create_otp_by_rfid(uid_rfid: str, action: str, expiry_minutes: int = 120):
         "code": code,
         "otp_token": str(otp.token),
         "otp_expire_at": otp.expire_at,
+        "sms_id": sms.id,
         "patiente": patiente_info,
         "grossesse_en_cours": grossesse_info,
         "dossier_obstetrical": dossier_info,
@@ -175,3 +156,186 @@ def verify_otp(patiente_id: int, action: str, otp_token_or_id, code: str):
     # succès
     otp.mark_used()
     return True
+
+
+def build_carte_info(patiente):
+    """
+    Infos de la carte attribuée à la patiente (remontée au registre), ou None.
+    S'appuie sur `attribution__carte` chargé par DossierPatienteRepository.
+    """
+    carte_attribuee = getattr(patiente, "attribution", None)
+    if not carte_attribuee:
+        return None
+    registre = carte_attribuee.carte
+    return {
+        "uid_rfid": getattr(registre, "uid_rfid", None),
+        "statut": getattr(registre, "statut", None),
+        "date_attribution": getattr(carte_attribuee, "date_attribution", None)
+    }
+
+
+def build_grossesse_full_info(grossesse, with_suivi=True):
+    """
+    Sérialise une grossesse avec son dossier obstétrical et, si with_suivi,
+    ses consultations, rendez-vous et vaccinations (déjà préchargés).
+    """
+    g_data = GrossesseSerializer(grossesse).data
+    dossier = getattr(grossesse, "dossier", None)
+    g_data["dossier_obstetrical"] = DossierObstetricalSerializer(dossier).data if dossier else None
+    if with_suivi:
+        g_data["consultations"] = ConsultationSerializer(grossesse.consultations.all(), many=True).data
+        g_data["rendezvous"] = RendezVousSerializer(grossesse.rendezvous.all(), many=True).data
+        g_data["vaccinations"] = VaccinationSerializer(grossesse.vaccinations.all(), many=True).data
+    return g_data
+
+
+def build_patientes_full_info(patientes, with_carte=True, with_suivi=True):
+    """
+    Construit la liste {"patiente", ["carte"], "grossesses"} pour un queryset de
+    patientes, en un nombre fixe de requêtes (voir DossierPatienteRepository).
+    Accepte aussi une liste de patientes déjà chargées via with_full_info.
+    """
+    if hasattr(patientes, "prefetch_related"):
+        patientes = DossierPatienteRepository.with_full_info(patientes)
+    result = []
+    for pat in patientes:
+        item = {"patiente": PatienteBaseSerializer(pat).data}
+        if with_carte:
+            item["carte"] = build_carte_info(pat)
+        item["grossesses"] = [
+            build_grossesse_full_info(g, with_suivi=with_suivi) for g in pat.grossesses.all()
+        ]
+        result.append(item)
+    return result
+
+
+def patiente_age(patiente):
+    """Âge (années) de la patiente à ce jour, ou None si pas de date de naissance."""
+    if not patiente.date_naissance:
+        return None
+    today = timezone.now().date()
+    return relativedelta(today, patiente.date_naissance).years
+
+
+def consultation_to_visit(cons, age):
+    """
+    Convertit une consultation en visite au format du modèle de risque
+    (BS en mmol/L, BodyTemp en °F). Les mesures absentes sont complétées
+    par des valeurs normales aléatoires.
+    """
+    systolic = cons.SystolicBP if cons.SystolicBP is not None else random.randint(90, 140)
+    diastolic = cons.DiastolicBP if cons.DiastolicBP is not None else random.randint(60, 90)
+    bs_mmol = float(cons.BS) / 18 if cons.BS is not None else round(random.uniform(3.5, 7.0), 2)
+    body_temp_f = (float(cons.BodyTemp) * 9/5 + 32) if cons.BodyTemp is not None else round(random.uniform(96.0, 102.0), 2)
+    heart_rate = cons.HeartRate if cons.HeartRate is not None else random.randint(60, 100)
+    return {
+        "Age": age,
+        "SystolicBP": systolic,
+        "DiastolicBP": diastolic,
+        "BS": bs_mmol,
+        "BodyTemp": body_temp_f,
+        "HeartRate": heart_rate
+    }
+
+
+SUIVI_KEYS = ("consultations", "rendezvous", "vaccinations")
+
+
+class PatientSummaryService:
+    @staticmethod
+    def rebuild(patiente_ids):
+        """
+        Recalcule (upsert) le document PatientSummary des patientes données.
+        Retourne {patiente_id: document}.
+        """
+        patientes = list(DossierPatienteRepository.with_full_info(
+            Patiente.objects.filter(id__in=list(patiente_ids))
+        ))
+        # Encodage JSON de DRF : dates et décimaux au format des réponses calculées à la volée
+        # (ex. carte.date_attribution en microsecondes, là où DjangoJSONEncoder tronque en millisecondes)
+        documents = [json.loads(json.dumps(doc, cls=JSONEncoder)) for doc in build_patientes_full_info(patientes)]
+        summaries = []
+        for pat, document in zip(patientes, documents):
+            grossesses = list(pat.grossesses.all())
+            dates = [c.date_consultation for g in grossesses for c in g.consultations.all()]
+            summaries.append(PatientSummary(
+                patiente=pat,
+                hopital_id=pat.creer_a_hopital_id,
+                document=document,
+                nb_grossesses=len(grossesses),
+                grossesse_en_cours=any(g.statut == "EN_COURS" for g in grossesses),
+                derniere_consultation=max(dates) if dates else None,
+                has_carte=document["carte"] is not None,
+            ))
+        PatientSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["patiente"],
+            update_fields=["hopital", "document", "nb_grossesses", "grossesse_en_cours",
+                           "derniere_consultation", "has_carte", "updated_at"],
+        )
+        # Relecture pour renvoyer exactement ce qui est servi (types JSON)
+        return dict(PatientSummary.objects.filter(
+            patiente_id__in=[p.id for p in patientes]
+        ).values_list("patiente_id", "document"))
+
+    @staticmethod
+    def schedule_rebuild(patiente_id):
+        """Reconstruit le résumé après le commit de la transaction courante."""
+        if not patiente_id:
+            return
+
+        def _rebuild():
+            try:
+                PatientSummaryService.rebuild([patiente_id])
+            except Exception:
+                logger.exception("Echec de la mise à jour du PatientSummary %s", patiente_id)
+
+        transaction.on_commit(_rebuild)
+
+    @staticmethod
+    def schedule_rebuild_many(patientes, chunk_size=500):
+        """
+        Reconstruit après le commit les résumés d'un queryset de patientes (ex. celles
+        d'un hôpital renommé), par lots de `chunk_size` : un rebuild par lot, pas par patiente.
+        """
+        def _rebuild():
+            ids = list(patientes.order_by("id").values_list("id", flat=True))
+            for debut in range(0, len(ids), chunk_size):
+                lot = ids[debut:debut + chunk_size]
+                try:
+                    PatientSummaryService.rebuild(lot)
+                except Exception:
+                    logger.exception("Echec de la mise à jour des PatientSummary %s..%s", lot[0], lot[-1])
+
+        transaction.on_commit(_rebuild)
+
+    @staticmethod
+    def documents_for(patiente_ids, with_carte=True, with_suivi=True):
+        """
+        Documents des patientes dans l'ordre des ids fournis, lus en une requête
+        sur PatientSummary ; les résumés manquants sont calculés à la volée.
+        """
+        patiente_ids = list(patiente_ids)
+        documents = dict(PatientSummary.objects.filter(
+            patiente_id__in=patiente_ids
+        ).values_list("patiente_id", "document"))
+        manquants = [pid for pid in patiente_ids if pid not in documents]
+        if manquants:
+            documents.update(PatientSummaryService.rebuild(manquants))
+        return [
+            PatientSummaryService.projeter(documents[pid], with_carte, with_suivi)
+            for pid in patiente_ids if pid in documents
+        ]
+
+    @staticmethod
+    def projeter(document, with_carte=True, with_suivi=True):
+        """Restreint un document au format attendu par chaque endpoint."""
+        item = {"patiente": document["patiente"]}
+        if with_carte:
+            item["carte"] = document.get("carte")
+        grossesses = document.get("grossesses", [])
+        if not with_suivi:
+            grossesses = [{k: v for k, v in g.items() if k not in SUIVI_KEYS} for g in grossesses]
+        item["grossesses"] = grossesses
+        return item
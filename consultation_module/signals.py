@@ -0,0 +1,88 @@
+# consultation_module/signals.py
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from auth_module.models.user import User
+from cards_module.models import CarteAttribuee, RegistreCarte
+from grossesse_module.models import DossierObstetrical, Grossesse
+from hospital_module.models import Hopital
+from medical_module.models.medecin import Medecin
+from patiente__module.models.patiente import Patiente
+from .models import Consultation, RendezVous, Vaccination
+from .services import PatientSummaryService
+
+
+def _patiente_id_par_grossesse(grossesse_id):
+    return Grossesse.objects.filter(id=grossesse_id).values_list("patiente_id", flat=True).first()
+
+
+@receiver(post_save, sender=Grossesse)
+@receiver(post_delete, sender=Grossesse)
+@receiver(post_save, sender=CarteAttribuee)
+@receiver(post_delete, sender=CarteAttribuee)
+def maj_summary_par_patiente(sender, instance, **kwargs):
+    PatientSummaryService.schedule_rebuild(instance.patiente_id)
+
+
+@receiver(post_save, sender=DossierObstetrical)
+@receiver(post_delete, sender=DossierObstetrical)
+@receiver(post_save, sender=Consultation)
+@receiver(post_delete, sender=Consultation)
+@receiver(post_save, sender=RendezVous)
+@receiver(post_delete, sender=RendezVous)
+@receiver(post_save, sender=Vaccination)
+@receiver(post_delete, sender=Vaccination)
+def maj_summary_par_grossesse(sender, instance, **kwargs):
+    # Suppression en cascade d'une grossesse : son propre post_delete suffit
+    PatientSummaryService.schedule_rebuild(_patiente_id_par_grossesse(instance.grossesse_id))
+
+
+@receiver(post_save, sender=Patiente)
+def maj_summary_patiente(sender, instance, created, **kwargs):
+    PatientSummaryService.schedule_rebuild(instance.id)
+
+
+@receiver(m2m_changed, sender=Patiente.medecins.through)
+def maj_summary_medecins(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        PatientSummaryService.schedule_rebuild(instance.id)
+    else:
+        for patiente_id in pk_set or []:
+            PatientSummaryService.schedule_rebuild(patiente_id)
+
+
+@receiver(post_save, sender=User)
+def maj_summary_user(sender, instance, created, **kwargs):
+    if created:
+        return
+    if instance.role == "PATIENTE":
+        patiente_id = Patiente.objects.filter(user=instance).values_list("id", flat=True).first()
+        PatientSummaryService.schedule_rebuild(patiente_id)
+    elif instance.role == "MEDECIN":
+        # Nom, email, téléphone du médecin copiés dans le résumé de ses patientes
+        PatientSummaryService.schedule_rebuild_many(Patiente.objects.filter(medecins__user=instance))
+
+
+@receiver(post_save, sender=Medecin)
+def maj_summary_medecin(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and "specialite" not in update_fields):
+        return
+    PatientSummaryService.schedule_rebuild_many(Patiente.objects.filter(medecins=instance))
+
+
+@receiver(post_save, sender=Hopital)
+def maj_summary_hopital(sender, instance, created, update_fields=None, **kwargs):
+    # Seuls id, nom et email de l'hôpital figurent dans le résumé
+    if created or (update_fields is not None and not {"nom", "email"} & set(update_fields)):
+        return
+    PatientSummaryService.schedule_rebuild_many(Patiente.objects.filter(creer_a_hopital=instance))
+
+
+@receiver(post_save, sender=RegistreCarte)
+def maj_summary_carte(sender, instance, created, **kwargs):
+    if created:
+        return
+    patiente_id = CarteAttribuee.objects.filter(carte=instance).values_list("patiente_id", flat=True).first()
+    PatientSummaryService.schedule_rebuild(patiente_id)
@@ -1,3 +1,172 @@
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from auth_module.models.user import User
+from cards_module.models import CarteAttribuee, RegistreCarte
+from grossesse_module.models import DossierObstetrical, Grossesse
+from hospital_module.models import Hopital
+from medical_module.models.medecin import Medecin, MedecinHopital
+from patiente__module.models.patiente import Patiente
+from sms_sender.models import SmsOutbox
+
+from .models import Consultation, PatientSummary, RappelEnvoye, RendezVous, Vaccination
+from .reminders import RendezVousReminderScheduler
+from .repositories import DossierPatienteRepository
+from .services import PatientSummaryService, build_patientes_full_info
+
+
+class DossierPatienteQueriesTest(TestCase):
+    """Le nombre de requêtes du dossier complet ne dépend pas du nombre de patientes."""
+
+    def setUp(self):
+        self.compteur = 0
+        self.superadmin = User.objects.create(
+            email="superadmin@test.cd", nom="Admin", postnom="Super", prenom="Root", role="SUPERADMIN"
+        )
+
+    def creer_hopital(self, nb_patientes):
+        hopital = Hopital.objects.create(nom="Hôpital test", adresse="a", ville="Kinshasa", province="Kinshasa")
+        medecin_user = User.objects.create(
+            email=f"medecin{hopital.id}@test.cd", nom="Doc", postnom="P", prenom="M", role="MEDECIN"
+        )
+        medecin = Medecin.objects.create(user=medecin_user)
+        MedecinHopital.objects.create(medecin=medecin, hopital=hopital)
+        for _ in range(nb_patientes):
+            self.creer_patiente(hopital, medecin)
+        return hopital
+
+    def creer_patiente(self, hopital, medecin):
+        self.compteur += 1
+        user = User.objects.create(
+            email=f"patiente{self.compteur}@test.cd", nom="Kabila", postnom="Mwamba", prenom="Marie",
+            role="PATIENTE", telephone="0812345678",
+        )
+        patiente = Patiente.objects.create(user=user, creer_a_hopital=hopital, date_naissance=date(1995, 1, 1))
+        patiente.medecins.add(medecin)
+        carte = RegistreCarte.objects.create(
+            numero_serie=f"NS-{self.compteur}", uid_rfid=f"UID-{self.compteur}", statut="AFFECTEE"
+        )
+        CarteAttribuee.objects.create(carte=carte, patiente=patiente, hopital=hopital)
+        for statut in ("EN_COURS", "TERMINEE"):
+            grossesse = Grossesse.objects.create(patiente=patiente, date_debut=date(2024, 1, 1), statut=statut)
+            DossierObstetrical.objects.create(grossesse=grossesse, geste=1)
+            Consultation.objects.create(grossesse=grossesse, SystolicBP=120, DiastolicBP=80, HeartRate=80)
+            RendezVous.objects.create(grossesse=grossesse, date_rdv=timezone.now() + timedelta(days=1))
+            Vaccination.objects.create(grossesse=grossesse, vaccin_nom="VAT")
+
+    def compter_requetes(self, fonction):
+        with CaptureQueriesContext(connection) as requetes:
+            resultat = fonction()
+        return len(requetes), resultat
+
+    def test_with_full_info_nombre_de_requetes_constant(self):
+        petit, grand = self.creer_hopital(2), self.creer_hopital(6)
+
+        def dossiers(hopital):
+            patientes = list(DossierPatienteRepository.with_full_info(
+                Patiente.objects.filter(creer_a_hopital=hopital).order_by("id")
+            ))
+            return build_patientes_full_info(patientes)
+
+        nb_petit, resultat_petit = self.compter_requetes(lambda: dossiers(petit))
+        nb_grand, resultat_grand = self.compter_requetes(lambda: dossiers(grand))
+
+        self.assertEqual(len(resultat_petit), 2)
+        self.assertEqual(len(resultat_grand), 6)
+        self.assertEqual(len(resultat_grand[0]["grossesses"][0]["consultations"]), 1)
+        self.assertEqual(nb_petit, nb_grand)
+
+    def test_all_patientes_full_info_nombre_de_requetes_constant(self):
+        petit, grand = self.creer_hopital(2), self.creer_hopital(6)
+        client = APIClient()
+        client.force_authenticate(self.superadmin)
+
+        def lire(hopital):
+            return client.get(reverse("all-patientes-full-info", args=[hopital.id]))
+
+        # Premier appel : résumés calculés à la volée ; second : lus dans PatientSummary
+        for _ in range(2):
+            nb_petit, reponse_petit = self.compter_requetes(lambda: lire(petit))
+            nb_grand, reponse_grand = self.compter_requetes(lambda: lire(grand))
+            self.assertEqual(reponse_petit.status_code, 200)
+            self.assertEqual(len(reponse_petit.data), 2)
+            self.assertEqual(len(reponse_grand.data), 6)
+            self.assertEqual(nb_petit, nb_grand)
+
+
+class PatientSummarySignalsTest(TestCase):
+    """Hôpital et médecin sont copiés dans le résumé : leur modification le reconstruit."""
+
+    def setUp(self):
+        self.hopital = Hopital.objects.create(nom="Hôpital test", adresse="a", ville="Kinshasa", province="Kinshasa")
+        self.medecin = Medecin.objects.create(user=User.objects.create(
+            email="medecin@test.cd", nom="Doc", postnom="P", prenom="M", role="MEDECIN"
+        ))
+        user = User.objects.create(
+            email="patiente@test.cd", nom="Kabila", postnom="Mwamba", prenom="Marie", role="PATIENTE"
+        )
+        self.patiente = Patiente.objects.create(user=user, creer_a_hopital=self.hopital, date_naissance=date(1995, 1, 1))
+        self.patiente.medecins.add(self.medecin)
+        PatientSummaryService.rebuild([self.patiente.id])
+
+    def resume(self):
+        return PatientSummary.objects.get(patiente=self.patiente).document["patiente"]
+
+    def test_hopital_renomme(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hopital.nom = "Hôpital renommé"
+            self.hopital.save()
+        self.assertEqual(self.resume()["creer_a_hopital"]["nom"], "Hôpital renommé")
+
+    def test_utilisateur_du_medecin_modifie(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.medecin.user.nom = "Mukwege"
+            self.medecin.user.save()
+        self.assertEqual(self.resume()["medecins"][0]["nom"], "Mukwege")
+
+
+class RendezVousReminderTest(TestCase):
+    def setUp(self):
+        self.jour = timezone.localdate() + timedelta(days=1)
+        hopital = Hopital.objects.create(nom="Hôpital test", adresse="a", ville="Kinshasa", province="Kinshasa")
+        self.rdvs = []
+        for i, telephone in enumerate(("243812345678", "0822222222")):
+            user = User.objects.create(
+                email=f"patiente{i}@test.cd", nom="Kabila", postnom="Mwamba", prenom="Marie",
+                role="PATIENTE", telephone=telephone,
+            )
+            patiente = Patiente.objects.create(user=user, creer_a_hopital=hopital)
+            grossesse = Grossesse.objects.create(patiente=patiente, date_debut=date(2024, 1, 1), statut="EN_COURS")
+            date_rdv = timezone.make_aware(datetime.combine(self.jour, time(9)))
+            self.rdvs.append(RendezVous.objects.create(grossesse=grossesse, date_rdv=date_rdv))
+
+    def test_numeros_au_format_passerelle(self):
+        compteurs = RendezVousReminderScheduler().run(self.jour)
+        self.assertEqual(compteurs["queued"], 2)
+        sms = SmsOutbox.objects.get()
+        self.assertEqual(set(sms.mobile_numbers.split(",")), {"243812345678", "243822222222"})
+
+    def test_conflit_reessaie_le_reste_de_la_tranche(self):
+        # Une autre exécution a validé le rappel du premier rendez-vous après la déduplication
+        filtre = RappelEnvoye.objects.filter
+        appels = []
+
+        def filtre_en_retard(*args, **kwargs):
+            if not appels:
+                appels.append(1)
+                RappelEnvoye.objects.create(source="RENDEZVOUS", objet_id=self.rdvs[0].id, date_cible=self.jour)
+                return RappelEnvoye.objects.none()
+            return filtre(*args, **kwargs)
 
-# Create your tests here.
+        with mock.patch.object(RappelEnvoye.objects, "filter", side_effect=filtre_en_retard):
+            compteurs = RendezVousReminderScheduler().run(self.jour)
+        self.assertEqual(compteurs["queued"], 1)
+        self.assertEqual(compteurs["already_sent"], 1)
+        self.assertTrue(RappelEnvoye.objects.filter(objet_id=self.rdvs[1].id).exists())
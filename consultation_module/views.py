@@ -1,5 +1,6 @@
 from patiente__module.models.patiente import Patiente
 from patiente__module.serializers.patiente_serializers import PatienteBaseSerializer
+from patiente__module.services.patiente_search_service import PatienteSearchService
 from grossesse_module.models import Grossesse, DossierObstetrical
 from grossesse_module.serializers import GrossesseSerializer, DossierObstetricalSerializer
 # consultation_module/views.py
@@ -9,74 +10,37 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
+from django.db import transaction
 from django.utils import timezone
 from .models import Consultation, RendezVous, Vaccination, ActionOTP
 from .serializers import ConsultationSerializer, RendezVousSerializer, VaccinationSerializer, ActionOtpCreateSerializer, ActionOtpVerifySerializer
-from .services import create_otp_by_rfid, verify_otp
+from .services import create_otp_by_rfid, verify_otp, build_patientes_full_info, PatientSummaryService, consultation_to_visit, patiente_age
+from .repositories import DossierPatienteRepository
+from .pagination import PatienteCursorPagination
 from grossesse_module.models import Grossesse
 from auth_module.models.user import User
 from hospital_module.models import Hopital
 from medical_module.models.medecin import Medecin
 from patiente__module.models.patiente import Patiente
-from sms_sender.services import send_sms_via_md
+from sms_sender.services import enqueue_sms
 from dateutil.relativedelta import relativedelta
 import random
 
 
 
-# Endpoint pour rechercher une patiente par nom ou téléphone et afficher toutes ses infos
+# Endpoint pour rechercher une patiente par email, téléphone ou nom et afficher toutes ses infos
 class PatienteFullInfoBySearchView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         query = request.query_params.get("query")
         if not query:
-            return Response({"detail": "Paramètre 'query' requis (email ou téléphone)."}, status=status.HTTP_400_BAD_REQUEST)
-        # Recherche par email ou téléphone (user)
-        patientes = Patiente.objects.filter(
-            user__email__icontains=query
-        ) | Patiente.objects.filter(
-            user__telephone__icontains=query
-        )
-        if not patientes.exists():
+            return Response({"detail": "Paramètre 'query' requis (email, téléphone ou nom)."}, status=status.HTTP_400_BAD_REQUEST)
+        # Recherche indexée (trigrammes) et classée, limitée par ?limit= (20 par défaut, 50 max)
+        patientes = PatienteSearchService.search(query, request.query_params.get("limit"))
+        result = PatientSummaryService.documents_for([pat.id for pat in patientes])
+        if not result:
             return Response({"detail": "Aucune patiente trouvée."}, status=status.HTTP_404_NOT_FOUND)
-        result = []
-        for pat in patientes:
-            pat_data = PatienteBaseSerializer(pat).data
-            # Ajout des infos carte (remontée à Register via id carte attribuée)
-            carte_info = None
-            try:
-                from cards_module.models import CarteAttribuee, RegistreCarte
-                carte_attribuee = CarteAttribuee.objects.filter(patiente=pat).first()
-                if carte_attribuee:
-                    registre = carte_attribuee.carte  # lien direct OneToOne vers RegistreCarte
-                    carte_info = {
-                        "uid_rfid": getattr(registre, "uid_rfid", None),
-                        "statut": getattr(registre, "statut", None),
-                        "date_attribution": getattr(carte_attribuee, "date_attribution", None)
-                    }
-                else:
-                    carte_info = None
-            except Exception:
-                carte_info = None
-            grossesses = Grossesse.objects.filter(patiente=pat)
-            grossesses_data = []
-            for g in grossesses:
-                g_data = GrossesseSerializer(g).data
-                dossier = getattr(g, "dossier", None)
-                g_data["dossier_obstetrical"] = DossierObstetricalSerializer(dossier).data if dossier else None
-                consultations = Consultation.objects.filter(grossesse=g)
-                g_data["consultations"] = ConsultationSerializer(consultations, many=True).data
-                rdvs = RendezVous.objects.filter(grossesse=g)
-                g_data["rendezvous"] = RendezVousSerializer(rdvs, many=True).data
-                vaccins = Vaccination.objects.filter(grossesse=g)
-                g_data["vaccinations"] = VaccinationSerializer(vaccins, many=True).data
-                grossesses_data.append(g_data)
-            result.append({
-                "patiente": pat_data,
-                "carte": carte_info,
-                "grossesses": grossesses_data
-            })
         return Response(result, status=status.HTTP_200_OK)
 
 
@@ -86,31 +50,11 @@ class AllPatientesFullInfoView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request,hopital_id):
-        hopital = Hopital.objects.get(id=hopital_id) 
-        
-        if not hopital:
+        if not Hopital.objects.filter(id=hopital_id).exists():
             return Response({"detail": "Hôpital introuvable."}, status=status.HTTP_404_NOT_FOUND)
-        patientes = Patiente.objects.filter(creer_a_hopital_id=hopital_id)
-        result = []
-        for pat in patientes:
-            pat_data = PatienteBaseSerializer(pat).data
-            grossesses = Grossesse.objects.filter(patiente=pat)
-            grossesses_data = []
-            for g in grossesses:
-                g_data = GrossesseSerializer(g).data
-                dossier = getattr(g, "dossier", None)
-                g_data["dossier_obstetrical"] = DossierObstetricalSerializer(dossier).data if dossier else None
-                consultations = Consultation.objects.filter(grossesse=g)
-                g_data["consultations"] = ConsultationSerializer(consultations, many=True).data
-                rdvs = RendezVous.objects.filter(grossesse=g)
-                g_data["rendezvous"] = RendezVousSerializer(rdvs, many=True).data
-                vaccins = Vaccination.objects.filter(grossesse=g)
-                g_data["vaccinations"] = VaccinationSerializer(vaccins, many=True).data
-                grossesses_data.append(g_data)
-            result.append({
-                "patiente": pat_data,
-                "grossesses": grossesses_data
-            })
+        # Lecture des résumés précalculés (PatientSummary) au lieu de parcourir l'arbre
+        patiente_ids = Patiente.objects.filter(creer_a_hopital_id=hopital_id).order_by("id").values_list("id", flat=True)
+        result = PatientSummaryService.documents_for(patiente_ids, with_carte=False)
         return Response(result, status=status.HTTP_200_OK)
         
 
@@ -267,9 +211,11 @@ class CreateOtpByRfidView(APIView):
         patiente_id = s.validated_data.get("patiente_id")
         action = s.validated_data["action"]
 
+        # Seul l'auteur de la demande (ou un superadmin) peut suivre le SMS (sms/outbox/<id>/)
+        auteur = request.user if request.user.is_authenticated else None
         try:
             if uid_rfid:
-                result = create_otp_by_rfid(uid_rfid=uid_rfid, action=action)
+                result = create_otp_by_rfid(uid_rfid=uid_rfid, action=action, created_by=auteur)
                 if not result.get("success"):
                     return Response({"detail": result.get("error")}, status=400)
                 return Response(result, status=201)
@@ -329,35 +275,20 @@ class CreateOtpByRfidView(APIView):
                         "HeartRate": random.randint(60, 100)
                     }
 
-                code = ActionOTP.generate_code()
-                expire_at = timezone.now() + timedelta(minutes=10)
-                otp = ActionOTP.objects.create(patiente=pat, action=action, code_otp=code, expire_at=expire_at)
                 phone = getattr(pat.user, "telephone", None)
                 if not phone:
                     return Response({"detail": "Aucun numéro de téléphone pour cette patiente"}, status=400)
-                # Normalize phone to start with 2438 and be 12 characters
-                phone = phone.lstrip('+').lstrip('0')
-                if not phone.startswith('243'):
-                    phone = '2438' + phone
-                if len(phone) > 12:
-                    phone = phone[:12]
-                elif len(phone) < 12:
-                    phone = phone.ljust(12, '0')
-                message = f"ViàCareme: Code OTP pour {action}: {code} 🔐. Valide 10 min ⏱️."
-                sms_result = send_sms_via_md(message, phone)
-                if not sms_result.get("success"):
-                    error_type = sms_result.get("error_type")
-                    if error_type == "api_error":
-                        error_msg = f"Erreur API SMS: {sms_result.get('api_error_code')} - {sms_result.get('api_error_description')}"
-                    elif error_type == "timeout":
-                        error_msg = "Timeout lors de l'envoi du SMS"
-                    elif error_type == "connection":
-                        error_msg = "Erreur de connexion lors de l'envoi du SMS"
-                    elif error_type == "config":
-                        error_msg = "Configuration manquante pour l'envoi du SMS"
-                    else:
-                        error_msg = f"Erreur inconnue lors de l'envoi du SMS: {sms_result.get('error')}"
-                    return Response({"detail": error_msg}, status=400)
+                # Numéro normalisé (243...) par enqueue_sms
+
+                code = ActionOTP.generate_code()
+                expire_at = timezone.now() + timedelta(minutes=10)
+                # OTP et SMS (outbox) dans la même transaction, envoi par dispatch_sms_outbox
+                with transaction.atomic():
+                    otp = ActionOTP.objects.create(patiente=pat, action=action, code_otp=code, expire_at=expire_at)
+                    message = f"ViàCareme: Code OTP pour {action}: {code} 🔐. Valide 10 min ⏱️."
+                    sms = enqueue_sms(
+                        message, phone, reference=f"otp:{otp.id}", expire_at=expire_at, created_by=auteur
+                    )
                 # Return similar format
                 patiente_info = {
                     "id": pat.id,
@@ -372,6 +303,7 @@ class CreateOtpByRfidView(APIView):
                     "code": code,
                     "otp_token": str(otp.token),
                     "otp_expire_at": otp.expire_at,
+                    "sms_id": sms.id,
                     "patiente": patiente_info,
                     "grossesse_en_cours": grossesse_data,
                     "dossier_obstetrical": dossier_data,
@@ -429,59 +361,22 @@ class MedecinPatientesFullInfoView(APIView):
         # Récupérer les patientes assignées à ce médecin ET qui appartiennent à cet hôpital
         patientes = medecin.patientes_assignees.filter(
             creer_a_hopital_id=hopital_id
-        ).select_related('user', 'creer_a_hopital')
-
-        # Pagination
-        paginator = PageNumberPagination()
-        paginator.page_size = request.query_params.get('page_size', 10)
-        paginated_patientes = paginator.paginate_queryset(patientes, request)
-
-        result = []
-        for pat in paginated_patientes:
-            pat_data = PatienteBaseSerializer(pat).data
-
-            # Ajout des infos carte
-            carte_info = None
-            try:
-                from cards_module.models import CarteAttribuee, RegistreCarte
-                carte_attribuee = CarteAttribuee.objects.filter(patiente=pat).first()
-                if carte_attribuee:
-                    registre = carte_attribuee.carte
-                    carte_info = {
-                        "uid_rfid": getattr(registre, "uid_rfid", None),
-                        "statut": getattr(registre, "statut", None),
-                        "date_attribution": getattr(carte_attribuee, "date_attribution", None)
-                    }
-            except Exception:
-                carte_info = None
-
-            # Grossesses avec consultations, RDV et vaccinations
-            grossesses = Grossesse.objects.filter(patiente=pat)
-            grossesses_data = []
-            for g in grossesses:
-                g_data = GrossesseSerializer(g).data
-                dossier = getattr(g, "dossier", None)
-                g_data["dossier_obstetrical"] = DossierObstetricalSerializer(dossier).data if dossier else None
-
-                # Consultations pour cette grossesse
-                consultations = Consultation.objects.filter(grossesse=g)
-                g_data["consultations"] = ConsultationSerializer(consultations, many=True).data
-
-                # Rendez-vous pour cette grossesse
-                rdvs = RendezVous.objects.filter(grossesse=g)
-                g_data["rendezvous"] = RendezVousSerializer(rdvs, many=True).data
-
-                # Vaccinations pour cette grossesse
-                vaccins = Vaccination.objects.filter(grossesse=g)
-                g_data["vaccinations"] = VaccinationSerializer(vaccins, many=True).data
-
-                grossesses_data.append(g_data)
+        )
 
-            result.append({
-                "patiente": pat_data,
-                "carte": carte_info,
-                "grossesses": grossesses_data
-            })
+        # Pagination : ?pagination=cursor active le mode keyset (sans COUNT(*))
+        if request.query_params.get("pagination") == "cursor":
+            paginator = PatienteCursorPagination()
+        else:
+            paginator = PageNumberPagination()
+            paginator.page_size = request.query_params.get('page_size', 10)
+            patientes = patientes.order_by("date_inscription", "id")
+
+        # Cartes, grossesses, dossiers, consultations, RDV et vaccinations
+        # de toute la page sont chargés en un nombre fixe de requêtes
+        paginated_patientes = paginator.paginate_queryset(
+            DossierPatienteRepository.with_full_info(patientes), request
+        )
+        result = build_patientes_full_info(paginated_patientes)
 
         return paginator.get_paginated_response(result)
 
@@ -497,31 +392,11 @@ class PatientVisitsFeaturesView(APIView):
 
         patiente = grossesse.patiente
 
-        # Calculate age
-        age = None
-        if patiente.date_naissance:
-            today = timezone.now().date()
-            age = relativedelta(today, patiente.date_naissance).years
+        age = patiente_age(patiente)
 
         # Get consultations with the new fields
         consultations = Consultation.objects.filter(grossesse=grossesse).order_by('date_consultation')
-
-        visits = []
-        for cons in consultations:
-            systolic = cons.SystolicBP if cons.SystolicBP is not None else random.randint(90, 140)
-            diastolic = cons.DiastolicBP if cons.DiastolicBP is not None else random.randint(60, 90)
-            bs_mmol = float(cons.BS) / 18 if cons.BS is not None else round(random.uniform(3.5, 7.0), 2)
-            body_temp_f = (float(cons.BodyTemp) * 9/5 + 32) if cons.BodyTemp is not None else round(random.uniform(96.0, 102.0), 2)
-            heart_rate = cons.HeartRate if cons.HeartRate is not None else random.randint(60, 100)
-            visit = {
-                "Age": age,
-                "SystolicBP": systolic,
-                "DiastolicBP": diastolic,
-                "BS": bs_mmol,
-                "BodyTemp": body_temp_f,
-                "HeartRate": heart_rate
-            }
-            visits.append(visit)
+        visits = [consultation_to_visit(cons, age) for cons in consultations]
 
         return Response({"visits": visits}, status=status.HTTP_200_OK)
 
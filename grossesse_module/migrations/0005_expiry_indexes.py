@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grossesse_module', '0004_cloturegrossesse_alter_auditaction_action_type'),
+        ('patiente__module', '0006_patiente_recherche'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dossieraccess',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['patiente', 'code_otp'], name='dossier_access_valide_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dossieraccess',
+            index=models.Index(fields=['expire_at'], name='dossier_access_expire_idx'),
+        ),
+    ]
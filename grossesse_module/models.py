@@ -86,6 +86,16 @@ class DossierAccess(models.Model):
     expire_at = models.DateTimeField()
     is_used = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Vérification d'un OTP d'accès : seuls les codes non utilisés sont indexés
+            models.Index(
+                fields=["patiente", "code_otp"], name="dossier_access_valide_idx",
+                condition=models.Q(is_used=False),
+            ),
+            models.Index(fields=["expire_at"], name="dossier_access_expire_idx"),  # purge_expired
+        ]
+
     def is_valid(self):
         return not self.is_used and timezone.now() < self.expire_at
 
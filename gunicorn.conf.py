@@ -0,0 +1,70 @@
+# gunicorn.conf.py
+# Usage : gunicorn jali_django_api.wsgi -c gunicorn.conf.py
+import gc
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "3"))
+# Threads par worker : une requête qui attend le pool d'inférence (predict/, SHAP) ne bloque
+# que son thread, le worker sert les autres requêtes. INFERENCE_MAX_PENDING borne les calculs
+# soumis par les threads d'un worker (au-delà : 503) ; à dimensionner avec GUNICORN_THREADS.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+
+
+def _env_flag(name):
+    return os.environ.get(name, "false").lower() in ("1", "true", "yes")
+
+
+# Chargement du modèle de risque une seule fois dans le master, avant le fork :
+# les workers partagent alors les pages du modèle et de l'explainer (copy-on-write).
+PRELOAD_MODELS = _env_flag("MODELE_AI_PRELOAD")
+preload_app = PRELOAD_MODELS
+
+# Sinon, préchargement dans chaque worker juste après le fork.
+# Les deux désactivés (défaut) : le modèle est chargé au premier appel à /predict/.
+WARM_MODELS = _env_flag("MODELE_AI_WARM_ON_FORK")
+
+
+def when_ready(server):
+    if not PRELOAD_MODELS:
+        return
+    # preload_app : Django est déjà initialisé dans le master
+    from modele_ai.registry import registry
+    status = registry.warm()
+    if status["ok"]:
+        server.log.info(
+            f"Master : modèle chargé en {status['load_seconds']} s, RSS +{status['rss_delta_mb']} Mo"
+        )
+    else:
+        server.log.error(f"Master : échec du chargement du modèle : {status['error']}")
+
+    # Les objets déjà chargés sortent du ramasse-miettes : le GC des workers ne
+    # réécrit plus leurs en-têtes, ce qui évite de dupliquer ces pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if PRELOAD_MODELS:
+        # Ne pas réutiliser dans les workers les connexions ouvertes par le master
+        from django.core.cache import caches
+        from django.db import connections
+        connections.close_all()
+        caches.close_all()
+        return
+    if not WARM_MODELS:
+        return
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "jali_django_api.settings")
+    import django
+    django.setup()
+
+    from modele_ai.registry import registry
+    status = registry.warm()
+    if status["ok"]:
+        server.log.info(
+            f"Worker {worker.pid} : modèle chargé en {status['load_seconds']} s, "
+            f"RSS +{status['rss_delta_mb']} Mo"
+        )
+    else:
+        server.log.error(f"Worker {worker.pid} : échec du chargement du modèle : {status['error']}")
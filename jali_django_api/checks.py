@@ -0,0 +1,27 @@
+# jali_django_api/checks.py
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Warning
+
+
+def cache_is_process_local(alias):
+    """Vrai si l'alias de CACHES est un LocMemCache, donc propre à chaque processus."""
+    return isinstance(caches[alias], LocMemCache)
+
+
+def shared_cache_check(setting, usage, check_id, default="shared"):
+    """
+    Vérifie que le réglage `setting` désigne un alias de CACHES partagé entre processus.
+    `usage` décrit l'état concerné ; `check_id` identifie l'avertissement (ex. "sms_sender.W001").
+    """
+    alias = getattr(settings, setting, default)
+    if alias not in settings.CACHES:
+        return [Error(f"{setting}={alias!r} n'est pas un alias de CACHES.", id=check_id.replace(".W", ".E"))]
+    if cache_is_process_local(alias):
+        return [Warning(
+            f"{setting}={alias!r} est un LocMemCache : {usage} n'est pas partagé entre les workers.",
+            hint="Utiliser l'alias \"shared\" (SHARED_CACHE_URL : Redis, ou dbcache + manage.py createcachetable).",
+            id=check_id,
+        )]
+    return []
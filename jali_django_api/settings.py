@@ -32,6 +32,20 @@ CORS_ALLOWED_ORIGINS = env.list("CORS_ALLOWED_ORIGINS", default=[])
 CORS_ALLOW_CREDENTIALS = True  # important pour envoyer cookies HttpOnly
 
 GEMINI_API_KEY = env("GEMINI_API_KEY")
+GEMINI_BASE_URL = env("GEMINI_BASE_URL", default=None)  # ex. faux serveur local pour les tests de charge
+GEMINI_TIMEOUT = env.int("GEMINI_TIMEOUT", default=30)  # secondes
+GEMINI_MAX_CONNECTIONS = env.int("GEMINI_MAX_CONNECTIONS", default=20)  # pool HTTP du client async
+CHAT_MAX_CONCURRENCY = env.int("CHAT_MAX_CONCURRENCY", default=20)  # appels Gemini simultanés par processus ASGI
+CHAT_QUEUE_TIMEOUT = env.int("CHAT_QUEUE_TIMEOUT", default=2)  # attente max d'une place avant 503
+CHAT_RETRY_AFTER = env.int("CHAT_RETRY_AFTER", default=5)
+CHAT_ANSWER_CACHE_SIZE = env.int("CHAT_ANSWER_CACHE_SIZE", default=512)  # premières questions mémorisées
+CHAT_ANSWER_CACHE_TTL = env.int("CHAT_ANSWER_CACHE_TTL", default=86400)  # secondes
+
+# Historique du chatbot : au-delà, les anciens échanges sont résumés
+CHAT_HISTORY_MAX_TURNS = env.int("CHAT_HISTORY_MAX_TURNS", default=10)
+CHAT_HISTORY_MAX_CHARS = env.int("CHAT_HISTORY_MAX_CHARS", default=6000)
+CHAT_SUMMARY_MAX_CHARS = env.int("CHAT_SUMMARY_MAX_CHARS", default=1000)
+CHAT_CONVERSATION_CACHE_SIZE = env.int("CHAT_CONVERSATION_CACHE_SIZE", default=1024)  # fenêtres de conversation gardées en mémoire (0 = désactivé)
 
 # Applications
 INSTALLED_APPS = [
@@ -41,6 +55,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # External packages
     'rest_framework',
@@ -111,6 +126,18 @@ DATABASES = {
     }
 }
 
+# CACHES : "default" reste local au processus ; "shared" est vu par tous les processus
+# (workers gunicorn, dispatch_sms_outbox) : disjoncteur SMS, anti-rejeu des lecteurs RFID,
+# jobs de prédiction. Par défaut une table PostgreSQL (python manage.py createcachetable) ;
+# Redis recommandé en production : SHARED_CACHE_URL=rediscache://127.0.0.1:6379/1
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "shared": env.cache_url("SHARED_CACHE_URL", default="dbcache://viacareme_cache"),
+}
+if CACHES["shared"]["BACKEND"].endswith("DatabaseCache"):
+    # Pas d'éviction avant expiration (300 entrées par défaut) : une signature déjà vue ou un job ne doit pas disparaître
+    CACHES["shared"]["OPTIONS"] = {"MAX_ENTRIES": env.int("SHARED_CACHE_MAX_ENTRIES", default=200000)}
+
 
 
 # MD SMS SENDER
@@ -118,6 +145,60 @@ MD_SMS_API_KEY = env("MD_SMS_API_KEY", default=None)
 MD_SMS_CLIENT_ID = env("MD_SMS_CLIENT_ID", default=None)
 MD_SMS_BASE_URL = env("MD_SMS_BASE_URL", default="http://164.68.101.225:6005/api/v2/SendSMS")
 MD_SMS_TIMEOUT = env.int("MD_SMS_TIMEOUT", default=10)
+MD_SMS_POOL_SIZE = env.int("MD_SMS_POOL_SIZE", default=10)  # connexions keep-alive par worker (0 = une connexion par SMS)
+MD_SMS_CONNECT_RETRIES = env.int("MD_SMS_CONNECT_RETRIES", default=2)  # uniquement les échecs de connexion
+MD_SMS_BATCH_SIZE = env.int("MD_SMS_BATCH_SIZE", default=100)  # numéros par appel (champ MobileNumbers) pour les campagnes
+
+# DISJONCTEUR ET SANTÉ DE LA PASSERELLE SMS
+SMS_BREAKER_CACHE = env("SMS_BREAKER_CACHE", default="shared")  # alias de CACHES partagé entre processus (check sms_sender.W001)
+SMS_BREAKER_FAILURES = env.int("SMS_BREAKER_FAILURES", default=5)  # échecs (timeout, connexion, 5xx) pour ouvrir
+SMS_BREAKER_WINDOW = env.int("SMS_BREAKER_WINDOW", default=60)  # secondes
+SMS_BREAKER_OPEN_SECONDS = env.int("SMS_BREAKER_OPEN_SECONDS", default=30)  # avant l'appel d'essai
+SMS_HEALTH_WINDOW_MINUTES = env.int("SMS_HEALTH_WINDOW_MINUTES", default=15)
+
+# OUTBOX SMS (commande dispatch_sms_outbox)
+SMS_OUTBOX_WORKERS = env.int("SMS_OUTBOX_WORKERS", default=4)  # envois simultanés (<= MD_SMS_POOL_SIZE)
+SMS_OUTBOX_BATCH_SIZE = env.int("SMS_OUTBOX_BATCH_SIZE", default=50)
+SMS_OUTBOX_MAX_ATTEMPTS = env.int("SMS_OUTBOX_MAX_ATTEMPTS", default=5)
+SMS_OUTBOX_BACKOFF = env.int("SMS_OUTBOX_BACKOFF", default=30)  # secondes, doublé à chaque essai
+SMS_OUTBOX_MAX_BACKOFF = env.int("SMS_OUTBOX_MAX_BACKOFF", default=3600)
+SMS_OUTBOX_STALE_AFTER = env.int("SMS_OUTBOX_STALE_AFTER", default=300)  # ligne SENDING abandonnée -> PENDING
+SMS_OUTBOX_POLL_INTERVAL = env.int("SMS_OUTBOX_POLL_INTERVAL", default=2)
+
+# RAPPELS DE RENDEZ-VOUS (commande send_rdv_reminders, à planifier une fois par jour)
+RDV_REMINDER_DAYS_AHEAD = env.int("RDV_REMINDER_DAYS_AHEAD", default=1)  # rappel la veille
+RDV_REMINDER_CHUNK_SIZE = env.int("RDV_REMINDER_CHUNK_SIZE", default=1000)  # lignes par tranche (mémoire bornée)
+RDV_REMINDER_SENDER_ID = env("RDV_REMINDER_SENDER_ID", default=None)
+
+# CARTES RFID
+CARDS_SCAN_BATCH_MAX = env.int("CARDS_SCAN_BATCH_MAX", default=5000)  # UID par appel à cards/scan/batch/
+CARDS_DEVICE_CACHE_TTL = env.int("CARDS_DEVICE_CACHE_TTL", default=300)  # devices gardés en mémoire par worker (s)
+CARDS_DEVICE_CACHE_NEGATIVE_TTL = env.int("CARDS_DEVICE_CACHE_NEGATIVE_TTL", default=30)  # device inconnu / inactif
+CARDS_DEVICE_SIGNATURE_SKEW = env.int("CARDS_DEVICE_SIGNATURE_SKEW", default=300)  # écart d'horloge toléré (s)
+CARDS_DEVICE_CACHE_SYNC = env.int("CARDS_DEVICE_CACHE_SYNC", default=5)  # délai max de prise en compte d'un device modifié dans un autre worker (s)
+# Signatures déjà vues (anti-rejeu) et version des devices : alias de CACHES partagé entre workers (check cards_module.W001)
+CARDS_DEVICE_SHARED_CACHE = env("CARDS_DEVICE_SHARED_CACHE", default="shared")
+# Refuser les lecteurs sans cle_authentification ; False seulement le temps de configurer les lecteurs (avertissement à chaque scan)
+CARDS_DEVICE_REQUIRE_SIGNATURE = env.bool("CARDS_DEVICE_REQUIRE_SIGNATURE", default=True)
+
+# PURGE DES JETONS EXPIRÉS (commande purge_expired)
+EXPIRY_SWEEP_BATCH_SIZE = env.int("EXPIRY_SWEEP_BATCH_SIZE", default=1000)  # lignes par transaction
+EXPIRY_SWEEP_RETENTION_HOURS = env.int("EXPIRY_SWEEP_RETENTION_HOURS", default=24)  # conservation après expiration
+EXPIRY_SWEEP_PAUSE = env.float("EXPIRY_SWEEP_PAUSE", default=0.0)  # secondes entre deux lots
+
+# CACHE DES PRÉDICTIONS / EXPLICATIONS SHAP (modele_ai)
+PREDICTION_CACHE_SIZE = env.int("PREDICTION_CACHE_SIZE", default=4096)
+PREDICTION_CACHE_TTL = env.int("PREDICTION_CACHE_TTL", default=3600)  # secondes
+PREDICTION_CACHE_DECIMALS = env.int("PREDICTION_CACHE_DECIMALS", default=3)
+PREDICTION_CACHE_BACKEND = env("PREDICTION_CACHE_BACKEND", default=None)  # alias de CACHES, partagé entre workers
+
+# POOL D'INFÉRENCE (predict + SHAP hors du thread WSGI)
+INFERENCE_POOL_WORKERS = env.int("INFERENCE_POOL_WORKERS", default=2)  # 0 = calcul dans le worker web
+INFERENCE_MAX_PENDING = env.int("INFERENCE_MAX_PENDING", default=8)  # au-delà : 503 + Retry-After
+INFERENCE_TIMEOUT = env.int("INFERENCE_TIMEOUT", default=30)  # secondes
+INFERENCE_RETRY_AFTER = env.int("INFERENCE_RETRY_AFTER", default=5)
+INFERENCE_JOB_CACHE = env("INFERENCE_JOB_CACHE", default="shared")  # partagé entre workers, sinon mode async refusé (check modele_ai.W001)
+INFERENCE_JOB_TTL = env.int("INFERENCE_JOB_TTL", default=3600)
 
 
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ModeleAiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'modele_ai'
+
+    def ready(self):
+        from modele_ai import checks  # noqa: F401
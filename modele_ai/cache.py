@@ -0,0 +1,110 @@
+# modele_ai/cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def model_fingerprint(path):
+    """Empreinte du fichier modèle : toute nouvelle version invalide le cache."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+class VisitResultCache:
+    """
+    Cache LRU + TTL des résultats par visite (prédiction et explication SHAP),
+    indexé par un hash du vecteur de features arrondi et de l'empreinte du modèle.
+
+    Niveau 1 : en mémoire du processus. Niveau 2 (optionnel) : un backend de
+    settings.CACHES (alias PREDICTION_CACHE_BACKEND), partagé entre workers.
+    Les compteurs hits/misses sont propres au processus.
+    """
+
+    def __init__(self, fingerprint, max_size=4096, ttl=3600, decimals=3, backend_alias=None):
+        self.fingerprint = fingerprint
+        self.max_size = max_size
+        self.ttl = ttl
+        self.decimals = decimals
+        self.backend = caches[backend_alias] if backend_alias else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, fingerprint):
+        return cls(
+            fingerprint,
+            max_size=getattr(settings, "PREDICTION_CACHE_SIZE", 4096),
+            ttl=getattr(settings, "PREDICTION_CACHE_TTL", 3600),
+            decimals=getattr(settings, "PREDICTION_CACHE_DECIMALS", 3),
+            backend_alias=getattr(settings, "PREDICTION_CACHE_BACKEND", None),
+        )
+
+    def key(self, row):
+        arrondi = ",".join(f"{round(float(v), self.decimals):.{self.decimals}f}" for v in row)
+        return "modele_ai:" + hashlib.sha1(f"{self.fingerprint}|{arrondi}".encode()).hexdigest()
+
+    def get_many(self, keys):
+        """Retourne {key: entrée} pour les clés présentes (et non expirées)."""
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                item = self._entries.get(key)
+                if item is None:
+                    continue
+                expire_at, entry = item
+                if expire_at < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry
+
+        manquantes = [k for k in keys if k not in found]
+        if self.backend is not None and manquantes:
+            partages = self.backend.get_many(manquantes)
+            if partages:
+                self._store_local(partages)
+                found.update(partages)
+        return found
+
+    def set_many(self, entries):
+        self._store_local(entries)
+        if self.backend is not None and entries:
+            self.backend.set_many(entries, timeout=self.ttl)
+
+    def _store_local(self, entries):
+        expire_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, entry in entries.items():
+                self._entries[key] = (expire_at, entry)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "backend": "django" if self.backend is not None else "local",
+                "model_fingerprint": self.fingerprint,
+            }
@@ -0,0 +1,9 @@
+# modele_ai/checks.py
+from django.core.checks import Tags, register
+
+from jali_django_api.checks import shared_cache_check
+
+
+@register(Tags.caches)
+def job_cache_check(app_configs, **kwargs):
+    return shared_cache_check("INFERENCE_JOB_CACHE", "l'état des jobs de prédiction", "modele_ai.W001")
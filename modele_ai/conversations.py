@@ -0,0 +1,244 @@
+# modele_ai/conversations.py
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .history import _texte, history_manager
+from .models import Conversation, ConversationMessage
+
+SESSION_CONVERSATION_KEY = 'chat_conversation'
+# Anciennes clés de session (historique complet en session), reprises à la création de la conversation
+LEGACY_HISTORY_KEY = 'chat_history'
+LEGACY_SUMMARY_KEY = 'chat_summary'
+
+
+def _message(role, text):
+    return {'role': role, 'parts': [{'text': text}]}
+
+
+class ConversationWindow:
+    """Fenêtre de conversation chargée : messages envoyés à Gemini, leurs ids et le résumé."""
+
+    def __init__(self, conversation_id=None, ids=None, history=None, summary='', last_message_id=None):
+        self.conversation_id = conversation_id
+        self.ids = ids or []
+        self.history = history or []
+        self.summary = summary
+        self.last_message_id = last_message_id
+
+
+class ConversationStore:
+    """
+    Historique du chatbot en base (Conversation / ConversationMessage) au lieu de
+    la session : chaque échange n'insère que ses deux messages, la ligne de
+    session n'est écrite qu'une fois (identifiant de la conversation).
+
+    Seule la fenêtre courante (à partir de window_start_id) est relue ; les
+    échanges qui en sortent sont résumés par history_manager.compact().
+    Un LRU en mémoire (CHAT_CONVERSATION_CACHE_SIZE, 0 = désactivé) garde les
+    fenêtres récentes ; il est validé par last_message_id, donc sûr entre workers.
+    """
+
+    def __init__(self, manager, cache_size=1024):
+        self.manager = manager
+        self.cache_size = cache_size
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(history_manager, cache_size=getattr(settings, 'CHAT_CONVERSATION_CACHE_SIZE', 1024))
+
+    # --- Cache mémoire ---
+
+    def _cached(self, conversation_id, last_message_id):
+        with self._lock:
+            window = self._windows.get(conversation_id)
+            if window is not None and window.last_message_id == last_message_id:
+                self._windows.move_to_end(conversation_id)
+                self.hits += 1
+                return ConversationWindow(
+                    conversation_id, list(window.ids), list(window.history), window.summary, last_message_id
+                )
+            self.misses += 1
+        return None
+
+    def _remember(self, window):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._windows[window.conversation_id] = ConversationWindow(
+                window.conversation_id, list(window.ids), list(window.history), window.summary, window.last_message_id
+            )
+            self._windows.move_to_end(window.conversation_id)
+            while len(self._windows) > self.cache_size:
+                self._windows.popitem(last=False)
+
+    # --- Lecture ---
+
+    def _legacy_window(self, history, summary):
+        history, summary, _ = self.manager.compact(history, summary)
+        return ConversationWindow(history=history, summary=summary)
+
+    def _build_window(self, conversation_id, row, messages):
+        last_message_id, summary, _ = row
+        window = ConversationWindow(conversation_id, summary=summary, last_message_id=last_message_id)
+        for pk, role, text in messages:
+            window.ids.append(pk)
+            window.history.append(_message(role, text))
+        self._remember(window)
+        return window
+
+    def load(self, request):
+        """Fenêtre de la conversation de la session (vide s'il n'y en a pas encore)."""
+        session = request.session
+        conversation_id = session.get(SESSION_CONVERSATION_KEY)
+        if conversation_id is None:
+            return self._legacy_window(session.get(LEGACY_HISTORY_KEY, []), session.get(LEGACY_SUMMARY_KEY, ''))
+
+        row = Conversation.objects.filter(pk=conversation_id).values_list(
+            'last_message_id', 'summary', 'window_start_id'
+        ).first()
+        if row is None:
+            return ConversationWindow()
+        window = self._cached(conversation_id, row[0])
+        if window is not None:
+            return window
+        messages = ConversationMessage.objects.filter(
+            conversation_id=conversation_id, id__gte=row[2] or 0
+        ).order_by('id').values_list('id', 'role', 'text')
+        return self._build_window(conversation_id, row, messages)
+
+    async def aload(self, request):
+        """Version asynchrone de load() (vues ASGI)."""
+        session = request.session
+        conversation_id = await session.aget(SESSION_CONVERSATION_KEY)
+        if conversation_id is None:
+            return self._legacy_window(
+                await session.aget(LEGACY_HISTORY_KEY, []), await session.aget(LEGACY_SUMMARY_KEY, '')
+            )
+
+        row = await Conversation.objects.filter(pk=conversation_id).values_list(
+            'last_message_id', 'summary', 'window_start_id'
+        ).afirst()
+        if row is None:
+            return ConversationWindow()
+        window = self._cached(conversation_id, row[0])
+        if window is not None:
+            return window
+        messages = [
+            m async for m in ConversationMessage.objects.filter(
+                conversation_id=conversation_id, id__gte=row[2] or 0
+            ).order_by('id').values_list('id', 'role', 'text')
+        ]
+        return self._build_window(conversation_id, row, messages)
+
+    # --- Création ---
+
+    def _new_messages(self, conversation_id, history):
+        return [
+            ConversationMessage(conversation_id=conversation_id, role=m.get('role', 'user'), text=_texte(m))
+            for m in history
+        ]
+
+    def _created(self, session, window, conversation, messages):
+        window.conversation_id = conversation.pk
+        window.ids = [m.pk for m in messages]
+        window.last_message_id = window.ids[-1] if window.ids else None
+        session[SESSION_CONVERSATION_KEY] = conversation.pk
+        session.pop(LEGACY_HISTORY_KEY, None)
+        session.pop(LEGACY_SUMMARY_KEY, None)
+
+    def ensure(self, request, window):
+        """
+        Crée la conversation si besoin (seule écriture de la session). À appeler
+        avant une réponse en streaming : le cookie de session part avec les en-têtes.
+        """
+        if window.conversation_id is not None:
+            return window
+        if not request.session.session_key:
+            request.session.save()
+        user = getattr(request, 'user', None)
+        conversation = Conversation.objects.create(
+            session_key=request.session.session_key,
+            user=user if user is not None and user.is_authenticated else None,
+            summary=window.summary,
+        )
+        messages = ConversationMessage.objects.bulk_create(self._new_messages(conversation.pk, window.history))
+        self._created(request.session, window, conversation, messages)
+        if messages:
+            Conversation.objects.filter(pk=conversation.pk).update(
+                window_start_id=window.ids[0], last_message_id=window.last_message_id
+            )
+        return window
+
+    async def aensure(self, request, window):
+        """Version asynchrone de ensure()."""
+        if window.conversation_id is not None:
+            return window
+        if not request.session.session_key:
+            await request.session.asave()
+        user = await request.auser() if hasattr(request, 'auser') else None
+        conversation = await Conversation.objects.acreate(
+            session_key=request.session.session_key,
+            user=user if user is not None and user.is_authenticated else None,
+            summary=window.summary,
+        )
+        messages = await ConversationMessage.objects.abulk_create(self._new_messages(conversation.pk, window.history))
+        self._created(request.session, window, conversation, messages)
+        if messages:
+            await Conversation.objects.filter(pk=conversation.pk).aupdate(
+                window_start_id=window.ids[0], last_message_id=window.last_message_id
+            )
+        return window
+
+    # --- Ajout d'un échange ---
+
+    def _advance(self, window, messages):
+        """Ajoute les messages insérés à la fenêtre, la borne et retourne les champs à mettre à jour."""
+        history = window.history + [_message(m.role, m.text) for m in messages]
+        ids = window.ids + [m.pk for m in messages]
+        kept, summary, compresses = self.manager.compact(history, window.summary)
+        start = len(history) - len(kept)
+        fields = {'last_message_id': ids[-1], 'updated_at': timezone.now()}
+        if compresses:
+            fields.update(summary=summary, window_start_id=ids[start])
+        window.history, window.ids, window.summary = kept, ids[start:], summary
+        window.last_message_id = ids[-1]
+        self.manager.record(window.conversation_id, kept, summary, compresses)
+        self._remember(window)
+        return fields
+
+    def append(self, request, window, turn):
+        """Insère le nouvel échange (et seulement lui) ; retourne la fenêtre mise à jour."""
+        self.ensure(request, window)
+        messages = ConversationMessage.objects.bulk_create(self._new_messages(window.conversation_id, turn))
+        fields = self._advance(window, messages)
+        Conversation.objects.filter(pk=window.conversation_id).update(**fields)
+        return window
+
+    async def aappend(self, request, window, turn):
+        """Version asynchrone de append()."""
+        await self.aensure(request, window)
+        messages = await ConversationMessage.objects.abulk_create(self._new_messages(window.conversation_id, turn))
+        fields = self._advance(window, messages)
+        await Conversation.objects.filter(pk=window.conversation_id).aupdate(**fields)
+        return window
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'cached_conversations': len(self._windows),
+                'max_size': self.cache_size,
+            }
+
+
+conversation_store = ConversationStore.from_settings()
@@ -0,0 +1,113 @@
+# modele_ai/explainers.py
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import shap
+
+logger = logging.getLogger(__name__)
+
+
+class ExplanationEngine:
+    """
+    Moteur d'explications SHAP pour le modèle de risque.
+
+    - Modèle à base d'arbres (RandomForest, GradientBoosting, ...) : TreeExplainer
+      exact (perturbation interventionnelle sur le background), sans appel à predict.
+    - Sinon : KernelExplainer construit une seule fois sur un background résumé par
+      k-means, avec un cache LRU des explications par visite.
+
+    Pour un classifieur à labels numériques, on explique l'espérance du label
+    (somme des probabilités pondérées par la valeur de chaque classe), ce qui
+    reste comparable à l'ancien shap.Explainer(model.predict, X_background).
+    """
+    KMEANS_K = 10
+    KERNEL_NSAMPLES = 200
+    CACHE_SIZE = 1024
+
+    def __init__(self, model, background, features, use_tree=True):
+        self.model = model
+        self.features = list(features)
+        self.background = pd.DataFrame(background, columns=self.features).astype(float)
+        self.class_weights = self._class_weights(model)
+        self._cache = OrderedDict()
+        self.kind = "tree"
+        try:
+            if not use_tree:
+                raise ValueError("désactivé")
+            self.explainer = shap.TreeExplainer(
+                model,
+                data=self.background,
+                feature_perturbation="interventional",
+                model_output="probability" if self.class_weights is not None else "raw",
+            )
+        except Exception as e:
+            logger.info(f"TreeExplainer indisponible pour {type(model).__name__} ({e}), repli sur KernelExplainer.")
+            self.kind = "kernel"
+            summary = shap.kmeans(self.background.values, min(self.KMEANS_K, len(self.background)))
+            self.explainer = shap.KernelExplainer(self._predict_numeric, summary)
+
+    @staticmethod
+    def _class_weights(model):
+        """Valeurs numériques des classes d'un classifieur, None sinon."""
+        classes = getattr(model, "classes_", None)
+        if classes is None or not hasattr(model, "predict_proba"):
+            return None
+        try:
+            return np.asarray(classes, dtype=float)
+        except (TypeError, ValueError):
+            return None
+
+    def _predict_numeric(self, X):
+        """Sortie numérique expliquée par le KernelExplainer."""
+        X = pd.DataFrame(X, columns=self.features)
+        if self.class_weights is not None:
+            return self.model.predict_proba(X) @ self.class_weights
+        return np.asarray(self.model.predict(X), dtype=float)
+
+    def _reduce(self, values, base_values):
+        """Ramène une sortie multi-classes (n, f, k) à l'espérance du label (n, f)."""
+        values = np.asarray(values)
+        base_values = np.asarray(base_values, dtype=float)
+        if values.ndim == 3:
+            values = values @ self.class_weights
+            base_values = base_values @ self.class_weights
+        return values, base_values
+
+    def explain(self, X):
+        """Retourne (valeurs SHAP (n, f), base_values (n,)) pour la matrice X."""
+        X = pd.DataFrame(X, columns=self.features).astype(float)
+        if self.kind == "tree":
+            values, base = self._reduce(self.explainer.shap_values(X), self.explainer.expected_value)
+            return values, np.broadcast_to(base, (len(X),))
+
+        # KernelExplainer : on n'explique que les visites absentes du cache
+        rows = [tuple(r) for r in X.values]
+        resultats = {}
+        for row in dict.fromkeys(rows):
+            if row in self._cache:
+                self._cache.move_to_end(row)
+                resultats[row] = self._cache[row]
+        manquantes = [r for r in dict.fromkeys(rows) if r not in resultats]
+        if manquantes:
+            values = self.explainer.shap_values(np.array(manquantes), nsamples=self.KERNEL_NSAMPLES, silent=True)
+            base = float(np.asarray(self.explainer.expected_value).reshape(-1)[0])
+            for row, v in zip(manquantes, np.asarray(values)):
+                resultats[row] = self._cache[row] = (v, base)
+                if len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        values = np.array([resultats[r][0] for r in rows])
+        base = np.array([resultats[r][1] for r in rows])
+        return values, base
+
+    def explanations(self, X):
+        """Format de réponse de PredictionView : [{"base_value", "contributions"}]."""
+        values, base_values = self.explain(X)
+        return [
+            {
+                "base_value": float(base_values[i]),
+                "contributions": {col: float(values[i][j]) for j, col in enumerate(self.features)},
+            }
+            for i in range(len(values))
+        ]
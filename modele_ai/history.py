@@ -0,0 +1,112 @@
+# modele_ai/history.py
+import logging
+import re
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _texte(message):
+    return ''.join(p.get('text', '') for p in message.get('parts', []))
+
+
+def _abrege(texte, limite):
+    """Première phrase du texte, tronquée à `limite` caractères."""
+    texte = ' '.join(texte.split())
+    phrase = re.split(r'(?<=[.!?])\s', texte, maxsplit=1)[0]
+    return phrase if len(phrase) <= limite else phrase[:limite - 1].rstrip() + '…'
+
+
+class ChatHistoryManager:
+    """
+    Historique borné des conversations du chatbot (stockage : conversations.ConversationStore).
+
+    On garde au plus `max_turns` échanges (question + réponse) et `max_chars`
+    caractères ; les échanges plus anciens sont compressés localement (sans appel
+    à Gemini) dans un résumé glissant d'au plus `summary_chars` caractères,
+    transmis au modèle dans l'instruction système.
+    """
+
+    def __init__(self, max_turns=10, max_chars=6000, summary_chars=1000):
+        self.max_turns = max_turns
+        self.max_chars = max_chars
+        self.summary_chars = summary_chars
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._total_chars = 0
+        self._max_seen_chars = 0
+        self._compactions = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_turns=getattr(settings, 'CHAT_HISTORY_MAX_TURNS', 10),
+            max_chars=getattr(settings, 'CHAT_HISTORY_MAX_CHARS', 6000),
+            summary_chars=getattr(settings, 'CHAT_SUMMARY_MAX_CHARS', 1000),
+        )
+
+    def compact(self, history, summary):
+        """Retourne (historique, résumé, nb d'échanges compressés)."""
+        turns = self._turns(history)
+        taille = sum(len(_texte(m)) for m in history)
+        compresses = 0
+        # Toujours garder le dernier échange, même s'il dépasse le budget à lui seul
+        while len(turns) > 1 and (len(turns) > self.max_turns or taille > self.max_chars):
+            turn = turns.pop(0)
+            taille -= sum(len(_texte(m)) for m in turn)
+            summary = self._fold(summary, turn)
+            compresses += 1
+        return [m for turn in turns for m in turn], summary, compresses
+
+    @staticmethod
+    def _turns(history):
+        """Découpe l'historique en échanges commençant par un message utilisateur."""
+        turns = []
+        for message in history:
+            if message.get('role') == 'user' or not turns:
+                turns.append([message])
+            else:
+                turns[-1].append(message)
+        return turns
+
+    def _fold(self, summary, turn):
+        """Ajoute un échange au résumé glissant (les lignes les plus anciennes sortent en premier)."""
+        question = ' '.join(_texte(m) for m in turn if m.get('role') == 'user')
+        reponse = ' '.join(_texte(m) for m in turn if m.get('role') != 'user')
+        ligne = f"- Q : {_abrege(question, 120)}"
+        if reponse:
+            ligne += f" → R : {_abrege(reponse, 160)}"
+        lignes = [l for l in summary.splitlines() if l] + [ligne]
+        while len(lignes) > 1 and len('\n'.join(lignes)) > self.summary_chars:
+            lignes.pop(0)
+        return '\n'.join(lignes)[-self.summary_chars:]
+
+    def record(self, conversation_id, history, summary, compresses):
+        """Journalise la taille de la fenêtre envoyée à Gemini."""
+        taille = sum(len(_texte(m)) for m in history)
+        with self._lock:
+            self._requests += 1
+            self._total_chars += taille
+            self._max_seen_chars = max(self._max_seen_chars, taille)
+            self._compactions += compresses
+        logger.info(
+            f"Historique chatbot conversation={conversation_id} messages={len(history)} "
+            f"caracteres={taille} resume={len(summary)} compresses={compresses}"
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'avg_history_chars': round(self._total_chars / self._requests, 1) if self._requests else 0,
+                'max_history_chars': self._max_seen_chars,
+                'compacted_turns': self._compactions,
+                'max_turns': self.max_turns,
+                'max_chars': self.max_chars,
+                'summary_chars': self.summary_chars,
+            }
+
+
+history_manager = ChatHistoryManager.from_settings()
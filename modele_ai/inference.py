@@ -0,0 +1,289 @@
+# modele_ai/inference.py
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+from jali_django_api.checks import cache_is_process_local
+
+from .registry import registry
+from .services import batch_summary, compute_rows, predict_batch
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBusy(Exception):
+    """File d'attente pleine ou délai dépassé : répondre 503 avec Retry-After."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobStoreUnavailable(Exception):
+    """Cache des jobs local au processus : un job ne serait pas retrouvé par les autres workers."""
+
+
+# --- Tâches exécutées dans les processus du pool (fonctions picklables) ---
+
+def _compute_in_worker(X, explain):
+    ml = registry.get()
+    if ml.model is None:
+        raise RuntimeError(f"Modèle indisponible : {ml.error}")
+    return compute_rows(ml.model, ml.explainer, X, explain)
+
+
+def _batch_in_worker(patients):
+    ml = registry.get()
+    if ml.model is None:
+        raise RuntimeError(f"Modèle indisponible : {ml.error}")
+    return predict_batch(ml.model, patients)
+
+
+class InferencePool:
+    """
+    Pool de processus dédié à l'inférence (predict + SHAP), pour ne pas bloquer
+    les threads WSGI. Le nombre de tâches en cours ou en attente est borné :
+    au-delà, InferenceBusy est levée immédiatement (backpressure).
+
+    Les processus sont créés par fork depuis le worker après chargement du
+    registre : ils héritent du modèle déjà en mémoire (pages partagées).
+    Un pool par processus gunicorn, recréé si le PID change ou s'il est cassé.
+    Les tâches en cours sont comptées par exécuteur : celles d'un pool cassé,
+    terminées après sa recréation, ne libèrent pas de place dans le nouveau.
+    Avec des workers gunicorn gthread, `max_pending` borne les calculs des threads
+    d'un même worker ; en workers sync, un worker n'a qu'une requête à la fois.
+    """
+
+    def __init__(self, max_workers, max_pending, timeout, retry_after):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = {}  # exécuteur -> tâches en cours ou en attente
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_workers=getattr(settings, "INFERENCE_POOL_WORKERS", 2),
+            max_pending=getattr(settings, "INFERENCE_MAX_PENDING", 8),
+            timeout=getattr(settings, "INFERENCE_TIMEOUT", 30),
+            retry_after=getattr(settings, "INFERENCE_RETRY_AFTER", 5),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_workers > 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Processus forké : le pool et les tâches du parent n'existent pas ici
+                self._executor, self._pending = None, {}
+            if self._executor is None:
+                registry.get()  # chargé avant le fork, hérité par les processus du pool
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("fork"),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self, executor):
+        with self._lock:
+            en_cours = self._pending.get(executor, 0)
+            if en_cours >= self.max_pending:
+                raise InferenceBusy("Trop de calculs en cours, réessayez plus tard.", self.retry_after)
+            self._pending[executor] = en_cours + 1
+
+    def _release(self, executor):
+        with self._lock:
+            en_cours = self._pending.get(executor, 0) - 1
+            if en_cours > 0:
+                self._pending[executor] = en_cours
+            else:
+                self._pending.pop(executor, None)
+
+    def _done(self, executor, future):
+        self._release(executor)
+        # Worker mort (mémoire, segfault) : on écarte le pool qui a exécuté la tâche,
+        # pas celui éventuellement recréé entre-temps par une autre requête
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._reset(executor)
+
+    def submit(self, fn, *args):
+        """Soumet une tâche si une place est libre, sinon lève InferenceBusy."""
+        if not self.enabled:
+            # Pool désactivé (INFERENCE_POOL_WORKERS = 0) : calcul immédiat dans le processus
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        executor = self._get_executor()
+        self._acquire(executor)
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._release(executor)
+            self._reset(executor)
+            raise InferenceBusy("Pool d'inférence indisponible, réessayez plus tard.", self.retry_after)
+        # La place n'est libérée qu'à la fin réelle du calcul, même après un timeout
+        future.add_done_callback(lambda f: self._done(executor, f))
+        return future
+
+    def run(self, fn, *args):
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise InferenceBusy(f"Calcul trop long (> {self.timeout} s), réessayez plus tard.", self.retry_after)
+        except BrokenProcessPool:
+            # Pool déjà écarté par _done, avec l'exécuteur de la tâche
+            raise InferenceBusy("Pool d'inférence indisponible, réessayez plus tard.", self.retry_after)
+
+    def compute(self, X, explain):
+        """Callback `compute` de services.predict_rows : calcul dans le pool, ou localement si désactivé."""
+        return self.run(_compute_in_worker, X, explain)
+
+    def stats(self):
+        executor = self._executor
+        return {
+            "enabled": self.enabled,
+            "started": executor is not None and self._pid == os.getpid(),
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._pending.get(executor, 0) if executor is not None else 0,
+            "timeout": self.timeout,
+        }
+
+
+class BatchJobs:
+    """
+    Mode asynchrone des prédictions en lot : la tâche est soumise au pool et son
+    état est conservé dans un cache Django (alias INFERENCE_JOB_CACHE, "shared" par
+    défaut). N'importe quel worker doit pouvoir répondre : sur un cache local au
+    processus (LocMem), le mode asynchrone est refusé (JobStoreUnavailable).
+    Chaque job garde l'utilisateur qui l'a lancé (et l'hôpital scoré) : voir visible_by.
+    """
+    PREFIX = "modele_ai:job:"
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    @property
+    def alias(self):
+        return getattr(settings, "INFERENCE_JOB_CACHE", "shared")
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def ttl(self):
+        return getattr(settings, "INFERENCE_JOB_TTL", 3600)
+
+    def _new_job(self, user_id, hopital_id, **champs):
+        if cache_is_process_local(self.alias):
+            raise JobStoreUnavailable(
+                f"Mode asynchrone indisponible : INFERENCE_JOB_CACHE={self.alias!r} n'est pas partagé entre workers."
+            )
+        return {"job_id": uuid.uuid4().hex, "status": "pending", "user_id": user_id, "hopital_id": hopital_id, **champs}
+
+    def submit(self, patients, user_id, hopital_id=None):
+        job = self._new_job(user_id, hopital_id)
+        future = self.pool.submit(_batch_in_worker, patients)
+        self.cache.set(self.PREFIX + job["job_id"], job, timeout=self.ttl)
+        future.add_done_callback(lambda f: self._store(job, f, patients))
+        return job["job_id"]
+
+    def submit_hopital(self, hopital_id, user_id, page_size, total):
+        """
+        Score toutes les grossesses en cours d'un hôpital, par pages de `page_size`,
+        dans un thread du worker : les visites ne sont jamais toutes en mémoire et
+        chaque page passe par le pool (une place à la fois). `processed` suit l'avancement.
+        """
+        job = self._new_job(user_id, hopital_id, total=total, processed=0)
+        self.cache.set(self.PREFIX + job["job_id"], job, timeout=self.ttl)
+        threading.Thread(
+            target=self._run_hopital, args=(job, hopital_id, page_size), name=f"batch-job-{job['job_id']}", daemon=True
+        ).start()
+        return job["job_id"]
+
+    def _run_hopital(self, job, hopital_id, page_size):
+        from .services import iter_hopital_visits
+
+        count, errors, results = 0, 0, []
+        try:
+            for page in iter_hopital_visits(hopital_id, page_size):
+                summary = batch_summary(page, self._run_page(page))
+                count += summary["count"]
+                errors += summary["errors"]
+                results.extend(summary["results"])
+                self._save({**job, "processed": count})
+            data = {**job, "status": "done", "processed": count, "count": count, "errors": errors, "results": results}
+        except Exception as e:
+            logger.error(f"Erreur du job de prédiction {job['job_id']}: {e}", exc_info=True)
+            data = {**job, "status": "error", "processed": count, "message": str(e)}
+        self._save(data)
+
+    def _run_page(self, page):
+        while True:
+            try:
+                future = self.pool.submit(_batch_in_worker, page)
+            except InferenceBusy as e:
+                # Pool occupé par les requêtes en ligne : le job attend son tour
+                time.sleep(e.retry_after)
+                continue
+            return future.result()
+
+    def _store(self, job, future, patients):
+        try:
+            results = future.result()
+        except Exception as e:
+            logger.error(f"Erreur du job de prédiction {job['job_id']}: {e}", exc_info=True)
+            data = {**job, "status": "error", "message": str(e)}
+        else:
+            data = {**job, "status": "done", **batch_summary(patients, results)}
+        self._save(data)
+
+    def _save(self, data):
+        try:
+            self.cache.set(self.PREFIX + data["job_id"], data, timeout=self.ttl)
+        finally:
+            # Appelé depuis un thread du pool ou du job : pas de connexion (DatabaseCache) laissée ouverte
+            connection.close()
+
+    def get(self, job_id):
+        return self.cache.get(self.PREFIX + job_id)
+
+    @staticmethod
+    def visible_by(job, user, hopitaux=None):
+        """Un job n'est lisible que par l'utilisateur qui l'a lancé, tant qu'il a accès à l'hôpital scoré."""
+        if job.get("user_id") != user.id:
+            return False
+        return job.get("hopital_id") is None or hopitaux is None or job["hopital_id"] in hopitaux
+
+
+inference_pool = InferencePool.from_settings()
+batch_jobs = BatchJobs(inference_pool)
@@ -0,0 +1,64 @@
+# modele_ai/management/commands/benchmark_shap.py
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import shap
+from django.core.management.base import BaseCommand, CommandError
+
+from modele_ai.explainers import ExplanationEngine
+from modele_ai.services import DATA_PATH, EXPECTED_FEATURES, MODEL_PATH, load_background
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare la latence et la concordance de l'ExplanationEngine avec l'ancien "
+        "shap.Explainer(model.predict, X_background)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20, help="Nombre de visites expliquées.")
+        parser.add_argument("--background", type=int, default=100, help="Taille du background SHAP.")
+        parser.add_argument("--kernel", action="store_true", help="Forcer le repli KernelExplainer.")
+
+    def handle(self, *args, **options):
+        try:
+            model = joblib.load(MODEL_PATH)
+        except Exception as e:
+            raise CommandError(f"Impossible de charger le modèle : {e}")
+
+        X_background = load_background(n=options["background"])
+        X = pd.read_csv(DATA_PATH)[EXPECTED_FEATURES].sample(n=options["rows"], random_state=7).astype(float)
+
+        # Référence : chemin model-agnostic actuel
+        t0 = time.perf_counter()
+        legacy = shap.Explainer(model.predict, X_background)
+        init_legacy = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ref = legacy(X)
+        run_legacy = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        engine = ExplanationEngine(model, X_background, EXPECTED_FEATURES, use_tree=not options["kernel"])
+        init_engine = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        values, _ = engine.explain(X)
+        run_engine = time.perf_counter() - t0
+
+        ref_values = np.asarray(ref.values)
+        diff = np.abs(values - ref_values)
+        corr = np.corrcoef(values.ravel(), ref_values.ravel())[0, 1]
+        top_ok = np.mean(np.argmax(np.abs(values), axis=1) == np.argmax(np.abs(ref_values), axis=1))
+        sign_ok = np.mean(np.sign(values) == np.sign(ref_values))
+
+        n = len(X)
+        self.stdout.write(f"Modèle : {type(model).__name__} — moteur : {engine.kind} — {n} visite(s)")
+        self.stdout.write(f"Ancien  : init {init_legacy * 1000:.1f} ms, {run_legacy / n * 1000:.1f} ms/visite")
+        self.stdout.write(f"Moteur  : init {init_engine * 1000:.1f} ms, {run_engine / n * 1000:.1f} ms/visite")
+        self.stdout.write(f"Accélération : x{run_legacy / max(run_engine, 1e-9):.1f}")
+        self.stdout.write(
+            f"Concordance : corrélation {corr:.3f}, écart absolu moyen {diff.mean():.4f} (max {diff.max():.4f}), "
+            f"même feature principale {top_ok:.0%}, même signe {sign_ok:.0%}"
+        )
+        self.stdout.write(self.style.SUCCESS("Benchmark terminé."))
@@ -0,0 +1,66 @@
+# modele_ai/management/commands/chat_load_test.py
+import asyncio
+import json
+import time
+
+import httpx
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge du chatbot : N utilisateurs simultanés envoient des messages "
+        "à l'URL donnée (à lancer contre un serveur branché sur fake_gemini_server)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Ex. http://127.0.0.1:8000/api/chatbot/async/")
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--messages", type=int, default=3, help="Messages par utilisateur.")
+        parser.add_argument("--stream", action="store_true")
+        parser.add_argument("--timeout", type=float, default=60)
+
+    def handle(self, *args, **options):
+        resultats = asyncio.run(self._run(options))
+        latences = sorted(r["latence"] for r in resultats if r["status"] == 200)
+        ttfb = sorted(r["ttfb"] for r in resultats if r["status"] == 200)
+        statuts = {}
+        for r in resultats:
+            statuts[r["status"]] = statuts.get(r["status"], 0) + 1
+
+        def pct(valeurs, p):
+            return valeurs[min(int(len(valeurs) * p), len(valeurs) - 1)] * 1000 if valeurs else 0
+
+        self.stdout.write(f"Requêtes : {len(resultats)} — statuts : {statuts}")
+        self.stdout.write(f"Premier octet : p50 {pct(ttfb, 0.5):.0f} ms, p95 {pct(ttfb, 0.95):.0f} ms")
+        self.stdout.write(f"Réponse complète : p50 {pct(latences, 0.5):.0f} ms, p95 {pct(latences, 0.95):.0f} ms")
+
+    async def _run(self, options):
+        limits = httpx.Limits(max_connections=options["users"])
+        async with httpx.AsyncClient(timeout=options["timeout"], limits=limits) as http:
+            debut = time.perf_counter()
+            listes = await asyncio.gather(*(self._user(http, options) for _ in range(options["users"])))
+            self.stdout.write(f"Durée totale : {time.perf_counter() - debut:.2f} s")
+        return [r for liste in listes for r in liste]
+
+    async def _user(self, http, options):
+        resultats = []
+        for i in range(options["messages"]):
+            body = {"message": f"Comment bien m'hydrater ? ({i})", "stream": options["stream"]}
+            debut = time.perf_counter()
+            ttfb = None
+            erreur_flux = False
+            try:
+                async with http.stream("POST", options["url"], content=json.dumps(body),
+                                       headers={"Content-Type": "application/json"}) as response:
+                    async for morceau in response.aiter_bytes():
+                        if ttfb is None:
+                            ttfb = time.perf_counter() - debut
+                        erreur_flux = erreur_flux or b"event: error" in morceau
+                    # En streaming, saturation et erreurs Gemini arrivent dans le flux (statut 200)
+                    status = "erreur flux" if erreur_flux else response.status_code
+            except httpx.HTTPError:
+                status = "erreur"
+            fin = time.perf_counter() - debut
+            resultats.append({"status": status, "latence": fin, "ttfb": ttfb if ttfb is not None else fin})
+        return resultats
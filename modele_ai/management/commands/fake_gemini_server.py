@@ -0,0 +1,94 @@
+# modele_ai/management/commands/fake_gemini_server.py
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """
+    Imite les routes generateContent / streamGenerateContent de l'API Gemini
+    avec une latence configurable. Aucun appel réseau externe.
+    """
+    protocol_version = "HTTP/1.1"
+    latency = 0.5
+    chunks = 5
+    chunk_delay = 0.05
+
+    def log_message(self, format, *args):
+        pass
+
+    def _payload(self, text, finish=True):
+        candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        if finish:
+            candidate["finishReason"] = "STOP"
+        return {
+            "candidates": [candidate],
+            "usageMetadata": {"promptTokenCount": 10, "candidatesTokenCount": 10, "totalTokenCount": 20},
+            "modelVersion": "fake-gemini",
+        }
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        if ":streamGenerateContent" in self.path:
+            self._stream()
+        elif ":generateContent" in self.path:
+            time.sleep(self.latency)
+            body = json.dumps(self._payload("Pensez à bien vous hydrater et à vous reposer.")).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def _stream(self):
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(self.chunks):
+            event = f"data: {json.dumps(self._payload(f'fragment {i} ', finish=i == self.chunks - 1))}\r\n\r\n".encode()
+            self.wfile.write(f"{len(event):X}\r\n".encode() + event + b"\r\n")
+            self.wfile.flush()
+            time.sleep(self.chunk_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class Command(BaseCommand):
+    help = (
+        "Démarre un faux serveur Gemini local pour les tests de charge du chatbot "
+        "(utiliser GEMINI_BASE_URL=http://127.0.0.1:<port>)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--latency", type=float, default=0.5, help="Délai avant la réponse (s).")
+        parser.add_argument("--chunks", type=int, default=5, help="Nombre de fragments en streaming.")
+        parser.add_argument("--chunk-delay", type=float, default=0.05, help="Délai entre fragments (s).")
+
+    def handle(self, *args, **options):
+        handler = type("Handler", (FakeGeminiHandler,), {
+            "latency": options["latency"],
+            "chunks": options["chunks"],
+            "chunk_delay": options["chunk_delay"],
+        })
+        server = ThreadingHTTPServer((options["host"], options["port"]), handler)
+        server.daemon_threads = True
+        self.stdout.write(self.style.SUCCESS(
+            f"Faux serveur Gemini sur http://{options['host']}:{options['port']} "
+            f"(latence {options['latency']} s) — Ctrl+C pour arrêter."
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,86 @@
+# modele_ai/management/commands/measure_model_memory.py
+import gc
+import os
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from modele_ai.registry import process_memory, registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la mémoire par worker (RSS/PSS/privée) : soit des workers gunicorn en "
+        "cours d'exécution (--master), soit une simulation avec et sans préchargement."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--master", type=int, help="PID du master gunicorn : mesure ses workers.")
+        parser.add_argument("--workers", type=int, default=3, help="Nombre de workers simulés.")
+
+    def handle(self, *args, **options):
+        if not os.path.exists("/proc/self/smaps_rollup"):
+            raise CommandError("/proc/<pid>/smaps_rollup indisponible sur ce système.")
+
+        if options["master"]:
+            self._report_master(options["master"])
+            return
+
+        # Sans préchargement d'abord : le processus courant n'a pas encore chargé le modèle
+        self.stdout.write("Sans préchargement (chaque worker charge le modèle) :")
+        self._report(self._simulate(options["workers"], preload=False))
+        self.stdout.write("Avec préchargement dans le master (copy-on-write + gc.freeze) :")
+        self._report(self._simulate(options["workers"], preload=True))
+
+    def _report_master(self, master_pid):
+        try:
+            with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+                pids = [int(p) for p in f.read().split()]
+        except OSError as e:
+            raise CommandError(f"Impossible de lire les workers du master {master_pid} : {e}")
+        self.stdout.write(f"Master {master_pid} : {process_memory(master_pid)}")
+        self._report({pid: process_memory(pid) for pid in pids})
+
+    def _simulate(self, nb_workers, preload):
+        if preload:
+            registry.warm()
+            gc.freeze()
+
+        enfants = []
+        for _ in range(nb_workers):
+            lecture, ecriture = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(lecture)
+                try:
+                    ml = registry.get()
+                    # Une explication pour toucher les pages comme une vraie requête
+                    ml.explainer.explain(ml.explainer.background.head(5))
+                    os.write(ecriture, b"1")
+                except Exception:
+                    os.write(ecriture, b"0")
+                signal.pause()
+                os._exit(0)
+            os.close(ecriture)
+            enfants.append((pid, lecture))
+
+        mesures = {}
+        for pid, lecture in enfants:
+            ok = os.read(lecture, 1) == b"1"
+            os.close(lecture)
+            mesures[pid] = process_memory(pid) if ok else {"erreur": "chargement du modèle impossible"}
+        for pid, _ in enfants:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        return mesures
+
+    def _report(self, mesures):
+        for pid, mem in mesures.items():
+            self.stdout.write(f"  worker {pid} : {mem}")
+        valides = [m for m in mesures.values() if "pss_mb" in m]
+        if valides:
+            pss = sum(m["pss_mb"] for m in valides)
+            privee = sum(m["private_mb"] for m in valides)
+            self.stdout.write(self.style.SUCCESS(
+                f"  total PSS {pss:.1f} Mo, total privé {privee:.1f} Mo pour {len(valides)} worker(s)"
+            ))
@@ -0,0 +1,20 @@
+# modele_ai/management/commands/warm_models.py
+from django.core.management.base import BaseCommand, CommandError
+
+from modele_ai.registry import registry
+
+
+class Command(BaseCommand):
+    help = "Charge le modèle de risque, l'explainer SHAP et le cache, et affiche le temps de chargement et la mémoire."
+
+    def handle(self, *args, **options):
+        status = registry.warm()
+        if not status["ok"]:
+            raise CommandError(f"Échec du chargement du modèle : {status['error']}")
+
+        self.stdout.write(f"Modèle : {status['model_type']} — explainer : {status['explainer']} — empreinte : {status['model_fingerprint']}")
+        self.stdout.write(f"Chargement : {status['load_seconds']} s")
+        self.stdout.write(
+            f"Mémoire (RSS) : {status['rss_before_mb']} -> {status['rss_after_mb']} Mo (+{status['rss_delta_mb']} Mo)"
+        )
+        self.stdout.write(self.style.SUCCESS("Modèles préchargés."))
@@ -1,3 +1,35 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class Conversation(models.Model):
+    """
+    Conversation du chatbot. La session ne garde que l'identifiant de la
+    conversation ; les messages sont des lignes ajoutées, jamais réécrites.
+    """
+    session_key = models.CharField(max_length=40, null=True, blank=True, db_index=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="conversations"
+    )
+    summary = models.TextField(blank=True, default="")  # résumé glissant des échanges sortis de la fenêtre
+    window_start_id = models.BigIntegerField(null=True, blank=True)  # premier message de la fenêtre envoyée à Gemini
+    last_message_id = models.BigIntegerField(null=True, blank=True)  # version de la conversation (cache mémoire)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "chatbot_conversation"
+        indexes = [models.Index(fields=["user", "-updated_at"])]
+
+
+class ConversationMessage(models.Model):
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="messages")
+    role = models.CharField(max_length=10)  # "user" ou "model"
+    text = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "chatbot_message"
+        ordering = ["id"]
+        indexes = [models.Index(fields=["conversation", "id"])]
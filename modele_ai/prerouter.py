@@ -0,0 +1,159 @@
+# modele_ai/prerouter.py
+import difflib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from django.conf import settings
+
+GREETING_ANSWER = "Bonjour ! Je suis votre assistant de bien-être. Comment puis-je vous aider aujourd'hui ?"
+
+# Table des réponses préparées : (messages normalisés au chargement, réponse, quasi-doublons acceptés).
+# Réponses de bien-être général uniquement, dans le respect de SYSTEM_PROMPT (300 caractères max).
+# Les quasi-doublons ne valent que pour les formules de politesse : une question proche d'une
+# question de la FAQ peut porter sur autre chose (« combien de cafe boire par jour »).
+CANNED_ANSWERS = [
+    (
+        ["bonjour", "salut", "hello", "bonsoir", "coucou", "hi", "hey", "bonjour a vous", "salut a toi"],
+        GREETING_ANSWER,
+        True,
+    ),
+    (
+        ["merci", "merci beaucoup", "merci bien", "ok merci", "d accord merci", "super merci"],
+        "Avec plaisir ! N'hésitez pas si vous avez d'autres questions sur votre bien-être.",
+        True,
+    ),
+    (
+        ["au revoir", "bonne journee", "bonne soiree", "a bientot", "bye"],
+        "Au revoir et prenez soin de vous ! Je reste disponible si besoin.",
+        True,
+    ),
+    (
+        ["qui es tu", "tu es qui", "que peux tu faire", "a quoi sers tu"],
+        "Je suis votre assistant de bien-être pendant la grossesse : repos, hydratation, alimentation "
+        "équilibrée, activité légère. Pour tout symptôme ou traitement, consultez votre professionnel de santé.",
+        False,
+    ),
+    (
+        ["comment bien m hydrater", "combien d eau dois je boire", "combien d eau boire par jour"],
+        "Buvez régulièrement tout au long de la journée, par petites quantités, surtout s'il fait chaud "
+        "ou après un effort. Votre sage-femme ou médecin peut vous indiquer la quantité adaptée.",
+        False,
+    ),
+]
+
+
+def normalize_message(text):
+    """Minuscules, sans accents ni ponctuation, espaces réduits."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^a-z0-9]+", ' ', text)
+    return ' '.join(text.split())
+
+
+class ChatPreRouter:
+    """
+    Pré-routeur local devant le chatbot : répond sans appeler Gemini
+    - aux messages de la table CANNED_ANSWERS (égalité après normalisation ; quasi-doublon
+      accepté pour les salutations, remerciements et au revoir seulement),
+    - aux premières questions d'une conversation déjà posées récemment (LRU + TTL).
+    Les questions suivantes dépendent de l'historique et passent toujours par Gemini.
+    """
+
+    def __init__(self, canned=CANNED_ANSWERS, similarity=0.88, cache_size=512, ttl=86400):
+        self.similarity = similarity
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._canned = {}
+        self._fuzzy = {}
+        for messages, answer, fuzzy in canned:
+            for message in messages:
+                self._canned[normalize_message(message)] = answer
+                if fuzzy:
+                    self._fuzzy[normalize_message(message)] = answer
+        self._canned_answers = set(self._canned.values())
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_canned = 0
+        self.hits_cache = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            similarity=getattr(settings, 'CHAT_PREROUTER_SIMILARITY', 0.88),
+            cache_size=getattr(settings, 'CHAT_ANSWER_CACHE_SIZE', 512),
+            ttl=getattr(settings, 'CHAT_ANSWER_CACHE_TTL', 86400),
+        )
+
+    def is_first_turn(self, history, summary):
+        """
+        Vrai si la conversation n'a encore aucun contexte venant de Gemini : vide,
+        ou uniquement des réponses préparées (ex. « bonjour » puis une question).
+        """
+        if summary:
+            return False
+        return all(
+            ''.join(p.get('text', '') for p in m.get('parts', [])) in self._canned_answers
+            for m in history if m.get('role') == 'model'
+        )
+
+    def _match_canned(self, key):
+        answer = self._canned.get(key)
+        if answer is not None or not key:
+            return answer
+        # Quasi-doublons (fautes de frappe, lettres répétées) des formules de politesse : la table est petite
+        best, best_ratio = None, self.similarity
+        for pattern, candidate in self._fuzzy.items():
+            if abs(len(pattern) - len(key)) > max(3, len(pattern) // 3):
+                continue
+            ratio = difflib.SequenceMatcher(None, key, pattern).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = candidate, ratio
+        return best
+
+    def answer(self, message, first_turn):
+        """Réponse locale pour `message`, ou None s'il faut appeler Gemini."""
+        key = normalize_message(message)
+        answer = self._match_canned(key)
+        with self._lock:
+            if answer is not None:
+                self.hits_canned += 1
+                return answer
+            if first_turn:
+                item = self._recent.get(key)
+                if item is not None and item[0] >= time.monotonic():
+                    self._recent.move_to_end(key)
+                    self.hits_cache += 1
+                    return item[1]
+            self.misses += 1
+        return None
+
+    def remember(self, message, answer, first_turn):
+        """Mémorise la réponse de Gemini à une première question."""
+        if not first_turn or not answer:
+            return
+        key = normalize_message(message)
+        if not key:
+            return
+        with self._lock:
+            self._recent[key] = (time.monotonic() + self.ttl, answer)
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.cache_size:
+                self._recent.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits_canned + self.hits_cache + self.misses
+            return {
+                'hits_canned': self.hits_canned,
+                'hits_cache': self.hits_cache,
+                'misses': self.misses,
+                'hit_rate': round((self.hits_canned + self.hits_cache) / total, 4) if total else 0.0,
+                'cached_questions': len(self._recent),
+            }
+
+
+prerouter = ChatPreRouter.from_settings()
@@ -0,0 +1,119 @@
+# modele_ai/registry.py
+import logging
+import os
+import resource
+import threading
+import time
+
+from .services import EXPECTED_FEATURES, MODEL_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_mb():
+    """Mémoire résidente actuelle du processus (Mo), pic RSS à défaut de /proc."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def process_memory(pid="self"):
+    """
+    Mémoire d'un processus (Mo) d'après /proc/<pid>/smaps_rollup : RSS, PSS
+    (part proportionnelle des pages partagées) et pages privées/partagées.
+    """
+    champs = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for ligne in f:
+            parts = ligne.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                champs[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": round(champs.get("Rss", 0), 1),
+        "pss_mb": round(champs.get("Pss", 0), 1),
+        "shared_mb": round(champs.get("Shared_Clean", 0) + champs.get("Shared_Dirty", 0), 1),
+        "private_mb": round(champs.get("Private_Clean", 0) + champs.get("Private_Dirty", 0), 1),
+    }
+
+
+class ModelRegistry:
+    """
+    Chargement paresseux du modèle de risque, de l'explainer SHAP et du cache des
+    résultats : rien n'est fait à l'import, le premier appel à get() charge tout
+    (une seule fois par processus, protégé par un verrou).
+    Préchargement explicite : commande warm_models ou hooks de gunicorn.conf.py
+    (dans le master avec MODELE_AI_PRELOAD pour partager les pages entre workers,
+    sinon dans chaque worker avec MODELE_AI_WARM_ON_FORK).
+    """
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model_path = model_path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.model = None
+        self.explainer = None
+        self.result_cache = None
+        self.error = None
+        self.load_seconds = None
+        self.rss_before_mb = None
+        self.rss_after_mb = None
+
+    def get(self):
+        """Retourne le registre chargé ; self.model est None si le chargement a échoué."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+        return self
+
+    def warm(self):
+        return self.get().status()
+
+    def _load(self):
+        self.rss_before_mb = current_rss_mb()
+        debut = time.perf_counter()
+        try:
+            # Imports lourds (joblib, pandas, shap/numba) différés au premier usage
+            import joblib
+            from .cache import VisitResultCache, model_fingerprint
+            from .explainers import ExplanationEngine
+            from .services import load_background
+
+            model = joblib.load(self.model_path)
+            explainer = ExplanationEngine(model, load_background(), EXPECTED_FEATURES)
+            result_cache = VisitResultCache.from_settings(model_fingerprint(self.model_path))
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Erreur lors du chargement du modèle ou des données SHAP: {e}", exc_info=True)
+        else:
+            self.model, self.explainer, self.result_cache = model, explainer, result_cache
+            self.error = None
+        self.load_seconds = time.perf_counter() - debut
+        self.rss_after_mb = current_rss_mb()
+        self._loaded = True
+        logger.info(
+            f"Modèle chargé en {self.load_seconds:.2f}s (pid {os.getpid()}), "
+            f"RSS {self.rss_before_mb:.0f} -> {self.rss_after_mb:.0f} Mo"
+        )
+
+    def status(self):
+        return {
+            "loaded": self._loaded,
+            "ok": self.model is not None,
+            "error": self.error,
+            "pid": os.getpid(),
+            "model_type": type(self.model).__name__ if self.model is not None else None,
+            "explainer": self.explainer.kind if self.explainer is not None else None,
+            "model_fingerprint": self.result_cache.fingerprint if self.result_cache is not None else None,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "rss_before_mb": round(self.rss_before_mb, 1) if self.rss_before_mb is not None else None,
+            "rss_after_mb": round(self.rss_after_mb, 1) if self.rss_after_mb is not None else None,
+            "rss_delta_mb": round(self.rss_after_mb - self.rss_before_mb, 1) if self._loaded else None,
+            "current_rss_mb": round(current_rss_mb(), 1),
+        }
+
+
+registry = ModelRegistry()
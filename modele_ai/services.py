@@ -0,0 +1,282 @@
+# modele_ai/services.py
+import os
+
+import numpy as np
+
+# Les features attendues par le modèle
+EXPECTED_FEATURES = ['Age', 'SystolicBP', 'DiastolicBP', 'BS', 'BodyTemp', 'HeartRate']
+
+# 🚨 BORNES CLINIQUES ACCEPTABLES pour la validation (Valeurs min/max réalistes) 🚨
+# Toute donnée hors de ces bornes sera rejetée avec un code 400.
+# Ces valeurs doivent être ajustées selon les normes médicales exactes que vous ciblez.
+RANGES_CLINIQUES_ACCEPTABLES = {
+    'Age': (15, 60),           # Âge (années)
+    'SystolicBP': (70, 250),   # Tension artérielle systolique (mmHg)
+    'DiastolicBP': (40, 150),  # Tension artérielle diastolique (mmHg)
+    'BS': (1.0, 30.0),         # Glycémie (Blood Sugar)
+    'BodyTemp': (90.0, 104.0), # Température corporelle (°F) 
+    'HeartRate': (40, 180)     # Fréquence Cardiaque (BPM)
+}
+
+# Chemins d'accès aux fichiers (ajustés à votre structure)
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "maternal_health.pkl")
+DATA_PATH = os.path.join(os.path.dirname(__file__), "Maternal Health Risk Data Set.csv") # Pour SHAP background
+
+_MIN = np.array([RANGES_CLINIQUES_ACCEPTABLES[f][0] for f in EXPECTED_FEATURES], dtype=float)
+_MAX = np.array([RANGES_CLINIQUES_ACCEPTABLES[f][1] for f in EXPECTED_FEATURES], dtype=float)
+
+
+def _to_float_matrix(raw):
+    """
+    Conversion en float de toute la matrice en un seul appel NumPy ; cellule par
+    cellule uniquement si une valeur n'est pas numérique (pour le message d'erreur).
+    Retourne (matrice float, masque des valeurs non numériques).
+    """
+    try:
+        return np.array(raw, dtype=float).reshape(len(raw), len(EXPECTED_FEATURES)), None
+    except (TypeError, ValueError):
+        pass
+    X = np.full((len(raw), len(EXPECTED_FEATURES)), np.nan)
+    invalides = np.zeros(X.shape, dtype=bool)
+    for i, row in enumerate(raw):
+        for j, value in enumerate(row):
+            if value is None:
+                continue
+            try:
+                X[i, j] = float(value)
+            except (TypeError, ValueError):
+                invalides[i, j] = True
+    return X, invalides
+
+
+def validate_visits_matrix(visits, prefix=""):
+    """
+    Valide une liste de visites (features attendues, valeurs numériques, bornes
+    cliniques) en une passe vectorisée. Retourne (X, errors) où X est la matrice
+    (n_visites, n_features) prête pour le modèle, ou None si errors n'est pas vide.
+    """
+    if not isinstance(visits, list) or not visits:
+        return None, [f"{prefix}La liste 'visits' est manquante ou vide. Elle doit contenir au moins un enregistrement."]
+
+    errors = []
+    raw = []
+    presents = np.ones((len(visits), len(EXPECTED_FEATURES)), dtype=bool)
+    for i, visit in enumerate(visits):
+        if not isinstance(visit, dict):
+            errors.append(f"{prefix}Visite #{i + 1} : Le format est incorrect.")
+            raw.append([None] * len(EXPECTED_FEATURES))
+            presents[i, :] = False
+            continue
+        missing_features = [f for f in EXPECTED_FEATURES if f not in visit]
+        if missing_features:
+            errors.append(f"{prefix}Visite #{i + 1} : Colonnes manquantes : {', '.join(missing_features)}")
+            presents[i, [EXPECTED_FEATURES.index(f) for f in missing_features]] = False
+        raw.append([visit.get(f) for f in EXPECTED_FEATURES])
+
+    X, invalides = _to_float_matrix(raw)
+    nulles = presents & np.array([[v is None for v in row] for row in raw], dtype=bool)
+    if invalides is None:
+        invalides = np.zeros(X.shape, dtype=bool)
+    hors_bornes = presents & ~nulles & ~invalides & ((X < _MIN) | (X > _MAX) | np.isnan(X))
+
+    # Les messages ne sont construits que pour les cellules en erreur
+    for i, j in np.argwhere(nulles | invalides | hors_bornes):
+        feature = EXPECTED_FEATURES[j]
+        value = raw[i][j]
+        if nulles[i, j]:
+            errors.append(f"{prefix}Visite #{i + 1}, feature '{feature}' : La valeur ne peut pas être nulle.")
+        elif invalides[i, j]:
+            errors.append(f"{prefix}Visite #{i + 1}, feature '{feature}' : La valeur '{value}' doit être un nombre.")
+        else:
+            min_val, max_val = RANGES_CLINIQUES_ACCEPTABLES[feature]
+            errors.append(
+                f"{prefix}Visite #{i + 1}, feature '{feature}' : Valeur '{value}' hors des limites cliniques ({min_val} - {max_val}) voyez si c'est une erreur de saisie."
+            )
+
+    if errors:
+        return None, errors
+    return X, []
+
+
+def load_background(n=100, random_state=42):
+    """Échantillon du jeu de données d'entraînement servant de background SHAP."""
+    import pandas as pd
+    data_originale = pd.read_csv(DATA_PATH)
+    return data_originale[EXPECTED_FEATURES].sample(n=n, random_state=random_state)
+
+
+def summarize_predictions(predictions):
+    """Résumé global d'une série de prédictions (risque moyen, max, tendance)."""
+    tendance = predictions[-1] - predictions[0]
+    if tendance > 0:
+        tendance_str = "Le risque augmente"
+    elif tendance < 0:
+        tendance_str = "Le risque diminue"
+    else:
+        tendance_str = "Risque stable"
+    return {
+        "risque_moyen": float(predictions.mean()),
+        "risque_max": float(predictions.max()),
+        "tendance": tendance_str
+    }
+
+
+def compute_rows(model, explainer, X, explain=True):
+    """Calcul dans le processus courant : prédictions et, si demandé, explications SHAP."""
+    X_df = _as_model_input(X)
+    predictions = np.asarray(model.predict(X_df))
+    return predictions, explainer.explanations(X_df) if explain and explainer else None
+
+
+def predict_rows(model, X, cache=None, explainer=None, compute=None):
+    """
+    Prédictions (et explications SHAP si `explainer`) pour la matrice X.
+    Avec un VisitResultCache, seules les visites absentes du cache passent par
+    model.predict / l'explainer. `compute(X, explain)` remplace le calcul local
+    (pool de processus, voir modele_ai/inference.py).
+    Retourne (predictions, explications ou None).
+    """
+    explain = explainer is not None
+    if compute is None:
+        compute = lambda X_sub, explain: compute_rows(model, explainer, X_sub, explain)
+
+    if cache is None:
+        return compute(X, explain)
+
+    keys = [cache.key(row) for row in X]
+    found = cache.get_many(list(dict.fromkeys(keys)))
+    complete = lambda entry: entry is not None and (not explain or "explanation" in entry)
+
+    # Une ligne par vecteur manquant (les doublons de la requête ne sont calculés qu'une fois)
+    a_calculer = {}
+    for i, key in enumerate(keys):
+        if not complete(found.get(key)):
+            a_calculer.setdefault(key, i)
+    if a_calculer:
+        predictions, explications = compute(X[list(a_calculer.values())], explain)
+        nouvelles = {}
+        for j, key in enumerate(a_calculer):
+            entry = dict(found.get(key) or {})
+            entry["prediction"] = predictions[j].item()
+            if explications is not None:
+                entry["explanation"] = explications[j]
+            nouvelles[key] = entry
+        cache.set_many(nouvelles)
+        found.update(nouvelles)
+
+    misses = sum(1 for key in keys if key in a_calculer)
+    cache.record(hits=len(keys) - misses, misses=misses)
+    predictions = np.array([found[key]["prediction"] for key in keys])
+    explications = [found[key]["explanation"] for key in keys] if explain else None
+    return predictions, explications
+
+
+def predict_batch(model, patients, cache=None, compute=None):
+    """
+    Score plusieurs séries de visites en un seul appel model.predict.
+    `patients` : liste de {"id": ..., "visits": [...]}.
+    Retourne une liste de résultats par patiente (succès ou erreurs de validation).
+    """
+    results = []
+    matrices = []
+    valides = []
+    for patient in patients:
+        patient_id = patient.get("id") if isinstance(patient, dict) else None
+        visits = patient.get("visits") if isinstance(patient, dict) else None
+        X, errors = validate_visits_matrix(visits)
+        if errors:
+            results.append({"id": patient_id, "status": "error", "details": errors})
+            continue
+        result = {"id": patient_id, "status": "success"}
+        results.append(result)
+        matrices.append(X)
+        valides.append(result)
+
+    if not matrices:
+        return results
+
+    # Une seule prédiction sur la matrice empilée, puis découpage par patiente
+    X_all = np.vstack(matrices)
+    predictions, _ = predict_rows(model, X_all, cache=cache, compute=compute)
+    bornes = np.cumsum([0] + [len(X) for X in matrices])
+    for result, debut, fin in zip(valides, bornes[:-1], bornes[1:]):
+        preds = predictions[debut:fin]
+        result["predictions"] = preds.tolist()
+        result["global_summary"] = summarize_predictions(preds)
+    return results
+
+
+def batch_summary(patients, results):
+    """Corps de réponse d'un lot : compteurs + résultats (avec patiente_id en mode hôpital)."""
+    for patient, result in zip(patients, results):
+        if isinstance(patient, dict) and "patiente_id" in patient:
+            result["patiente_id"] = patient["patiente_id"]
+    nb_erreurs = sum(1 for r in results if r["status"] == "error")
+    return {
+        "count": len(results),
+        "errors": nb_erreurs,
+        "results": results,
+    }
+
+
+def _as_model_input(X):
+    """Le modèle a été entraîné sur un DataFrame : on conserve les noms de colonnes."""
+    import pandas as pd
+    return pd.DataFrame(X, columns=EXPECTED_FEATURES)
+
+
+def _hopital_consultations(hopital_id):
+    from consultation_module.models import Consultation
+
+    return Consultation.objects.filter(
+        grossesse__patiente__creer_a_hopital_id=hopital_id,
+        grossesse__statut="EN_COURS",
+    )
+
+
+def count_hopital_grossesses(hopital_id):
+    """Nombre de séries que load_hopital_visits retournerait, sans charger les visites."""
+    return _hopital_consultations(hopital_id).values("grossesse_id").distinct().count()
+
+
+def iter_hopital_visits(hopital_id, page_size):
+    """Séries de load_hopital_visits par pages d'au plus `page_size` grossesses (pagination par id)."""
+    dernier = 0
+    while True:
+        ids = list(
+            _hopital_consultations(hopital_id).filter(grossesse_id__gt=dernier)
+            .order_by("grossesse_id").values_list("grossesse_id", flat=True).distinct()[:page_size]
+        )
+        if not ids:
+            return
+        yield load_hopital_visits(hopital_id, grossesse_ids=ids)
+        dernier = ids[-1]
+
+
+def load_hopital_visits(hopital_id, grossesse_ids=None):
+    """
+    Séries de visites des grossesses en cours des patientes d'un hôpital,
+    au format {"id", "patiente_id", "visits"} attendu par predict_batch.
+    `grossesse_ids` restreint le chargement à une page (voir iter_hopital_visits).
+    """
+    from consultation_module.services import consultation_to_visit, patiente_age
+
+    series = {}
+    consultations = _hopital_consultations(hopital_id)
+    if grossesse_ids is not None:
+        consultations = consultations.filter(grossesse_id__in=grossesse_ids)
+    consultations = consultations.select_related("grossesse__patiente").order_by("grossesse_id", "date_consultation")
+    for cons in consultations.iterator(chunk_size=2000):
+        grossesse = cons.grossesse
+        serie = series.get(grossesse.id)
+        if serie is None:
+            serie = series[grossesse.id] = {
+                "id": grossesse.id,
+                "patiente_id": grossesse.patiente_id,
+                "visits": [],
+                "_age": patiente_age(grossesse.patiente),
+            }
+        serie["visits"].append(consultation_to_visit(cons, serie["_age"]))
+    for serie in series.values():
+        del serie["_age"]
+    return list(series.values())
@@ -4,6 +4,12 @@ from . import views
 urlpatterns = [
     
     path('chatbot/', views.chat_view, name='chatbot_api'),
+    path('chatbot/async/', views.chat_async_view, name='chatbot_async_api'),
+    path('chatbot/stats/', views.chat_stats_view, name='chatbot_stats'),
 
     path('predict/',views.PredictionView.as_view(), name='predict'),
+    path('predict/batch/', views.BatchPredictionView.as_view(), name='predict_batch'),
+    path('predict/jobs/<str:job_id>/', views.BatchJobView.as_view(), name='predict_batch_job'),
+    path('predict/cache/stats/', views.PredictionCacheStatsView.as_view(), name='predict_cache_stats'),
+    path('predict/status/', views.ModelStatusView.as_view(), name='predict_model_status'),
 ]
\ No newline at end of file
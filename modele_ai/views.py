@@ -2,21 +2,30 @@ from django.shortcuts import render
 
 # Create your views here.
 # views.py
+import asyncio
 import json
 import logging
-from django.http import JsonResponse, HttpResponseBadRequest
+import weakref
+from django.http import JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from google import genai
 from google.genai import types
+import httpx
+
+from .conversations import conversation_store
+from .history import history_manager
+from .prerouter import prerouter
 
-import joblib
-import pandas as pd
-import numpy as np
-import shap
 
 from django.utils.decorators import method_decorator
 from django.views import View
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from hospital_module.models import Gestionnaire
+from medical_module.models.medecin import MedecinHopital
 
 import os
 
@@ -28,9 +37,25 @@ logging.basicConfig(
     filename='chatbot.log',
     filemode='a'
 )
+logger = logging.getLogger(__name__)
 
 # --- CONFIGURATION API ET PROMPT SYSTÈME ---
-client = genai.Client(api_key=settings.GEMINI_API_KEY)
+def get_http_options():
+    """Options HTTP du SDK : URL de base (faux serveur de test possible) et délai en ms."""
+    return types.HttpOptions(
+        base_url=getattr(settings, 'GEMINI_BASE_URL', None) or None,
+        timeout=int(getattr(settings, 'GEMINI_TIMEOUT', 30) * 1000),
+        async_client_args={
+            'limits': httpx.Limits(
+                max_connections=getattr(settings, 'GEMINI_MAX_CONNECTIONS', 20),
+                max_keepalive_connections=getattr(settings, 'GEMINI_MAX_CONNECTIONS', 20),
+            )
+        },
+    )
+
+
+# Client partagé : les connexions HTTP (sync et async) sont réutilisées d'une requête à l'autre
+client = genai.Client(api_key=settings.GEMINI_API_KEY, http_options=get_http_options())
 
 SYSTEM_PROMPT = """
 Ton rôle est d'agir comme un assistant de bien-être pour les femmes enceintes. 
@@ -52,31 +77,107 @@ GESTION DES AVIS DE NON-RESPONSABILITÉ (CRITIQUE) :
 """
 
 
-def get_gemini_config():
-    """Crée l'objet de configuration avec le prompt système."""
+def get_gemini_config(summary=''):
+    """Crée l'objet de configuration avec le prompt système (et le résumé des anciens échanges)."""
+    system_instruction = SYSTEM_PROMPT
+    if summary:
+        system_instruction += (
+            "\nRÉSUMÉ DES ÉCHANGES PRÉCÉDENTS (contexte uniquement) :\n" + summary + "\n"
+        )
     return types.GenerateContentConfig(
-        system_instruction=SYSTEM_PROMPT
+        system_instruction=system_instruction
     )
 
-def convert_history_to_dicts(history):
+def history_to_contents(session_history_dicts):
+    return [
+        types.Content(role=item['role'], parts=[types.Part.from_text(text=p['text']) for p in item['parts']])
+        for item in session_history_dicts
+    ]
+
+
+def build_chat(session_history_dicts, summary=''):
+    """Recrée l'objet Chat Gemini à partir de l'historique (borné) stocké en session."""
+    return client.chats.create(
+        model="gemini-2.5-flash",
+        config=get_gemini_config(summary),
+        history=history_to_contents(session_history_dicts) 
+    )
+
+
+def build_async_chat(session_history_dicts, summary=''):
+    """Même chose avec le client asynchrone (client.aio), pour les vues ASGI."""
+    return client.aio.chats.create(
+        model="gemini-2.5-flash",
+        config=get_gemini_config(summary),
+        history=history_to_contents(session_history_dicts)
+    )
+
+
+def sse_event(data, event=None):
+    """Formate un évènement Server-Sent Events."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_chat_events(request, chat, window, user_message, first_turn=False):
     """
-    ULTIMATE FIX: Converts the history (Content/UserContent objects) into a list 
-    of serializable dictionaries using the reliable dict() conversion.
+    Relaye les fragments de send_message_stream en SSE ("delta"), puis un
+    évènement "done" avec la réponse complète. L'échange n'est enregistré
+    qu'à la fin du flux (la conversation existe déjà, cf. conversation_store.ensure).
     """
-    serializable_history = []
-    for content in history:
-        
-        serializable_history.append({
-            'role': content.role,
-           
-            'parts': [{'text': part.text} for part in content.parts if hasattr(part, 'text')]
-        })
-    return serializable_history
+    chunks = []
+    try:
+        for chunk in chat.send_message_stream(user_message):
+            text = chunk.text
+            if text:
+                chunks.append(text)
+                yield sse_event({'delta': text})
+
+        conversation_store.append(request, window, local_turn(user_message, ''.join(chunks)))
+        prerouter.remember(user_message, ''.join(chunks), first_turn)
+    except Exception as e:
+        logging.error(f"Erreur Gemini (streaming) sur la session {request.session.session_key}: {e}", exc_info=True)
+        yield sse_event({'response': 'Désolé, une erreur de l\'API est survenue. Veuillez réessayer.'}, event='error')
+        return
+
+    yield sse_event({'response': ''.join(chunks)}, event='done')
+
+
+def local_answer_response(request, data, answer):
+    """Réponse du pré-routeur local, au même format que Gemini (JSON ou SSE)."""
+    if wants_stream(request, data):
+        response = StreamingHttpResponse(
+            iter([sse_event({'delta': answer}), sse_event({'response': answer}, event='done')]),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        return response
+    return JsonResponse({'response': answer})
+
+
+def local_turn(user_message, answer):
+    """Échange question / réponse, au format de l'historique envoyé à Gemini."""
+    return [
+        {'role': 'user', 'parts': [{'text': user_message}]},
+        {'role': 'model', 'parts': [{'text': answer}]},
+    ]
+
+
+def wants_stream(request, data):
+    """Mode streaming demandé par {"stream": true}, ?stream=1 ou Accept: text/event-stream."""
+    return (
+        bool(data.get('stream'))
+        or request.GET.get('stream') in ('1', 'true')
+        or 'text/event-stream' in request.headers.get('Accept', '')
+    )
+
 
 @csrf_exempt
 def chat_view(request):
     """
     Vue Django pour gérer la conversation avec Gemini.
+    Réponse JSON {"response": ...} par défaut ; en mode streaming, flux SSE
+    d'évènements "delta" puis "done" (ou "error").
     """
     if request.method != 'POST':
         return HttpResponseBadRequest(json.dumps({'error': 'Méthode non autorisée. Utilisez POST.'}), content_type="application/json")
@@ -92,32 +193,45 @@ def chat_view(request):
     if not user_message:
         return JsonResponse({'response': 'Veuillez envoyer un message.'})
 
-    # --- 1. HISTORIQUE  ---
-    session_history_dicts = request.session.get('chat_history', [])
+    # --- 1. HISTORIQUE (fenêtre bornée, anciens échanges résumés) ---
+    window = conversation_store.load(request)
+    first_turn = prerouter.is_first_turn(window.history, window.summary)
+
+    # --- PRÉ-ROUTEUR LOCAL : salutations, FAQ, premières questions récentes ---
+    answer = prerouter.answer(user_message, first_turn)
+    if answer is not None:
+        conversation_store.append(request, window, local_turn(user_message, answer))
+        return local_answer_response(request, data, answer)
+
+    # --- MODE STREAMING (SSE) ---
+    if wants_stream(request, data):
+        try:
+            chat = build_chat(window.history, window.summary)
+        except Exception as e:
+            logging.error(f"Erreur Gemini sur la session {request.session.session_key}: {e}", exc_info=True)
+            return JsonResponse({'response': 'Désolé, une erreur de l\'API est survenue. Veuillez réessayer.'})
+
+        # La conversation (et son id en session) doit exister avant l'envoi des en-têtes
+        conversation_store.ensure(request, window)
+
+        response = StreamingHttpResponse(
+            stream_chat_events(request, chat, window, user_message, first_turn),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # pas de mise en tampon côté nginx
+        return response
     
     # 2. Reconstruct Chat Object
     try:
-        
-        history_to_pass = [
-            types.Content(role=item['role'], parts=[types.Part.from_text(p['text']) for p in item['parts']])
-            for item in session_history_dicts
-        ]
-        
-    
-        chat = client.chats.create(
-            model="gemini-2.5-flash",
-            config=get_gemini_config(),
-            history=history_to_pass 
-        )
+        chat = build_chat(window.history, window.summary)
         
       
         response = chat.send_message(user_message)
         response_text = response.text
 
-      
-        new_history_objects = chat.get_history()
-       
-        request.session['chat_history'] = convert_history_to_dicts(new_history_objects)
+        conversation_store.append(request, window, local_turn(user_message, response_text))
+        prerouter.remember(user_message, response_text, first_turn)
         
     except Exception as e:
        
@@ -127,13 +241,145 @@ def chat_view(request):
     return JsonResponse({'response': response_text})
 
 
+# --- VERSION ASYNCHRONE (ASGI) ---
+_chat_semaphores = weakref.WeakKeyDictionary()
+CHAT_BUSY_MESSAGE = 'Le service est très sollicité. Veuillez réessayer dans quelques instants.'
+
+
+def get_chat_semaphore():
+    """Limite de conversations simultanées vers Gemini, une par boucle d'évènements."""
+    loop = asyncio.get_running_loop()
+    semaphore = _chat_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _chat_semaphores[loop] = asyncio.Semaphore(getattr(settings, 'CHAT_MAX_CONCURRENCY', 20))
+    return semaphore
+
+
+def chat_busy_response():
+    response = JsonResponse({'response': CHAT_BUSY_MESSAGE}, status=503)
+    response['Retry-After'] = str(getattr(settings, 'CHAT_RETRY_AFTER', 5))
+    return response
+
+
+async def acquire_chat_slot(semaphore):
+    """Attend une place au plus CHAT_QUEUE_TIMEOUT secondes ; faux si le service est saturé."""
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=getattr(settings, 'CHAT_QUEUE_TIMEOUT', 2))
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def astream_chat_events(request, chat, window, user_message, semaphore, first_turn=False):
+    """
+    Version asynchrone de stream_chat_events. La place de la sémaphore est prise et rendue
+    dans le générateur : une réponse jamais lue (client parti avant le premier octet) n'en
+    garde pas. Service saturé : évènement `error` (l'en-tête 200 est déjà parti).
+    """
+    if not await acquire_chat_slot(semaphore):
+        yield sse_event({'response': CHAT_BUSY_MESSAGE}, event='error')
+        return
+
+    chunks = []
+    try:
+        async with asyncio.timeout(getattr(settings, 'GEMINI_TIMEOUT', 30)):
+            async for chunk in await chat.send_message_stream(user_message):
+                text = chunk.text
+                if text:
+                    chunks.append(text)
+                    yield sse_event({'delta': text})
+
+        await conversation_store.aappend(request, window, local_turn(user_message, ''.join(chunks)))
+        prerouter.remember(user_message, ''.join(chunks), first_turn)
+    except Exception as e:
+        logging.error(f"Erreur Gemini (async, streaming) sur la session {request.session.session_key}: {e}", exc_info=True)
+        yield sse_event({'response': 'Désolé, une erreur de l\'API est survenue. Veuillez réessayer.'}, event='error')
+        return
+    finally:
+        semaphore.release()
+
+    yield sse_event({'response': ''.join(chunks)}, event='done')
+
+
+@csrf_exempt
+async def chat_async_view(request):
+    """
+    Version asynchrone de chat_view, à servir sous ASGI (jali_django_api/asgi.py) :
+    l'attente de Gemini ne bloque pas de worker. Même contrat (JSON ou SSE).
+    Au plus CHAT_MAX_CONCURRENCY appels simultanés par processus ; au-delà d'une
+    attente de CHAT_QUEUE_TIMEOUT secondes : 503 avec Retry-After.
+    """
+    if request.method != 'POST':
+        return HttpResponseBadRequest(json.dumps({'error': 'Méthode non autorisée. Utilisez POST.'}), content_type="application/json")
+
+    try:
+        data = json.loads(request.body)
+        user_message = data.get('message', '').strip()
+    except json.JSONDecodeError:
+        logging.warning("Tentative de requête avec JSON invalide.")
+        return HttpResponseBadRequest(json.dumps({'error': 'Format JSON invalide.'}), content_type="application/json")
+
+    if not user_message:
+        return JsonResponse({'response': 'Veuillez envoyer un message.'})
+
+    window = await conversation_store.aload(request)
+    first_turn = prerouter.is_first_turn(window.history, window.summary)
+
+    # Pré-routeur local : pas d'appel Gemini, ni de place dans la limite de concurrence
+    answer = prerouter.answer(user_message, first_turn)
+    if answer is not None:
+        await conversation_store.aappend(request, window, local_turn(user_message, answer))
+        return local_answer_response(request, data, answer)
+
+    semaphore = get_chat_semaphore()
+    if wants_stream(request, data):
+        try:
+            chat = build_async_chat(window.history, window.summary)
+            await conversation_store.aensure(request, window)
+        except Exception as e:
+            logging.error(f"Erreur Gemini (async) sur la session {request.session.session_key}: {e}", exc_info=True)
+            return JsonResponse({'response': 'Désolé, une erreur de l\'API est survenue. Veuillez réessayer.'})
+        # La place de la sémaphore est prise par le générateur, au début du flux
+        response = StreamingHttpResponse(
+            astream_chat_events(request, chat, window, user_message, semaphore, first_turn),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    if not await acquire_chat_slot(semaphore):
+        return chat_busy_response()
+
+    try:
+        chat = build_async_chat(window.history, window.summary)
+        response = await asyncio.wait_for(
+            chat.send_message(user_message), timeout=getattr(settings, 'GEMINI_TIMEOUT', 30)
+        )
+        await conversation_store.aappend(request, window, local_turn(user_message, response.text))
+        prerouter.remember(user_message, response.text, first_turn)
+        return JsonResponse({'response': response.text})
+    except Exception as e:
+        logging.error(f"Erreur Gemini (async) sur la session {request.session.session_key}: {e}", exc_info=True)
+        return JsonResponse({'response': 'Désolé, une erreur de l\'API est survenue. Veuillez réessayer.'})
+    finally:
+        semaphore.release()
+
+
+def chat_stats_view(request):
+    """Taille de l'historique envoyé à Gemini, cache des conversations et pré-routeur, pour ce processus."""
+    return JsonResponse({
+        'status': 'success',
+        'history': history_manager.stats(),
+        'conversations': conversation_store.stats(),
+        'prerouter': prerouter.stats(),
+    })
+
+
 
 
 
 import os
-import joblib
-import pandas as pd
-import shap
 import json
 from django.views import View
 from django.http import JsonResponse
@@ -141,44 +387,35 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
 # --- 1. CONFIGURATION ET VARIABLES GLOBALES ---
-# Les features attendues par le modèle
-EXPECTED_FEATURES = ['Age', 'SystolicBP', 'DiastolicBP', 'BS', 'BodyTemp', 'HeartRate']
-
-# 🚨 BORNES CLINIQUES ACCEPTABLES pour la validation (Valeurs min/max réalistes) 🚨
-# Toute donnée hors de ces bornes sera rejetée avec un code 400.
-# Ces valeurs doivent être ajustées selon les normes médicales exactes que vous ciblez.
-RANGES_CLINIQUES_ACCEPTABLES = {
-    'Age': (15, 60),           # Âge (années)
-    'SystolicBP': (70, 250),   # Tension artérielle systolique (mmHg)
-    'DiastolicBP': (40, 150),  # Tension artérielle diastolique (mmHg)
-    'BS': (1.0, 30.0),         # Glycémie (Blood Sugar)
-    'BodyTemp': (90.0, 104.0), # Température corporelle (°F) 
-    'HeartRate': (40, 180)     # Fréquence Cardiaque (BPM)
-}
-
-# Chemins d'accès aux fichiers (ajustés à votre structure)
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "maternal_health.pkl")
-DATA_PATH = os.path.join(os.path.dirname(__file__), "Maternal Health Risk Data Set.csv") # Pour SHAP background
-
-model = None
-explainer = None
+# Features attendues et bornes cliniques : voir modele_ai/services.py
+from .services import (
+    EXPECTED_FEATURES,
+    RANGES_CLINIQUES_ACCEPTABLES,
+    validate_visits_matrix,
+    summarize_predictions,
+    predict_rows,
+    predict_batch,
+    count_hopital_grossesses,
+    load_hopital_visits,
+    batch_summary,
+)
 
 # --- 2. CHARGEMENT DU MODÈLE ET SHAP ---
-try:
-    # Chargement du modèle
-    model = joblib.load(MODEL_PATH)
-    
-    # Préparation du background pour SHAP
-    data_originale = pd.read_csv(DATA_PATH)
-    X_background = data_originale[EXPECTED_FEATURES].sample(n=100, random_state=42) 
-    
-    # Initialisation de l'explainer SHAP
-    explainer = shap.Explainer(model.predict, X_background) 
-    print("Modèle et SHAP Explainer chargés avec succès.")
-except Exception as e:
-    print(f"Erreur lors du chargement du modèle ou des données SHAP: {e}")
-    model = None
-    explainer = None
+# Chargement paresseux au premier appel (voir modele_ai/registry.py et la
+# commande warm_models) : l'import de ce module ne charge ni joblib, ni pandas, ni shap.
+from .registry import registry
+from .inference import InferenceBusy, JobStoreUnavailable, inference_pool, batch_jobs
+
+
+def busy_response(exc):
+    """503 + Retry-After quand le pool d'inférence est saturé ou trop lent."""
+    response = JsonResponse({
+        'status': 'error',
+        'message': str(exc),
+        'details': []
+    }, status=503)
+    response['Retry-After'] = str(exc.retry_after)
+    return response
 
 
 # FONCTION DE VALIDATION DES DONNÉES  
@@ -187,46 +424,7 @@ def validate_visits_data(visits):
     Valide que la liste des visites contient les features attendues, 
     que les valeurs sont numériques et qu'elles sont dans les bornes cliniques acceptables.
     """
-    errors = []
-    
-    if not isinstance(visits, list) or not visits:
-        return ["La liste 'visits' est manquante ou vide. Elle doit contenir au moins un enregistrement."]
-
-    for i, visit in enumerate(visits):
-        visit_index = i + 1
-        
-        if not isinstance(visit, dict):
-            errors.append(f"Visite #{visit_index} : Le format est incorrect.")
-            continue
-
-        # Vérification des clés manquantes
-        missing_features = [f for f in EXPECTED_FEATURES if f not in visit]
-        if missing_features:
-            errors.append(f"Visite #{visit_index} : Colonnes manquantes : {', '.join(missing_features)}")
-            
-        # Vérification des types et des plages
-        for feature in EXPECTED_FEATURES:
-            if feature in visit:
-                value = visit[feature]
-                
-                if value is None:
-                     errors.append(f"Visite #{visit_index}, feature '{feature}' : La valeur ne peut pas être nulle.")
-                     continue
-                
-                try:
-                    num_value = float(value)
-                    
-                    # Vérification des bornes cliniques
-                    min_val, max_val = RANGES_CLINIQUES_ACCEPTABLES[feature]
-                    
-                    if not (min_val <= num_value <= max_val):
-                         errors.append(
-                            f"Visite #{visit_index}, feature '{feature}' : Valeur '{value}' hors des limites cliniques ({min_val} - {max_val}) voyez si c'est une erreur de saisie."
-                         )
-
-                except (TypeError, ValueError):
-                    errors.append(f"Visite #{visit_index}, feature '{feature}' : La valeur '{value}' doit être un nombre.")
-
+    _, errors = validate_visits_matrix(visits)
     return errors
 
 
@@ -237,8 +435,9 @@ class PredictionView(View):
     Vue Django pour recevoir les données de visite, effectuer la prédiction et l'explication SHAP.
     """
     def post(self, request, *args, **kwargs):
-        # 0. Vérification de l'initialisation du Modèle/Explainer
-        if not model or not explainer:
+        # 0. Vérification de l'initialisation du Modèle/Explainer (chargés au premier appel)
+        ml = registry.get()
+        if not ml.model or not ml.explainer:
             return JsonResponse({
                 'status': 'Reseillez une erreur est survenue',
                 
@@ -248,8 +447,8 @@ class PredictionView(View):
             data = json.loads(request.body)
             visits = data.get('visits', [])
             
-            # 1. Validation des données d'entrée 🚨 (Utilise la fonction mise à jour)
-            validation_errors = validate_visits_data(visits)
+            # 1. Validation des données d'entrée 🚨 (une seule passe vectorisée)
+            X, validation_errors = validate_visits_matrix(visits)
             
             if validation_errors:
                 return JsonResponse({
@@ -258,49 +457,17 @@ class PredictionView(View):
                     'details': validation_errors
                 }, status=400)
             
-            # Création du DataFrame et ordonnancement des colonnes
-            X_visites = pd.DataFrame(visits, columns=EXPECTED_FEATURES)
-            
-            # Conversion forcée des types en float pour le modèle
-            X_visites = X_visites.astype(float)
-            
-            # 2. Prédictions
-            predictions = model.predict(X_visites)
+            # 2. Prédictions et 4. Explications SHAP (visites déjà vues servies par le cache,
+            #    les autres calculées dans le pool d'inférence, hors du thread WSGI)
+            try:
+                predictions, shap_explanations = predict_rows(
+                    ml.model, X, cache=ml.result_cache, explainer=ml.explainer, compute=inference_pool.compute
+                )
+            except InferenceBusy as e:
+                return busy_response(e)
             
             # 3. Résumé global
-            risque_moyen = predictions.mean()
-            risque_max = predictions.max()
-            tendance = predictions[-1] - predictions[0]
-
-            if tendance > 0:
-                tendance_str = "Le risque augmente"
-            elif tendance < 0:
-                tendance_str = "Le risque diminue"
-            else:
-                tendance_str = "Risque stable"
-            
-            global_summary = {
-                "risque_moyen": float(risque_moyen),
-                "risque_max": float(risque_max),
-                "tendance": tendance_str
-            }
-            
-            # 4. Explications SHAP
-            shap_values = explainer(X_visites)
-            shap_explanations = []
-            features = list(X_visites.columns)
-            
-            for i in range(len(X_visites)):
-                contributions = {}
-                for col_index, col_name in enumerate(features):
-                    contributions[col_name] = float(shap_values.values[i][col_index])
-                    
-                base_value = float(shap_values.base_values[i]) if hasattr(shap_values.base_values, '__len__') and len(shap_values.base_values) > i else float(shap_values.base_values)
-
-                shap_explanations.append({
-                    "base_value": base_value,
-                    "contributions": contributions
-                })
+            global_summary = summarize_predictions(predictions)
 
             # 5. Réponse de Succès 🎉
             response_data = {
@@ -328,4 +495,155 @@ class PredictionView(View):
                 'status': 'error', 
                 'message': error_message,
                 'details': ['Une erreur inattendue s\'est produite après la validation des données.']
-            }, status=500)
\ No newline at end of file
+            }, status=500)
+
+
+def hopitaux_autorises(user):
+    """Hôpitaux dont l'utilisateur peut scorer les patientes (None = tous, pour le superadmin)."""
+    if user.role == "SUPERADMIN":
+        return None
+    if user.role == "GESTIONNAIRE":
+        return set(Gestionnaire.objects.filter(user=user).values_list("hopital_id", flat=True))
+    if user.role == "MEDECIN":
+        return set(MedecinHopital.objects.filter(medecin__user=user).values_list("hopital_id", flat=True))
+    return set()
+
+
+class BatchPredictionView(APIView):
+    """
+    Prédiction du risque pour plusieurs patientes en un seul appel.
+    Corps accepté :
+      {"patients": [{"id": ..., "visits": [...]}, ...]}
+      ou {"hopital_id": ...} pour scorer les grossesses en cours d'un hôpital
+      (celui du gestionnaire / du médecin appelant ; tous pour le superadmin).
+    Toutes les visites valides sont empilées et scorées par un seul model.predict ;
+    les patientes dont les données sont invalides sont signalées individuellement.
+    Pas d'explications SHAP ici (trop coûteuses en lot) : utiliser predict/.
+    Avec "async": true, le lot est calculé en tâche de fond : la réponse (202)
+    contient un job_id à interroger sur predict/jobs/<job_id>/.
+    Un hôpital de plus de MAX_PATIENTS grossesses en cours (dépistage de nuit)
+    passe toujours en tâche de fond, par pages de MAX_PATIENTS.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_PATIENTS = 5000
+
+    def post(self, request, *args, **kwargs):
+        ml = registry.get()
+        if not ml.model:
+            return JsonResponse({
+                'status': 'Reseillez une erreur est survenue',
+            }, status=500)
+
+        try:
+            data = request.data
+        except ParseError:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Format JSON invalide. Assurez-vous que le corps de la requête est un JSON valide.',
+                'details': []
+            }, status=400)
+
+        if not isinstance(data, dict):
+            return JsonResponse({
+                'status': 'error',
+                'message': "Le corps doit contenir 'patients' ou 'hopital_id'.",
+                'details': []
+            }, status=400)
+
+        hopital_id = data.get('hopital_id')
+        if hopital_id is not None:
+            try:
+                hopital_id = int(hopital_id)
+            except (TypeError, ValueError):
+                return JsonResponse({
+                    'status': 'error',
+                    'message': "'hopital_id' doit être un entier.",
+                    'details': []
+                }, status=400)
+            autorises = hopitaux_autorises(request.user)
+            if autorises is not None and hopital_id not in autorises:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': "Accès refusé aux patientes de cet hôpital.",
+                    'details': []
+                }, status=403)
+            # Comptage avant chargement : les gros hôpitaux sont scorés par pages, en tâche de fond
+            total = count_hopital_grossesses(hopital_id)
+            if total > self.MAX_PATIENTS:
+                try:
+                    job_id = batch_jobs.submit_hopital(hopital_id, request.user.id, self.MAX_PATIENTS, total)
+                except JobStoreUnavailable as e:
+                    logger.error(str(e))
+                    return JsonResponse({'status': 'error', 'message': str(e), 'details': []}, status=503)
+                return JsonResponse({'status': 'pending', 'job_id': job_id, 'total': total}, status=202)
+            patients = load_hopital_visits(hopital_id)
+        else:
+            patients = data.get('patients')
+            if not isinstance(patients, list) or not patients:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': "La liste 'patients' est manquante ou vide.",
+                    'details': []
+                }, status=400)
+
+        if len(patients) > self.MAX_PATIENTS:
+            return JsonResponse({
+                'status': 'error',
+                'message': f"Trop de patientes dans un seul lot (max {self.MAX_PATIENTS}).",
+                'details': []
+            }, status=400)
+
+        if data.get('async'):
+            try:
+                job_id = batch_jobs.submit(patients, request.user.id, hopital_id)
+            except InferenceBusy as e:
+                return busy_response(e)
+            except JobStoreUnavailable as e:
+                logger.error(str(e))
+                return JsonResponse({'status': 'error', 'message': str(e), 'details': []}, status=503)
+            return JsonResponse({'status': 'pending', 'job_id': job_id}, status=202)
+
+        try:
+            results = predict_batch(ml.model, patients, cache=ml.result_cache, compute=inference_pool.compute)
+        except InferenceBusy as e:
+            return busy_response(e)
+        except Exception as e:
+            error_message = f'Erreur interne du serveur lors du traitement ML : {e}'
+            logger.exception("Erreur lors du traitement du lot de prédictions")
+            return JsonResponse({
+                'status': 'error',
+                'message': error_message,
+                'details': ['Une erreur inattendue s\'est produite après la validation des données.']
+            }, status=500)
+
+        summary = batch_summary(patients, results)
+        return JsonResponse({
+            'status': 'success' if summary['errors'] == 0 else 'partial',
+            **summary,
+        })
+
+
+class BatchJobView(APIView):
+    """État / résultat d'un lot de prédictions lancé en mode asynchrone."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id, *args, **kwargs):
+        job = batch_jobs.get(job_id)
+        # Job d'un autre utilisateur : 404, sans confirmer qu'il existe
+        if job is None or not batch_jobs.visible_by(job, request.user, hopitaux_autorises(request.user)):
+            return JsonResponse({'status': 'error', 'message': 'Job introuvable ou expiré.'}, status=404)
+        return JsonResponse(job)
+
+
+class PredictionCacheStatsView(View):
+    """Compteurs du cache des prédictions / explications (processus courant)."""
+    def get(self, request, *args, **kwargs):
+        if registry.result_cache is None:
+            return JsonResponse({'status': 'error', 'message': 'Cache indisponible : modèle non chargé.'}, status=503)
+        return JsonResponse({'status': 'success', 'cache': registry.result_cache.stats()})
+
+
+class ModelStatusView(View):
+    """État du chargement du modèle dans ce worker (temps de chargement, mémoire). Ne déclenche pas le chargement."""
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({'status': 'success', 'model': registry.status(), 'pool': inference_pool.stats()})
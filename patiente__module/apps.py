@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PatienteModuleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'patiente__module'
+
+    def ready(self):
+        from patiente__module import signals  # noqa: F401
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital_module', '0002_hopital_zone_de_sante'),
+        ('patiente__module', '0004_patiente_medecins'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patiente',
+            index=models.Index(fields=['creer_a_hopital', 'date_inscription', 'id'], name='patiente_hop_inscr_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:05
+
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+# Copie figée de la normalisation de patiente_search_service à la date de la migration :
+# une évolution du service ne doit pas changer ce que produit cette migration.
+def normaliser_texte(value):
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return " ".join(value.lower().split())
+
+
+def normaliser_telephone(value):
+    if not value:
+        return ""
+    value = re.sub(r"[^\d+]", "", str(value))
+    if value.startswith("243"):
+        value = "+" + value
+    if not value:
+        return ""
+    if value.startswith("+243"):
+        return value
+    if value.startswith("0"):
+        return "+243" + value[1:]
+    return "+243" + value
+
+
+def champs_recherche(user):
+    return {
+        "recherche_email": (user.email or "").strip().lower(),
+        "recherche_telephone": normaliser_telephone(user.telephone),
+        "recherche_nom": normaliser_texte(" ".join(filter(None, [user.nom, user.postnom, user.prenom]))),
+    }
+
+
+def remplir_colonnes_recherche(apps, schema_editor):
+    Patiente = apps.get_model('patiente__module', 'Patiente')
+    batch = []
+    for pat in Patiente.objects.select_related('user').iterator(chunk_size=500):
+        for field, value in champs_recherche(pat.user).items():
+            setattr(pat, field, value)
+        batch.append(pat)
+        if len(batch) >= 500:
+            Patiente.objects.bulk_update(batch, ['recherche_email', 'recherche_telephone', 'recherche_nom'])
+            batch = []
+    if batch:
+        Patiente.objects.bulk_update(batch, ['recherche_email', 'recherche_telephone', 'recherche_nom'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_module', '0004_alter_user_role'),
+        ('patiente__module', '0005_patiente_patiente_hop_inscr_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='patiente',
+            name='recherche_email',
+            field=models.CharField(blank=True, default='', max_length=254),
+        ),
+        migrations.AddField(
+            model_name='patiente',
+            name='recherche_nom',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='patiente',
+            name='recherche_telephone',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.RunPython(remplir_colonnes_recherche, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='patiente',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['recherche_email'], name='patiente_rech_email_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='patiente',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['recherche_telephone'], name='patiente_rech_tel_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='patiente',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['recherche_nom'], name='patiente_rech_nom_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patiente__module', '0006_patiente_recherche'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='patiente',
+            name='recherche_telephone',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
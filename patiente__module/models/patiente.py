@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.utils import timezone
 from auth_module.models.user import User
@@ -15,8 +16,21 @@ class Patiente(models.Model):
     creer_a_hopital = models.ForeignKey("hospital_module.Hopital", on_delete=models.SET_NULL, null=True, blank=True, related_name="patientes_creees")
     medecins = models.ManyToManyField("medical_module.Medecin", blank=True, related_name="patientes_assignees")
 
+    # Colonnes de recherche normalisées (tenues à jour par patiente__module.signals)
+    recherche_email = models.CharField(max_length=254, blank=True, default="")
+    recherche_telephone = models.TextField(blank=True, default="")  # +243 ajouté : peut dépasser user.telephone
+    recherche_nom = models.CharField(max_length=500, blank=True, default="")
+
     class Meta:
         db_table = "patiente"
+        indexes = [
+            # Listes paginées par curseur (date_inscription, id) au sein d'un hôpital
+            models.Index(fields=["creer_a_hopital", "date_inscription", "id"], name="patiente_hop_inscr_idx"),
+            # Index trigrammes : LIKE '%...%' et similarité floue sans scan séquentiel
+            GinIndex(fields=["recherche_email"], opclasses=["gin_trgm_ops"], name="patiente_rech_email_trgm"),
+            GinIndex(fields=["recherche_telephone"], opclasses=["gin_trgm_ops"], name="patiente_rech_tel_trgm"),
+            GinIndex(fields=["recherche_nom"], opclasses=["gin_trgm_ops"], name="patiente_rech_nom_trgm"),
+        ]
 
     def __str__(self):
         return f"Patiente<{self.user_id}> {self.user.prenom} {self.user.nom}"
@@ -2,7 +2,10 @@
 # repositories/patiente_repository.py
 # ==============================
 from typing import Optional
+from django.contrib.postgres.search import TrigramWordSimilarity
 from django.db import transaction
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
 from auth_module.models.user import User
 from patiente__module.models.patiente import Patiente
 from hospital_module.models import Hopital
@@ -53,6 +56,38 @@ class PatienteRepository:
             creer_a_hopital=hopital
         ).select_related("user")
         
+    @staticmethod
+    def search_patientes(texte: str, chiffres: Optional[str] = None, telephone: Optional[str] = None, limit: int = 20):
+        """
+        Recherche sur les colonnes recherche_* (index GIN trigrammes) :
+        email contenant le texte, téléphone contenant les chiffres, nom par
+        préfixe de mot ou similarité trigramme. Classement par score décroissant.
+        """
+        filtre = (
+            Q(recherche_email__contains=texte)
+            | Q(recherche_nom__contains=texte)
+            | Q(recherche_nom__trigram_word_similar=texte)
+        )
+        if chiffres:
+            filtre |= Q(recherche_telephone__contains=chiffres)
+
+        exact = [When(recherche_email=texte, then=Value(1.0))]
+        if telephone:
+            exact.append(When(recherche_telephone=telephone, then=Value(1.0)))
+        pertinence = Case(
+            *exact,
+            When(recherche_email__startswith=texte, then=Value(0.9)),
+            When(recherche_nom__startswith=texte, then=Value(0.8)),
+            When(recherche_nom__contains=f" {texte}", then=Value(0.7)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        return (
+            Patiente.objects.filter(filtre)
+            .annotate(score=Greatest(pertinence, TrigramWordSimilarity(texte, "recherche_nom")))
+            .order_by("-score", "id")[:limit]
+        )
+
     @staticmethod
     def get_all_patientes():
         return Patiente.objects.all().select_related("user").order_by("-date_inscription")
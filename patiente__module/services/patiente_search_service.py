@@ -0,0 +1,71 @@
+# ==============================
+# services/patiente_search_service.py
+# ==============================
+import re
+import unicodedata
+
+from auth_module.services.user_service import normalize_phone
+from patiente__module.repositories.patiente_repository import PatienteRepository
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+
+
+def normaliser_texte(value) -> str:
+    """Minuscules, sans accents ni espaces multiples."""
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return " ".join(value.lower().split())
+
+
+def normaliser_telephone(value) -> str:
+    """Numéro au format E.164 (+243...) via normalize_phone, ou chaîne vide."""
+    if not value:
+        return ""
+    value = re.sub(r"[^\d+]", "", str(value))
+    if value.startswith("243"):
+        value = "+" + value
+    return normalize_phone(value) or ""
+
+
+def champs_recherche(user) -> dict:
+    """Valeurs des colonnes recherche_* d'une patiente à partir de son compte."""
+    return {
+        "recherche_email": (user.email or "").strip().lower(),
+        "recherche_telephone": normaliser_telephone(user.telephone),
+        "recherche_nom": normaliser_texte(" ".join(filter(None, [user.nom, user.postnom, user.prenom]))),
+    }
+
+
+class PatienteSearchService:
+    @staticmethod
+    def search(query: str, limit=None):
+        """
+        Recherche classée des patientes par email, téléphone ou nom/postnom/prénom
+        (préfixe et similarité trigramme). Retourne au plus `limit` patientes,
+        les plus pertinentes en premier.
+        """
+        texte = normaliser_texte(query)
+        if not texte:
+            return []
+
+        try:
+            limit = int(limit) if limit else SEARCH_DEFAULT_LIMIT
+        except (TypeError, ValueError):
+            limit = SEARCH_DEFAULT_LIMIT
+        limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+        # Partie téléphone : chiffres sans le 0 national, pour matcher le format +243...
+        chiffres = re.sub(r"\D", "", query)
+        if chiffres.startswith("0"):
+            chiffres = chiffres[1:]
+        telephone = normaliser_telephone(query) if len(chiffres) >= 9 else None
+
+        return PatienteRepository.search_patientes(
+            texte=texte,
+            chiffres=chiffres if len(chiffres) >= 3 else None,
+            telephone=telephone,
+            limit=limit,
+        )
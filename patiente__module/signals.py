@@ -0,0 +1,23 @@
+# patiente__module/signals.py
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from auth_module.models.user import User
+from patiente__module.models.patiente import Patiente
+from patiente__module.services.patiente_search_service import champs_recherche
+
+
+@receiver(pre_save, sender=Patiente)
+def remplir_recherche_patiente(sender, instance, **kwargs):
+    """Recalcule les colonnes recherche_* à chaque enregistrement d'une patiente."""
+    if instance.user_id:
+        for field, value in champs_recherche(instance.user).items():
+            setattr(instance, field, value)
+
+
+@receiver(post_save, sender=User)
+def synchroniser_recherche_patiente(sender, instance, created, **kwargs):
+    """Répercute un changement d'email, de téléphone ou de nom sur la patiente liée."""
+    if created or instance.role != "PATIENTE":
+        return
+    Patiente.objects.filter(user=instance).update(**champs_recherche(instance))
@@ -1,3 +1,16 @@
 from django.test import TestCase
 
-# Create your tests here.
+from auth_module.models.user import User
+from patiente__module.models.patiente import Patiente
+
+
+class RechercheTelephoneTest(TestCase):
+    def test_numero_long_normalise_sans_troncature(self):
+        # 20 caractères (max de user.telephone) : +243 ajouté, la colonne de recherche doit tout garder
+        user = User.objects.create(
+            email="patiente@test.cd", nom="Kabila", postnom="Mwamba", prenom="Marie",
+            role="PATIENTE", telephone="81234567890123456789",
+        )
+        patiente = Patiente.objects.create(user=user)
+        patiente.refresh_from_db()
+        self.assertEqual(patiente.recherche_telephone, "+24381234567890123456789")
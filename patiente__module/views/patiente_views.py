@@ -13,6 +13,7 @@ from patiente__module.serializers.patiente_serializers import PatienteBaseSerial
 from patiente__module.services.patiente_service import PatienteService
 from patiente__module.models.patiente import Patiente
 from grossesse_module.repositories import GrossesseRepository, DossierRepository
+from consultation_module.services import PatientSummaryService
       
 
 
@@ -27,21 +28,8 @@ class PatientesFullInfoByHopitalView(APIView):
         except Hopital.DoesNotExist:
             return Response({"detail": "Hôpital introuvable."}, status=status.HTTP_404_NOT_FOUND)
 
-        patientes = Patiente.objects.filter(creer_a_hopital=hopital)
-        result = []
-        for pat in patientes:
-            pat_data = PatienteBaseSerializer(pat).data
-            grossesses = Grossesse.objects.filter(patiente=pat)
-            grossesses_data = []
-            for g in grossesses:
-                g_data = GrossesseSerializer(g).data
-                dossier = getattr(g, "dossier", None)
-                g_data["dossier_obstetrical"] = DossierObstetricalSerializer(dossier).data if dossier else None
-                grossesses_data.append(g_data)
-            result.append({
-                "patiente": pat_data,
-                "grossesses": grossesses_data
-            })
+        patiente_ids = Patiente.objects.filter(creer_a_hopital=hopital).order_by("id").values_list("id", flat=True)
+        result = PatientSummaryService.documents_for(patiente_ids, with_carte=False, with_suivi=False)
         return Response(result, status=status.HTTP_200_OK)
 class UpdateGrossesseAndDossierView(APIView):
     permission_classes = [IsAuthenticated]
@@ -75,28 +63,12 @@ class PatienteFullInfoView(APIView):
 
     def get(self, request, patiente_id):
         from patiente__module.models.patiente import Patiente
-        try:
-            pat = Patiente.objects.get(id=patiente_id)
-        except Patiente.DoesNotExist:
+        if not Patiente.objects.filter(id=patiente_id).exists():
             return Response({"detail": "Patiente introuvable."}, status=status.HTTP_404_NOT_FOUND)
 
-        # Infos personnelles
-        pat_data = PatienteBaseSerializer(pat).data
-
-        # Grossesses et dossiers
-        grossesses = Grossesse.objects.filter(patiente=pat)
-        grossesses_data = []
-        for g in grossesses:
-            g_data = GrossesseSerializer(g).data
-            # Dossier obstétrique lié
-            dossier = getattr(g, "dossier", None)
-            g_data["dossier_obstetrical"] = DossierObstetricalSerializer(dossier).data if dossier else None
-            grossesses_data.append(g_data)
-
-        return Response({
-            "patiente": pat_data,
-            "grossesses": grossesses_data
-        }, status=status.HTTP_200_OK)
+        # Infos personnelles, grossesses et dossiers depuis le résumé précalculé
+        result = PatientSummaryService.documents_for([patiente_id], with_carte=False, with_suivi=False)
+        return Response(result[0], status=status.HTTP_200_OK)
 
 
 class CreateGrossesseAndDossierView(APIView):
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SmsSenderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sms_sender'
+
+    def ready(self):
+        from sms_sender import checks  # noqa: F401
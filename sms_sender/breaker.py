@@ -0,0 +1,183 @@
+# sms_sender/breaker.py
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Bornes (ms) de l'histogramme des latences ; les percentiles sont donnés par borne supérieure
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _incr(cache, key, ttl):
+    """
+    Compteur partagé : add() crée la clé avec son expiration. incr() est atomique sur Redis ;
+    sur DatabaseCache (lecture puis écriture) deux échecs simultanés peuvent ne compter qu'une fois.
+    """
+    if cache.add(key, 1, timeout=ttl):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:  # clé expirée entre add() et incr()
+        cache.set(key, 1, timeout=ttl)
+        return 1
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur autour de la passerelle SMS, état partagé entre workers via un
+    cache Django (alias SMS_BREAKER_CACHE, "shared" par défaut ; un LocMem
+    donnerait un disjoncteur par processus, signalé par le check sms_sender.W001).
+
+    - fermé : les appels passent ; `failure_threshold` échecs en `window` secondes l'ouvrent,
+      même entrecoupés de succès (fenêtre fixe ouverte au premier échec) ;
+    - ouvert : échec immédiat pendant `open_seconds` (pas d'attente du timeout) ;
+    - semi-ouvert : un seul appel d'essai ; succès -> fermé, échec -> rouvert.
+    """
+
+    def __init__(self, name, failure_threshold=5, window=60, open_seconds=30, cache_alias="shared"):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.open_seconds = open_seconds
+        self.cache_alias = cache_alias
+        prefix = f"sms_sender:breaker:{name}:"
+        self._failures_key = prefix + "failures"
+        self._opened_key = prefix + "opened_until"
+        self._probe_key = prefix + "probe"
+
+    @classmethod
+    def from_settings(cls, name):
+        return cls(
+            name,
+            failure_threshold=getattr(settings, "SMS_BREAKER_FAILURES", 5),
+            window=getattr(settings, "SMS_BREAKER_WINDOW", 60),
+            open_seconds=getattr(settings, "SMS_BREAKER_OPEN_SECONDS", 30),
+            cache_alias=getattr(settings, "SMS_BREAKER_CACHE", "shared"),
+        )
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def state(self):
+        opened_until = self.cache.get(self._opened_key)
+        if opened_until is None:
+            return "closed"
+        return "open" if time.time() < opened_until else "half_open"
+
+    def retry_after(self):
+        """Secondes avant le prochain essai (0 si le disjoncteur est fermé)."""
+        opened_until = self.cache.get(self._opened_key)
+        return max(int(opened_until - time.time()) + 1, 1) if opened_until else 0
+
+    def allow(self):
+        state = self.state()
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        # Semi-ouvert : le premier arrivé fait l'appel d'essai, les autres échouent vite
+        return self.cache.add(self._probe_key, 1, timeout=max(self.open_seconds, 1))
+
+    def _open(self):
+        self.cache.set(self._opened_key, time.time() + self.open_seconds, timeout=self.open_seconds + self.window + 300)
+        self.cache.delete_many([self._failures_key, self._probe_key])
+
+    def record_success(self):
+        # Le compteur d'échecs n'est pas remis à zéro : une passerelle qui échoue un appel sur
+        # deux doit quand même ouvrir le disjoncteur. Il expire avec sa fenêtre.
+        if self.cache.get(self._opened_key) is not None:
+            self.cache.delete_many([self._opened_key, self._probe_key])
+
+    def record_failure(self):
+        if self.state() != "closed":
+            self._open()  # échec de l'appel d'essai
+            return
+        if _incr(self.cache, self._failures_key, self.window) >= self.failure_threshold:
+            self._open()
+
+    def status(self):
+        return {
+            "state": self.state(),
+            "recent_failures": self.cache.get(self._failures_key) or 0,
+            "retry_after": self.retry_after(),
+            "failure_threshold": self.failure_threshold,
+            "window": self.window,
+            "open_seconds": self.open_seconds,
+        }
+
+
+class GatewayHealth:
+    """
+    Statistiques glissantes des appels à la passerelle, partagées entre workers :
+    compteurs par minute dans le cache (appels, erreurs par type, histogramme des latences).
+    """
+
+    def __init__(self, name, window_minutes=15, cache_alias="shared"):
+        self.prefix = f"sms_sender:health:{name}:"
+        self.window_minutes = window_minutes
+        self.cache_alias = cache_alias
+
+    @classmethod
+    def from_settings(cls, name):
+        return cls(
+            name,
+            window_minutes=getattr(settings, "SMS_HEALTH_WINDOW_MINUTES", 15),
+            cache_alias=getattr(settings, "SMS_BREAKER_CACHE", "shared"),
+        )
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def record(self, latency, error_type=None):
+        minute = int(time.time() // 60)
+        ms = latency * 1000
+        bucket = next((str(b) for b in LATENCY_BUCKETS_MS if ms <= b), "inf")
+        ttl = (self.window_minutes + 1) * 60
+        champs = ["calls", f"lat:{bucket}"] + ([f"err:{error_type}"] if error_type else [])
+        for champ in champs:
+            _incr(self.cache, f"{self.prefix}{minute}:{champ}", ttl)
+
+    def record_rejected(self):
+        """Appel refusé par le disjoncteur (pas d'appel réseau, hors latences)."""
+        _incr(self.cache, f"{self.prefix}{int(time.time() // 60)}:rejected", (self.window_minutes + 1) * 60)
+
+    def snapshot(self, minutes=5, failure_types=()):
+        minutes = max(1, min(minutes, self.window_minutes))
+        courante = int(time.time() // 60)
+        champs = ["calls", "rejected"] + [f"lat:{b}" for b in LATENCY_BUCKETS_MS] + ["lat:inf"]
+        erreurs_connues = ("timeout", "connection", "http_error", "api_error", "invalid_response", "invalid_structure")
+        champs += [f"err:{e}" for e in erreurs_connues]
+        cles = {f"{self.prefix}{m}:{c}": c for m in range(courante - minutes + 1, courante + 1) for c in champs}
+
+        totaux = {}
+        for cle, valeur in self.cache.get_many(list(cles)).items():
+            totaux[cles[cle]] = totaux.get(cles[cle], 0) + valeur
+
+        calls = totaux.get("calls", 0)
+        erreurs = {e: totaux[f"err:{e}"] for e in erreurs_connues if totaux.get(f"err:{e}")}
+        echecs = sum(n for e, n in erreurs.items() if e in failure_types)
+        histogramme = [(b, totaux.get(f"lat:{b}", 0)) for b in LATENCY_BUCKETS_MS] + [("inf", totaux.get("lat:inf", 0))]
+        mesures = sum(n for _, n in histogramme)
+
+        def percentile(p):
+            if not mesures:
+                return None
+            seuil, cumul = p * mesures, 0
+            for borne, n in histogramme:
+                cumul += n
+                if cumul >= seuil:
+                    return borne
+            return "inf"
+
+        return {
+            "minutes": minutes,
+            "calls": calls,
+            "rejected_by_breaker": totaux.get("rejected", 0),
+            "errors": erreurs,
+            "error_rate": round(sum(erreurs.values()) / calls, 4) if calls else 0.0,
+            "failure_rate": round(echecs / calls, 4) if calls else 0.0,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99)},
+            "latency_histogram_ms": {str(b): n for b, n in histogramme},
+        }
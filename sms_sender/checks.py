@@ -0,0 +1,9 @@
+# sms_sender/checks.py
+from django.core.checks import Tags, register
+
+from jali_django_api.checks import shared_cache_check
+
+
+@register(Tags.caches)
+def breaker_cache_check(app_configs, **kwargs):
+    return shared_cache_check("SMS_BREAKER_CACHE", "l'état du disjoncteur SMS", "sms_sender.W001")
@@ -0,0 +1,209 @@
+# sms_sender/dispatcher.py
+import logging
+import random
+import select
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as futures_wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import SmsOutbox
+from .services import OUTBOX_NOTIFY_CHANNEL, gateway_breaker, map_delivery_results, send_sms_via_md
+
+logger = logging.getLogger(__name__)
+
+# Erreurs passagères : le SMS est replanifié avec un délai croissant
+RETRYABLE_ERRORS = {"timeout", "connection", "http_error"}
+
+
+class SmsOutboxDispatcher:
+    """
+    Vide la table SmsOutbox : réserve des lignes PENDING (FOR UPDATE SKIP
+    LOCKED, plusieurs dispatchers possibles) et les envoie en parallèle dans un
+    pool de threads. En continu (run), une ligne n'est réservée que lorsqu'un
+    thread est libre : un OTP n'attend pas la fin d'un gros lot de rappels.
+
+    Échec passager : nouvel essai après backoff * 2^(essais - 1) secondes (plafonné),
+    jusqu'à max_attempts. Erreur de l'API MD ou SMS expiré : FAILED.
+    Une ligne restée SENDING plus de stale_after secondes (dispatcher arrêté en
+    plein envoi) repasse PENDING.
+    Lot de plusieurs numéros (campagne) : le résultat de chaque numéro est
+    enregistré dans SmsOutbox.recipients.
+    """
+
+    def __init__(self, workers=4, batch_size=50, max_attempts=5, backoff=30, max_backoff=3600, stale_after=300):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stale_after = stale_after
+        self._executor = None
+        self._listen_conn = None
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            workers=getattr(settings, "SMS_OUTBOX_WORKERS", 4),
+            batch_size=getattr(settings, "SMS_OUTBOX_BATCH_SIZE", 50),
+            max_attempts=getattr(settings, "SMS_OUTBOX_MAX_ATTEMPTS", 5),
+            backoff=getattr(settings, "SMS_OUTBOX_BACKOFF", 30),
+            max_backoff=getattr(settings, "SMS_OUTBOX_MAX_BACKOFF", 3600),
+            stale_after=getattr(settings, "SMS_OUTBOX_STALE_AFTER", 300),
+        )
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sms-outbox")
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def requeue_stale(self):
+        limite = timezone.now() - timedelta(seconds=self.stale_after)
+        return SmsOutbox.objects.filter(statut="SENDING", locked_at__lt=limite).update(statut="PENDING", locked_at=None)
+
+    def claim(self, limit=None):
+        """Réserve jusqu'à `limit` SMS à envoyer (statut SENDING) et les retourne."""
+        limit = limit or self.batch_size
+        now = timezone.now()
+        with transaction.atomic():
+            lot = list(
+                SmsOutbox.objects.select_for_update(skip_locked=True)
+                .filter(statut="PENDING", next_attempt_at__lte=now)
+                .order_by("next_attempt_at")[:limit]
+            )
+            if lot:
+                SmsOutbox.objects.filter(id__in=[sms.id for sms in lot]).update(statut="SENDING", locked_at=now)
+        for sms in lot:
+            sms.statut, sms.locked_at = "SENDING", now
+        return lot
+
+    def _delay(self, attempts):
+        delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        return timedelta(seconds=delay * random.uniform(1.0, 1.1))  # jitter : évite les vagues synchronisées
+
+    def _apply(self, sms, result):
+        now = timezone.now()
+        if result.get("error_type") == "circuit_open":
+            # Passerelle déclarée indisponible : pas d'appel fait, l'essai n'est pas compté
+            sms.statut, sms.locked_at = "PENDING", None
+            sms.next_attempt_at = now + timedelta(seconds=result.get("retry_after") or 1)
+            return "retry"
+        sms.attempts += 1
+        sms.locked_at = None
+        sms.http_status = result.get("http_status")
+        if result.get("success"):
+            sms.statut, sms.sent_at, sms.last_error = "SENT", now, None
+            if sms.recipients:
+                sms.recipients = map_delivery_results(sms.recipients, result.get("data"))
+            return "sent"
+
+        if result.get("error_type") == "api_error":
+            sms.last_error = f"{result.get('api_error_code')} - {result.get('api_error_description')}"
+        else:
+            sms.last_error = f"{result.get('error_type')}: {result.get('error')}"
+        retry_at = now + self._delay(sms.attempts)
+        if (
+            result.get("error_type") in RETRYABLE_ERRORS
+            and sms.attempts < self.max_attempts
+            and (sms.expire_at is None or retry_at < sms.expire_at)
+        ):
+            sms.statut, sms.next_attempt_at = "PENDING", retry_at
+            return "retry"
+        sms.statut = "FAILED"
+        return "failed"
+
+    def _send(self, sms):
+        if sms.expire_at is not None and sms.expire_at <= timezone.now():
+            return {"success": False, "error_type": "expired", "error": "SMS expiré avant l'envoi", "http_status": None}
+        try:
+            return send_sms_via_md(sms.message, sms.mobile_numbers, sender_id=sms.sender_id)
+        except Exception as e:  # ne jamais perdre un lot pour une exception inattendue
+            logger.exception(f"Erreur inattendue lors de l'envoi du SMS {sms.id}")
+            return {"success": False, "error_type": "exception", "error": str(e), "http_status": None}
+
+    def _finish(self, termines):
+        """Enregistre le résultat des envois terminés [(future, sms)] en une requête."""
+        compteurs = {"sent": 0, "retry": 0, "failed": 0}
+        for future, sms in termines:
+            compteurs[self._apply(sms, future.result())] += 1
+        if termines:
+            SmsOutbox.objects.bulk_update(
+                [sms for _, sms in termines],
+                ["statut", "attempts", "locked_at", "http_status", "last_error", "next_attempt_at", "sent_at", "recipients"],
+            )
+            logger.info(f"Outbox SMS : {compteurs}")
+        return compteurs
+
+    def dispatch_once(self):
+        """Traite un lot complet ; retourne les compteurs (claimed, sent, retry, failed)."""
+        self.requeue_stale()
+        lot = self.claim() if gateway_breaker.state() != "open" else []
+        termines = [(self.executor.submit(self._send, sms), sms) for sms in lot]
+        return {"claimed": len(lot), **self._finish(termines)}
+
+    def wait(self, timeout):
+        """
+        Attend un NOTIFY de enqueue_sms (PostgreSQL) ou l'expiration du délai :
+        un SMS commité part immédiatement, sans interroger la table en boucle.
+        """
+        if connection.vendor != "postgresql":
+            time.sleep(timeout)
+            return
+        connection.ensure_connection()
+        conn = connection.connection
+        if self._listen_conn is not conn:
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {OUTBOX_NOTIFY_CHANNEL}")
+            self._listen_conn = conn
+        if select.select([conn], [], [], timeout)[0]:
+            conn.poll()
+            conn.notifies.clear()
+
+    def run(self, poll_interval=2, once=False):
+        if once:
+            try:
+                return self.dispatch_once()
+            finally:
+                self.close()
+
+        en_cours = {}
+        prochain_requeue = 0
+        try:
+            while True:
+                try:
+                    if time.monotonic() >= prochain_requeue:
+                        self.requeue_stale()
+                        prochain_requeue = time.monotonic() + 60
+                    libres = self.workers - len(en_cours)
+                    # Disjoncteur ouvert : les SMS restent PENDING jusqu'à l'appel d'essai
+                    ouvert = gateway_breaker.state() == "open"
+                    if libres > 0 and not ouvert:
+                        for sms in self.claim(min(libres, self.batch_size)):
+                            en_cours[self.executor.submit(self._send, sms)] = sms
+                    if not en_cours:
+                        self.wait(min(poll_interval, gateway_breaker.retry_after()) if ouvert else poll_interval)
+                        continue
+                    # Tous les threads occupés : attendre une fin d'envoi ; sinon revenir
+                    # vite réserver les nouveaux SMS (la requête passe par l'index partiel)
+                    termines, _ = futures_wait(
+                        en_cours, timeout=None if len(en_cours) >= self.workers else 0.2,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    self._finish([(future, en_cours.pop(future)) for future in termines])
+                except DatabaseError:
+                    logger.exception("Erreur base de données dans le dispatcher SMS, nouvelle tentative")
+                    self._listen_conn = None
+                    close_old_connections()
+                    connection.close()
+                    time.sleep(poll_interval)
+        finally:
+            self.close()
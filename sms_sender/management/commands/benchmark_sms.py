@@ -0,0 +1,83 @@
+# sms_sender/management/commands/benchmark_sms.py
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from sms_sender.services import reset_http_session, send_sms_via_md
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    """Passerelle MD SMS factice : répond ErrorCode 0 après une latence configurable."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # en-têtes et corps écrits séparément : pas d'attente d'ACK retardé
+    latency = 0.0
+    connexions = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        type(self).connexions += 1
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = json.dumps({"ErrorCode": 0, "ErrorDescription": "Success", "Data": [{"MessageErrorCode": 0}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la latence par SMS vers une passerelle MD SMS factice locale : "
+        "une connexion par SMS (MD_SMS_POOL_SIZE=0) puis session partagée keep-alive."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=200)
+        parser.add_argument("--latency", type=float, default=0.0, help="Latence de la passerelle factice (s).")
+        parser.add_argument("--host", default="localhost", help="Nom d'hôte utilisé (inclut la résolution DNS).")
+
+    def handle(self, *args, **options):
+        handler = type("Handler", (StubGatewayHandler,), {"latency": options["latency"], "connexions": 0})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://{options['host']}:{server.server_address[1]}/api/v2/SendSMS"
+
+        try:
+            for libelle, pool_size in (("Sans pool (avant)", 0), ("Session partagée (après)", 10)):
+                handler.connexions = 0
+                with override_settings(MD_SMS_BASE_URL=url, MD_SMS_API_KEY="bench", MD_SMS_CLIENT_ID="bench",
+                                       MD_SMS_POOL_SIZE=pool_size):
+                    reset_http_session()
+                    durees = self._mesurer(options["messages"])
+                    reset_http_session()
+                durees.sort()
+                self.stdout.write(
+                    f"{libelle:<26} moyenne {statistics.mean(durees) * 1000:.2f} ms, "
+                    f"p50 {durees[len(durees) // 2] * 1000:.2f} ms, "
+                    f"p95 {durees[int(len(durees) * 0.95)] * 1000:.2f} ms, "
+                    f"connexions TCP : {handler.connexions}"
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def _mesurer(self, n):
+        durees = []
+        for i in range(n):
+            debut = time.perf_counter()
+            result = send_sms_via_md(f"Code OTP : {i:06d}", "243000000000")
+            durees.append(time.perf_counter() - debut)
+            if not result.get("success"):
+                raise RuntimeError(f"Envoi échoué : {result}")
+        return durees
@@ -0,0 +1,40 @@
+# sms_sender/management/commands/dispatch_sms_outbox.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sms_sender.dispatcher import SmsOutboxDispatcher
+
+
+class Command(BaseCommand):
+    help = (
+        "Envoie les SMS de l'outbox (processus dédié, à lancer à côté de gunicorn). "
+        "Plusieurs instances peuvent tourner en parallèle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Traite un seul lot puis s'arrête (cron).")
+        parser.add_argument("--workers", type=int, help="Envois simultanés (défaut : SMS_OUTBOX_WORKERS).")
+        parser.add_argument("--batch-size", type=int, help="SMS réservés par lot (défaut : SMS_OUTBOX_BATCH_SIZE).")
+        parser.add_argument("--poll-interval", type=float,
+                            default=getattr(settings, "SMS_OUTBOX_POLL_INTERVAL", 2),
+                            help="Attente max entre deux lots (s) ; réveil immédiat par NOTIFY sous PostgreSQL.")
+
+    def handle(self, *args, **options):
+        dispatcher = SmsOutboxDispatcher.from_settings()
+        if options["workers"]:
+            dispatcher.workers = options["workers"]
+        if options["batch_size"]:
+            dispatcher.batch_size = options["batch_size"]
+
+        if options["once"]:
+            compteurs = dispatcher.run(once=True)
+            self.stdout.write(self.style.SUCCESS(f"Lot traité : {compteurs}"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dispatcher SMS démarré ({dispatcher.workers} envois simultanés, lots de {dispatcher.batch_size})."
+        ))
+        try:
+            dispatcher.run(poll_interval=options["poll_interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt du dispatcher SMS.")
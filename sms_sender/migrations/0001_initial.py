@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SmsOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField()),
+                ('mobile_numbers', models.CharField(max_length=255)),
+                ('sender_id', models.CharField(blank=True, max_length=20, null=True)),
+                ('reference', models.CharField(blank=True, max_length=100, null=True)),
+                ('statut', models.CharField(choices=[('PENDING', 'En attente'), ('SENDING', "En cours d'envoi"), ('SENT', 'Envoyé'), ('FAILED', 'Échec')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expire_at', models.DateTimeField(blank=True, null=True)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('http_status', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'sms_outbox',
+                'indexes': [models.Index(condition=models.Q(('statut', 'PENDING')), fields=['next_attempt_at'], name='sms_outbox_pending_idx'), models.Index(condition=models.Q(('statut', 'SENDING')), fields=['locked_at'], name='sms_outbox_sending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_sender', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsoutbox',
+            name='recipients',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='smsoutbox',
+            name='mobile_numbers',
+            field=models.TextField(),
+        ),
+        migrations.CreateModel(
+            name='SmsCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=150)),
+                ('sender_id', models.CharField(blank=True, max_length=20, null=True)),
+                ('total_recipients', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sms_campaigns', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'sms_campaign',
+            },
+        ),
+        migrations.AddField(
+            model_name='smsoutbox',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='sms_sender.smscampaign'),
+        ),
+    ]
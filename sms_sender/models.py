@@ -1,3 +1,71 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class SmsCampaign(models.Model):
+    """Envoi groupé (rappels, annonces) : ses SMS sont des lignes SmsOutbox de plusieurs numéros."""
+    nom = models.CharField(max_length=150)
+    sender_id = models.CharField(max_length=20, null=True, blank=True)
+    total_recipients = models.PositiveIntegerField(default=0)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="sms_campaigns"
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "sms_campaign"
+
+    def __str__(self):
+        return f"Campagne {self.nom} ({self.total_recipients} destinataires)"
+
+
+class SmsOutbox(models.Model):
+    """
+    File d'envoi des SMS (outbox transactionnelle) : la ligne est écrite dans la
+    même transaction que l'OTP ou le code, puis envoyée par la commande
+    dispatch_sms_outbox. La requête HTTP n'attend jamais la passerelle.
+    """
+    STATUTS = (
+        ("PENDING", "En attente"),
+        ("SENDING", "En cours d'envoi"),
+        ("SENT", "Envoyé"),
+        ("FAILED", "Échec"),
+    )
+    message = models.TextField()
+    mobile_numbers = models.TextField()  # un numéro, ou jusqu'à MD_SMS_BATCH_SIZE séparés par des virgules
+    sender_id = models.CharField(max_length=20, null=True, blank=True)
+    reference = models.CharField(max_length=100, null=True, blank=True)  # ex. "otp:42", pour le suivi
+    campaign = models.ForeignKey(SmsCampaign, on_delete=models.CASCADE, null=True, blank=True, related_name="messages")
+    # Utilisateur dont la requête a mis le SMS en file (seul lui, ou un superadmin, en voit le statut)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="sms_envoyes"
+    )
+    # Lot de plusieurs numéros : {numéro: {"reference", puis résultat de la passerelle "code", "description", "message_id"}}
+    recipients = models.JSONField(null=True, blank=True)
+    statut = models.CharField(max_length=10, choices=STATUTS, default="PENDING")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    expire_at = models.DateTimeField(null=True, blank=True)  # au-delà, inutile d'envoyer (ex. OTP expiré)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    http_status = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "sms_outbox"
+        indexes = [
+            # Seules les lignes à traiter sont indexées : la table des SMS envoyés peut grossir sans coût
+            models.Index(
+                fields=["next_attempt_at"], name="sms_outbox_pending_idx",
+                condition=models.Q(statut="PENDING"),
+            ),
+            models.Index(
+                fields=["locked_at"], name="sms_outbox_sending_idx",
+                condition=models.Q(statut="SENDING"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"SMS {self.id} -> {self.mobile_numbers} ({self.statut})"
@@ -10,3 +10,38 @@ class SendSMSSerializer(serializers.Serializer):
     data_coding = serializers.ChoiceField(choices=["0","3","8"], required=False)
     schedule_time = serializers.CharField(required=False, allow_blank=True)  # yyyy-MM-dd HH:MM si utilisé
     group_id = serializers.CharField(required=False, allow_blank=True)
+
+
+class SmsCampaignSerializer(serializers.Serializer):
+    """
+    Campagne : soit un même `message` pour `mobile_numbers`, soit une liste
+    `recipients` de {"mobile_number", "message", "reference"} (textes personnalisés).
+    Validation volontairement légère : plusieurs dizaines de milliers de destinataires.
+    """
+    MAX_RECIPIENTS = 50000
+
+    nom = serializers.CharField(max_length=150)
+    sender_id = serializers.CharField(required=False, allow_blank=True, max_length=20)
+    message = serializers.CharField(required=False, max_length=1000)
+    mobile_numbers = serializers.ListField(child=serializers.CharField(max_length=20), required=False,
+                                           max_length=MAX_RECIPIENTS)
+    recipients = serializers.ListField(child=serializers.DictField(), required=False, max_length=MAX_RECIPIENTS)
+
+    def validate(self, attrs):
+        recipients = list(attrs.get("recipients") or [])
+        if attrs.get("mobile_numbers"):
+            if not attrs.get("message"):
+                raise serializers.ValidationError({"message": "Requis avec mobile_numbers."})
+            recipients += [{"mobile_number": numero, "message": attrs["message"]} for numero in attrs["mobile_numbers"]]
+        if not recipients:
+            raise serializers.ValidationError("Aucun destinataire (recipients ou mobile_numbers).")
+        if len(recipients) > self.MAX_RECIPIENTS:
+            raise serializers.ValidationError(f"Au plus {self.MAX_RECIPIENTS} destinataires par campagne.")
+        for index, recipient in enumerate(recipients):
+            message = recipient.get("message")
+            if not recipient.get("mobile_number") or not isinstance(message, str) or not message.strip():
+                raise serializers.ValidationError({"recipients": f"Destinataire {index} : mobile_number et message requis."})
+            if len(message) > 1000:
+                raise serializers.ValidationError({"recipients": f"Destinataire {index} : message trop long."})
+        attrs["recipients"] = recipients
+        return attrs
@@ -1,19 +1,141 @@
 # sms_sender/services.py
 import logging
+import os
 import random
+import re
+import threading
+import time
 import requests
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .breaker import CircuitBreaker, GatewayHealth
+from .models import SmsCampaign, SmsOutbox
 
 logger = logging.getLogger(__name__)
 
+# Canal PostgreSQL LISTEN/NOTIFY : réveille dispatch_sms_outbox dès le commit
+OUTBOX_NOTIFY_CHANNEL = "sms_outbox"
+
+# Erreurs qui signalent une passerelle indisponible (comptées par le disjoncteur)
+GATEWAY_FAILURES = {"timeout", "connection", "http_error"}
+
+gateway_breaker = CircuitBreaker.from_settings("md_sms")
+gateway_health = GatewayHealth.from_settings("md_sms")
+
+_http_session = None
+_http_session_pid = None
+_http_session_lock = threading.Lock()
+
+
+def _build_http_session():
+    pool_size = getattr(settings, "MD_SMS_POOL_SIZE", 10)
+    # Seuls les échecs de connexion sont rejoués : la requête n'est pas partie,
+    # pas de risque d'envoyer deux fois le même SMS. read=False : un délai de
+    # lecture dépassé remonte tel quel (error_type "timeout").
+    retries = getattr(settings, "MD_SMS_CONNECT_RETRIES", 2)
+    retry = Retry(total=retries, connect=retries, read=False, status=0, other=0,
+                  backoff_factor=0.2, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_http_session():
+    """
+    Session HTTP partagée vers la passerelle MD SMS : connexions keep-alive
+    réutilisées (pas de TCP/DNS par SMS). Une session par processus : elle est
+    recréée après un fork (workers gunicorn) pour ne pas partager de sockets.
+    MD_SMS_POOL_SIZE = 0 : pas de pool, une connexion par SMS (ancien comportement).
+    """
+    global _http_session, _http_session_pid
+    if getattr(settings, "MD_SMS_POOL_SIZE", 10) <= 0:
+        return requests
+    pid = os.getpid()
+    if _http_session is None or _http_session_pid != pid:
+        with _http_session_lock:
+            if _http_session is None or _http_session_pid != pid:
+                _http_session = _build_http_session()
+                _http_session_pid = pid
+    return _http_session
+
+
+def reset_http_session():
+    """Ferme la session partagée (changement de configuration, tests de performance)."""
+    global _http_session, _http_session_pid
+    with _http_session_lock:
+        if _http_session is not None and _http_session_pid == os.getpid():
+            _http_session.close()
+        _http_session = None
+        _http_session_pid = None
+
+def normalize_mobile_number(numero):
+    """
+    Numéro au format de la passerelle MD SMS : indicatif puis numéro, chiffres seuls
+    (ex. "0812345678", "+243 812 345 678", "243812345678" -> "243812345678").
+    Sans indicatif, celui de la RDC (243) est ajouté. Chaîne vide si aucun chiffre.
+    """
+    numero = str(numero or "").strip()
+    international = numero.startswith(("+", "00"))
+    chiffres = re.sub(r"\D", "", numero)
+    if not chiffres:
+        return ""
+    if numero.startswith("00"):
+        return chiffres[2:]
+    if international or chiffres.startswith("243"):
+        return chiffres
+    return "243" + chiffres.lstrip("0")
+
+
 def _normalize_mobile_numbers(mobile_numbers):
-    if isinstance(mobile_numbers, (list, tuple)):
-        return ",".join(str(m).strip() for m in mobile_numbers)
-    return str(mobile_numbers).strip()
+    """Liste ou chaîne "n1,n2" -> "243...,243..." (numéros normalisés, vides ignorés)."""
+    if not isinstance(mobile_numbers, (list, tuple)):
+        mobile_numbers = str(mobile_numbers).split(",")
+    return ",".join(filter(None, (normalize_mobile_number(m) for m in mobile_numbers)))
+
+def _is_gateway_failure(result):
+    if result.get("error_type") == "http_error":
+        return (result.get("http_status") or 500) >= 500  # un 4xx vient d'une passerelle qui répond
+    return result.get("error_type") in GATEWAY_FAILURES
+
+
+def send_sms_via_md(message, mobile_numbers, **options):
+    """
+    Appel à l'API MD SMS protégé par le disjoncteur `gateway_breaker` : s'il est
+    ouvert, échec immédiat (error_type "circuit_open", retry_after en secondes)
+    au lieu d'attendre le timeout. Chaque appel réel alimente `gateway_health`.
+    Même format de retour que _send_sms_via_md.
+    """
+    if not gateway_breaker.allow():
+        gateway_health.record_rejected()
+        return {
+            "success": False,
+            "error_type": "circuit_open",
+            "error": "Passerelle SMS indisponible (disjoncteur ouvert)",
+            "http_status": 503,
+            "retry_after": gateway_breaker.retry_after(),
+        }
 
-def send_sms_via_md(message, mobile_numbers, sender_id=None,
-                   is_unicode=None, is_flash=None, data_coding=None,
-                   schedule_time=None, group_id=None):
+    debut = time.perf_counter()
+    result = _send_sms_via_md(message, mobile_numbers, **options)
+    if result.get("error_type") == "config":
+        return result  # pas d'appel réseau
+    gateway_health.record(time.perf_counter() - debut, result.get("error_type"))
+    if _is_gateway_failure(result):
+        gateway_breaker.record_failure()
+    else:
+        gateway_breaker.record_success()
+    return result
+
+
+def _send_sms_via_md(message, mobile_numbers, sender_id=None,
+                     is_unicode=None, is_flash=None, data_coding=None,
+                     schedule_time=None, group_id=None):
     """
     Appelle l'API MD SMS (GET).
     Retourne un dict structuré contenant:
@@ -61,7 +183,7 @@ def send_sms_via_md(message, mobile_numbers, sender_id=None,
     timeout = getattr(settings, "MD_SMS_TIMEOUT", 10)
 
     try:
-        resp = requests.get(base, params=params, headers=headers, timeout=timeout)
+        resp = get_http_session().get(base, params=params, headers=headers, timeout=timeout)
         resp.raise_for_status()
     except requests.exceptions.Timeout:
         logger.exception("Timeout contacting MD SMS")
@@ -101,3 +223,98 @@ def send_sms_via_md(message, mobile_numbers, sender_id=None,
 
     # succès
     return {"success": True, "http_status": resp.status_code, "data": data.get("Data")}
+
+
+def enqueue_sms(message, mobile_numbers, sender_id=None, reference=None, expire_at=None, created_by=None):
+    """
+    Ajoute un SMS à l'outbox, dans la transaction en cours : il ne part que si
+    elle est validée. L'envoi réel est fait par la commande dispatch_sms_outbox.
+    `created_by` : utilisateur autorisé à suivre le SMS (sms/outbox/<id>/).
+    """
+    sms = SmsOutbox.objects.create(
+        message=message,
+        mobile_numbers=_normalize_mobile_numbers(mobile_numbers),
+        sender_id=sender_id,
+        reference=reference,
+        expire_at=expire_at,
+        created_by=created_by,
+    )
+    _notify_dispatcher()
+    return sms
+
+
+def _notify_dispatcher():
+    if connection.vendor == "postgresql":
+        # Délivré par PostgreSQL au commit de la transaction (jamais en cas de rollback)
+        with connection.cursor() as cursor:
+            cursor.execute(f"NOTIFY {OUTBOX_NOTIFY_CHANNEL}")
+
+
+def enqueue_bulk_sms(recipients, nom, sender_id=None, created_by=None, expire_at=None, batch_size=None, campaign=None):
+    """
+    Crée une campagne : `recipients` est un itérable de dicts
+    {"mobile_number", "message", "reference" (optionnel)}.
+
+    Les destinataires qui reçoivent le même texte sont regroupés par lots de
+    MD_SMS_BATCH_SIZE numéros (champ MobileNumbers de la passerelle) : une ligne
+    SmsOutbox, donc un seul appel HTTP, par lot. Les lots sont envoyés en
+    parallèle par dispatch_sms_outbox. Les numéros sont normalisés comme dans
+    enqueue_sms (normalize_mobile_number) avant la déduplication : un numéro en
+    double pour le même texte, quelle que soit son écriture, n'est envoyé qu'une fois.
+    `campaign` : ajoute les SMS à une campagne existante (envoi par tranches).
+    """
+    batch_size = batch_size or getattr(settings, "MD_SMS_BATCH_SIZE", 100)
+    groupes = {}  # texte -> {numéro: référence}
+    for recipient in recipients:
+        numero = normalize_mobile_number(recipient.get("mobile_number"))
+        if numero:
+            groupes.setdefault(recipient["message"], {}).setdefault(numero, recipient.get("reference"))
+
+    with transaction.atomic():
+        if campaign is None:
+            campaign = SmsCampaign.objects.create(nom=nom, sender_id=sender_id, created_by=created_by)
+        lots = []
+        for message, numeros in groupes.items():
+            items = list(numeros.items())
+            for debut in range(0, len(items), batch_size):
+                lot = items[debut:debut + batch_size]
+                lots.append(SmsOutbox(
+                    message=message,
+                    mobile_numbers=",".join(numero for numero, _ in lot),
+                    sender_id=sender_id,
+                    campaign=campaign,
+                    created_by=campaign.created_by,
+                    recipients={numero: {"reference": reference} for numero, reference in lot},
+                    expire_at=expire_at,
+                ))
+        SmsOutbox.objects.bulk_create(lots, batch_size=500)
+        total = sum(len(numeros) for numeros in groupes.values())
+        SmsCampaign.objects.filter(pk=campaign.pk).update(total_recipients=F("total_recipients") + total)
+        campaign.total_recipients += total
+        if lots:
+            _notify_dispatcher()
+    return campaign
+
+
+def map_delivery_results(recipients, data):
+    """
+    Associe le résultat par numéro de la réponse MD SMS (liste `Data`) à chaque
+    destinataire du lot : {numéro: {..., "code", "description", "message_id"}}.
+    Correspondance par MobileNumber, sinon par position si la passerelle
+    renvoie un élément par numéro.
+    """
+    numeros = list(recipients)
+    items = [item for item in (data or []) if isinstance(item, dict)]
+    par_numero = {}
+    for position, item in enumerate(items):
+        numero = normalize_mobile_number(item.get("MobileNumber"))
+        if numero not in recipients and len(items) == len(numeros):
+            numero = numeros[position]
+        code = item.get("MessageErrorCode")
+        par_numero[numero] = {
+            "code": int(code) if code is not None else 0,
+            "description": item.get("MessageErrorDescription"),
+            "message_id": item.get("MessageId"),
+        }
+    absent = {"code": None, "description": "Numéro absent de la réponse de la passerelle", "message_id": None}
+    return {numero: {**(recipients[numero] or {}), **par_numero.get(numero, absent)} for numero in numeros}
@@ -1,3 +1,188 @@
-from django.test import TestCase
+import select
+import unittest
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from auth_module.models.user import User
+
+from .dispatcher import SmsOutboxDispatcher
+from .models import SmsOutbox
+from .services import OUTBOX_NOTIFY_CHANNEL, enqueue_bulk_sms, enqueue_sms, normalize_mobile_number
+
+
+class SmsOutboxApplyTest(SimpleTestCase):
+    """Transitions d'état d'un SMS de l'outbox selon le résultat de la passerelle."""
+
+    def setUp(self):
+        self.dispatcher = SmsOutboxDispatcher(max_attempts=3, backoff=30, max_backoff=3600)
+        self.now = timezone.now()
+
+    def sms(self, **champs):
+        valeurs = {"message": "Code 1234", "mobile_numbers": "243812345678", "statut": "SENDING", "locked_at": self.now}
+        valeurs.update(champs)
+        return SmsOutbox(**valeurs)
+
+    def test_succes(self):
+        sms = self.sms()
+        resultat = self.dispatcher._apply(sms, {"success": True, "http_status": 200, "data": []})
+        self.assertEqual(resultat, "sent")
+        self.assertEqual(sms.statut, "SENT")
+        self.assertEqual(sms.attempts, 1)
+        self.assertIsNotNone(sms.sent_at)
+        self.assertIsNone(sms.locked_at)
+        self.assertIsNone(sms.last_error)
+
+    def test_succes_lot_resultat_par_numero(self):
+        sms = self.sms(
+            mobile_numbers="243811111111,243822222222",
+            recipients={"243811111111": {"reference": "a"}, "243822222222": {"reference": "b"}},
+        )
+        data = [
+            {"MobileNumber": "243811111111", "MessageErrorCode": 0, "MessageId": "m1"},
+            {"MobileNumber": "243822222222", "MessageErrorCode": 7, "MessageErrorDescription": "Numéro invalide"},
+        ]
+        self.assertEqual(self.dispatcher._apply(sms, {"success": True, "data": data}), "sent")
+        self.assertEqual(sms.recipients["243811111111"]["code"], 0)
+        self.assertEqual(sms.recipients["243811111111"]["reference"], "a")
+        self.assertEqual(sms.recipients["243822222222"]["code"], 7)
+
+    def test_erreur_passagere_replanifiee(self):
+        sms = self.sms()
+        resultat = self.dispatcher._apply(sms, {"success": False, "error_type": "timeout", "error": "délai dépassé"})
+        self.assertEqual(resultat, "retry")
+        self.assertEqual(sms.statut, "PENDING")
+        self.assertEqual(sms.attempts, 1)
+        self.assertGreaterEqual(sms.next_attempt_at, self.now + timedelta(seconds=30))
+        self.assertEqual(sms.last_error, "timeout: délai dépassé")
+
+    def test_erreur_passagere_derniere_tentative(self):
+        sms = self.sms(attempts=2)
+        resultat = self.dispatcher._apply(sms, {"success": False, "error_type": "connection", "error": "refusée"})
+        self.assertEqual(resultat, "failed")
+        self.assertEqual(sms.statut, "FAILED")
+        self.assertEqual(sms.attempts, 3)
+
+    def test_erreur_passagere_apres_expiration(self):
+        sms = self.sms(expire_at=self.now + timedelta(seconds=10))
+        resultat = self.dispatcher._apply(sms, {"success": False, "error_type": "http_error", "error": "502"})
+        self.assertEqual(resultat, "failed")
+        self.assertEqual(sms.statut, "FAILED")
+
+    def test_erreur_api_definitive(self):
+        sms = self.sms()
+        resultat = self.dispatcher._apply(sms, {
+            "success": False, "error_type": "api_error", "api_error_code": 3, "api_error_description": "Solde insuffisant",
+        })
+        self.assertEqual(resultat, "failed")
+        self.assertEqual(sms.statut, "FAILED")
+        self.assertEqual(sms.last_error, "3 - Solde insuffisant")
+
+    def test_disjoncteur_ouvert_essai_non_compte(self):
+        sms = self.sms(attempts=1)
+        resultat = self.dispatcher._apply(sms, {"success": False, "error_type": "circuit_open", "retry_after": 20})
+        self.assertEqual(resultat, "retry")
+        self.assertEqual(sms.statut, "PENDING")
+        self.assertEqual(sms.attempts, 1)
+        self.assertIsNone(sms.locked_at)
+        self.assertGreaterEqual(sms.next_attempt_at, self.now + timedelta(seconds=20))
+
+
+class EnqueueSmsTransactionTest(TestCase):
+    def test_rollback_annule_le_sms(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue_sms("Code 1234", "+243812345678", reference="otp:1")
+                raise RuntimeError("échec après la mise en file")
+        self.assertFalse(SmsOutbox.objects.filter(reference="otp:1").exists())
+
+    def test_commit_conserve_le_sms(self):
+        with transaction.atomic():
+            sms = enqueue_sms("Code 1234", "+243812345678", reference="otp:2")
+        self.assertEqual(SmsOutbox.objects.get(id=sms.id).statut, "PENDING")
+
+
+class NormalizeMobileNumberTest(SimpleTestCase):
+    def test_formats_rdc(self):
+        for numero in ("0812345678", "812345678", "+243812345678", "243812345678", "+243 812 345 678"):
+            self.assertEqual(normalize_mobile_number(numero), "243812345678", numero)
+
+    def test_international_et_vide(self):
+        self.assertEqual(normalize_mobile_number("+33612345678"), "33612345678")
+        self.assertEqual(normalize_mobile_number("0033612345678"), "33612345678")
+        self.assertEqual(normalize_mobile_number(None), "")
+
+
+class EnqueueBulkSmsTest(TestCase):
+    def test_doublons_dedupliques_apres_normalisation(self):
+        campagne = enqueue_bulk_sms([
+            {"mobile_number": "0812345678", "message": "Rappel", "reference": "a"},
+            {"mobile_number": "+243812345678", "message": "Rappel", "reference": "b"},
+            {"mobile_number": "243 812 345 678", "message": "Rappel", "reference": "c"},
+        ], "Rappels")
+        sms = SmsOutbox.objects.get(campaign=campagne)
+        self.assertEqual(campagne.total_recipients, 1)
+        self.assertEqual(sms.mobile_numbers, "243812345678")
+        self.assertEqual(sms.recipients, {"243812345678": {"reference": "a"}})
+
+
+class SmsOutboxStatusViewTest(TestCase):
+    def setUp(self):
+        self.auteur, self.autre, self.superadmin = (
+            User.objects.create(email=f"{role.lower()}{i}@test.cd", nom="N", postnom="P", prenom="R", role=role)
+            for i, role in enumerate(("MEDECIN", "MEDECIN", "SUPERADMIN"))
+        )
+        self.sms = enqueue_sms("Code 1234", "0812345678", reference="otp:1", created_by=self.auteur)
+        self.client = APIClient()
+
+    def statut(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get(reverse("sms_outbox_status", args=[self.sms.id]))
+
+    def test_auteur_et_superadmin(self):
+        self.assertEqual(self.statut(self.auteur).data["statut"], "PENDING")
+        self.assertEqual(self.statut(self.superadmin).status_code, 200)
+
+    def test_autre_utilisateur(self):
+        self.assertEqual(self.statut(self.autre).status_code, 404)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "NOTIFY PostgreSQL")
+class EnqueueSmsNotifyTest(TransactionTestCase):
+    """Le dispatcher n'est réveillé qu'au commit de la transaction qui a mis le SMS en file."""
+
+    def setUp(self):
+        self.ecoute = connections.create_connection("default")
+        self.ecoute.ensure_connection()
+        self.ecoute.connection.autocommit = True
+        with self.ecoute.cursor() as cursor:
+            cursor.execute(f"LISTEN {OUTBOX_NOTIFY_CHANNEL}")
+
+    def tearDown(self):
+        self.ecoute.close()
+
+    def notifications(self):
+        conn = self.ecoute.connection
+        select.select([conn], [], [], 0.5)
+        conn.poll()
+        recues = list(conn.notifies)
+        conn.notifies.clear()
+        return recues
+
+    def test_pas_de_notify_si_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue_sms("Code 1234", "+243812345678")
+                raise RuntimeError("échec après la mise en file")
+        self.assertEqual(self.notifications(), [])
+        self.assertEqual(SmsOutbox.objects.count(), 0)
+
+    def test_notify_au_commit(self):
+        with transaction.atomic():
+            enqueue_sms("Code 1234", "+243812345678")
+            self.assertEqual(self.notifications(), [])
+        self.assertEqual(len(self.notifications()), 1)
@@ -1,6 +1,10 @@
 from django.urls import path
-from .views import SendSMSAPIView
+from .views import SendSMSAPIView, SmsCampaignStatusView, SmsCampaignView, SmsGatewayHealthView, SmsOutboxStatusView
 
 urlpatterns = [
     path("sms/send/", SendSMSAPIView.as_view(), name="sms_send"),
+    path("sms/outbox/<int:sms_id>/", SmsOutboxStatusView.as_view(), name="sms_outbox_status"),
+    path("sms/campaigns/", SmsCampaignView.as_view(), name="sms_campaigns"),
+    path("sms/campaigns/<int:campaign_id>/", SmsCampaignStatusView.as_view(), name="sms_campaign_status"),
+    path("sms/health/", SmsGatewayHealthView.as_view(), name="sms_health"),
 ]
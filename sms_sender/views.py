@@ -2,8 +2,17 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import SendSMSSerializer
-from .services import send_sms_via_md
+from rest_framework.permissions import IsAuthenticated
+from .models import SmsCampaign, SmsOutbox
+from .serializers import SendSMSSerializer, SmsCampaignSerializer
+from .services import GATEWAY_FAILURES, enqueue_bulk_sms, gateway_breaker, gateway_health, send_sms_via_md
+
+
+def is_superadmin(user):
+    return user.role == "SUPERADMIN"
+
+def is_gestionnaire(user):
+    return user.role == "GESTIONNAIRE"
 
 class SendSMSAPIView(APIView):
     def post(self, request):
@@ -24,6 +33,11 @@ class SendSMSAPIView(APIView):
 
         # autres mapping d'erreurs
         etype = result.get("error_type")
+        if etype == "circuit_open":
+            response = Response({"code": "gateway_unavailable", "message": result.get("error")},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response["Retry-After"] = str(result.get("retry_after") or 1)
+            return response
         if etype == "timeout":
             return Response({"code": "timeout", "message": result.get("error")}, status=status.HTTP_504_GATEWAY_TIMEOUT)
         if etype == "connection":
@@ -34,3 +48,109 @@ class SendSMSAPIView(APIView):
         # default
         return Response({"code": "error", "message": result.get("error"), "raw": result.get("raw", result.get("raw_text"))},
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class SmsOutboxStatusView(APIView):
+    """
+    Statut d'envoi d'un SMS de l'outbox (sms_id renvoyé à la création d'un OTP).
+    Superadmin : tous les SMS ; sinon ceux mis en file par l'utilisateur (404 pour les autres).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, sms_id):
+        messages = SmsOutbox.objects.all()
+        if not is_superadmin(request.user):
+            messages = messages.filter(created_by=request.user)
+        sms = messages.filter(id=sms_id).values(
+            "id", "reference", "statut", "attempts", "next_attempt_at", "last_error", "created_at", "sent_at"
+        ).first()
+        if sms is None:
+            return Response({"detail": "SMS introuvable"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(sms, status=status.HTTP_200_OK)
+
+
+class SmsCampaignView(APIView):
+    """Crée une campagne de SMS groupés (superadmin, gestionnaire) ; l'envoi est fait par dispatch_sms_outbox."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if not is_superadmin(request.user) and not is_gestionnaire(request.user):
+            return Response({"detail": "Accès refusé"}, status=status.HTTP_403_FORBIDDEN)
+        serializer = SmsCampaignSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        campaign = enqueue_bulk_sms(
+            data["recipients"], nom=data["nom"], sender_id=data.get("sender_id") or None, created_by=request.user
+        )
+        return Response({
+            "id": campaign.id,
+            "nom": campaign.nom,
+            "total_recipients": campaign.total_recipients,
+            "lots": campaign.messages.count(),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class SmsCampaignStatusView(APIView):
+    """
+    Avancement d'une campagne : lots par statut et résultat par destinataire.
+    Superadmin : toutes les campagnes ; gestionnaire : celles qu'il a créées.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_ECHECS = 100
+
+    def get(self, request, campaign_id):
+        user = request.user
+        if is_superadmin(user):
+            campaigns = SmsCampaign.objects.all()
+        elif is_gestionnaire(user):
+            campaigns = SmsCampaign.objects.filter(created_by=user)
+        else:
+            return Response({"detail": "Accès refusé"}, status=status.HTTP_403_FORBIDDEN)
+        campaign = campaigns.filter(id=campaign_id).first()
+        if campaign is None:
+            return Response({"detail": "Campagne introuvable"}, status=status.HTTP_404_NOT_FOUND)
+
+        lots = {}
+        destinataires = {"sent": 0, "failed": 0, "pending": 0}
+        echecs = []
+        for statut, recipients, last_error in campaign.messages.values_list("statut", "recipients", "last_error").iterator():
+            lots[statut] = lots.get(statut, 0) + 1
+            for numero, resultat in (recipients or {}).items():
+                if statut == "SENT" and resultat.get("code") == 0:
+                    destinataires["sent"] += 1
+                    continue
+                if statut in ("PENDING", "SENDING"):
+                    destinataires["pending"] += 1
+                    continue
+                destinataires["failed"] += 1
+                if len(echecs) < self.MAX_ECHECS:
+                    echecs.append({
+                        "mobile_number": numero,
+                        "reference": resultat.get("reference"),
+                        "error": resultat.get("description") if statut == "SENT" else last_error,
+                    })
+        return Response({
+            "id": campaign.id,
+            "nom": campaign.nom,
+            "total_recipients": campaign.total_recipients,
+            "created_at": campaign.created_at,
+            "lots": lots,
+            "destinataires": destinataires,
+            "echecs": echecs,
+        }, status=status.HTTP_200_OK)
+
+
+class SmsGatewayHealthView(APIView):
+    """État du disjoncteur et statistiques glissantes de la passerelle MD SMS (?minutes=5)."""
+
+    def get(self, request):
+        try:
+            minutes = int(request.query_params.get("minutes", 5))
+        except ValueError:
+            return Response({"detail": "minutes doit être un entier"}, status=status.HTTP_400_BAD_REQUEST)
+        breaker = gateway_breaker.status()
+        return Response({
+            "status": "down" if breaker["state"] == "open" else "degraded" if breaker["state"] == "half_open" else "up",
+            "breaker": breaker,
+            **gateway_health.snapshot(minutes, failure_types=GATEWAY_FAILURES),
+        }, status=status.HTTP_200_OK)